@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML转纯文本的微基准测试
+对比旧实现（_clean_html中逐个执行的11次re.sub）和新的 html_to_text
+使用方法：python benchmarks/bench_html_normalizer.py [--number 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from legal_tech_news_bot import html_to_text  # noqa: E402
+
+
+def legacy_clean_html(html_text: str) -> str:
+    """旧版 NewsletterGenerator._clean_html 的实现（用于对比）"""
+    if not html_text:
+        return html_text
+    clean_text = re.sub(r'<script.*?>.*?</script>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
+    clean_text = re.sub(r'<style.*?>.*?</style>', '', clean_text, flags=re.DOTALL | re.IGNORECASE)
+    clean_text = re.sub(r'<[^>]+>', '', clean_text)
+    clean_text = re.sub(r'&nbsp;', ' ', clean_text)
+    clean_text = re.sub(r'&lt;', '<', clean_text)
+    clean_text = re.sub(r'&gt;', '>', clean_text)
+    clean_text = re.sub(r'&amp;', '&', clean_text)
+    clean_text = re.sub(r'&quot;', '"', clean_text)
+    clean_text = re.sub(r'&#39;', "'", clean_text)
+    clean_text = re.sub(r'&apos;', "'", clean_text)
+    clean_text = re.sub(r'\s+', ' ', clean_text)
+    return clean_text.strip()
+
+
+def legacy_content_summary(content_raw: str) -> str:
+    """旧版 _parse_feed_entries 从content生成描述的实现（只去标签、不解码实体，处理完整正文后再截取200个字符）"""
+    description = re.sub(r'<[^>]+>', '', content_raw)
+    description = re.sub(r'\s+', ' ', description).strip()
+    if len(description) > 200:
+        description = description[:200] + '...'
+    return description
+
+
+def new_content_summary(content_raw: str) -> str:
+    """新版 _parse_feed_entries 的实现"""
+    description = html_to_text(content_raw, max_chars=201)
+    if len(description) > 200:
+        description = description[:200] + '...'
+    return description
+
+
+def make_html(paragraphs: int) -> str:
+    """生成类似RSS正文的HTML：段落、链接、实体、图片，以及一段脚本和样式"""
+    paragraph = (
+        '<p>Legal tech startup <a href="https://example.com/a?x=1&amp;y=2">Harvey</a> raised '
+        '&quot;$100M&quot; to expand its AI platform for law firms &amp; in-house teams.&nbsp; '
+        'The round was led by <strong>Sequoia</strong> &lt;details below&gt;.</p>\n'
+        '<img src="https://example.com/img.png" alt="logo" />\n'
+    )
+    return ('<style>p { color: red; }</style><script>var a = "<b>x</b>";</script>'
+            + paragraph * paragraphs)
+
+
+CASES = [
+    ('短描述（约300字符）', make_html(1)),
+    ('中等正文（约5KB）', make_html(16)),
+    ('超长正文（约500KB）', make_html(1600)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML转纯文本微基准测试')
+    parser.add_argument('--number', type=int, default=200, help='每个用例的执行次数')
+    args = parser.parse_args()
+
+    print(f"{'用例':<20}{'实现':<28}{'平均耗时(µs)':>14}{'提速':>8}")
+    for name, html_text in CASES:
+        # 两种实现对这些输入的结果应完全一致；只处理开头部分得到的摘要也应与处理完整正文后截取的一致
+        assert legacy_clean_html(html_text) == html_to_text(html_text)
+        full_text = html_to_text(html_text)
+        assert new_content_summary(html_text) == (full_text[:200] + '...' if len(full_text) > 200 else full_text)
+
+        number = max(1, args.number * 300 // len(html_text)) if len(html_text) > 100000 else args.number
+        pairs = [
+            ('旧 _clean_html', lambda: legacy_clean_html(html_text),
+             '新 html_to_text', lambda: html_to_text(html_text)),
+            ('旧 content前200字符', lambda: legacy_content_summary(html_text),
+             '新 content前200字符', lambda: new_content_summary(html_text)),
+        ]
+        for old_label, old_func, new_label, new_func in pairs:
+            old_time = min(timeit.repeat(old_func, number=number, repeat=3)) / number * 1e6
+            new_time = min(timeit.repeat(new_func, number=number, repeat=3)) / number * 1e6
+            print(f"{name:<20}{old_label:<28}{old_time:>14.1f}")
+            print(f"{'':<20}{new_label:<28}{new_time:>14.1f}{old_time / new_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取 → 去重 → 评分 → 渲染 流水线的离线基准测试（不访问网络）
+- RSS解析：使用 benchmarks/fixtures/ 下保存的RSS/Atom样本（feedparser 和 流式解析 两种方式）
+- 去重、评分、分类、提示词摘要、备用方案渲染：使用合成的中英文混合新闻，规模可从100条到10万条
+结果写入JSON文件，便于在不同提交之间对比
+
+使用方法：
+  python benchmarks/bench_pipeline.py                                  # 默认规模 100,1000,10000
+  python benchmarks/bench_pipeline.py --sizes 100,1000,10000,100000 --output base.json
+  python benchmarks/bench_pipeline.py --compare base.json              # 与之前的结果对比，变慢超过阈值时返回非0
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, REPO_DIR)
+
+# 基准测试不需要真实的密钥和推送地址；缓存写到临时目录，不影响本地的 .cache
+os.environ.setdefault('NEWS_API_KEY', 'benchmark')
+os.environ.setdefault('FEISHU_WEBHOOK_URL', 'https://open.feishu.cn/open-apis/bot/v2/hook/benchmark')
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='bench-pipeline-')
+os.environ['TRANSLATION_CACHE_ENABLED'] = 'true'
+
+import feedparser  # noqa: E402
+
+from legal_tech_news_bot import (  # noqa: E402
+    Config, NewsFetcher, NewsletterGenerator, KEYWORD_TIERS, SOURCE_WEIGHTS,
+    html_to_text, iter_feed_entries
+)
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+DEFAULT_OUTPUT_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+# ====================== 合成数据 ======================
+_EN_SYLLABLES = ['lex', 'ra', 'vo', 'tek', 'nor', 'lu', 'mi', 'quan', 'del', 'sor', 'pha', 'zen', 'tri', 'ka', 'bel']
+_EN_WORDS = ['launches', 'raises', 'unveils', 'expands', 'acquires', 'partners with', 'tests', 'rolls out',
+             'platform', 'copilot', 'workflow', 'for law firms', 'in-house teams', 'courts', 'startups',
+             'funding', 'review', 'research', 'compliance', 'regulators', 'pricing', 'beta']
+_ZH_CHARS = '数据平台发布合同审查律所融资智能检索司法监管升级上线推出服务企业用户市场行业模型应用场景能力研究团队产品技术'
+_NOISE_EN = ['Quarterly earnings beat expectations', 'Weather disrupts flights', 'Sports league announces schedule']
+_NOISE_ZH = ['本周天气转凉', '体育赛事日程公布', '消费市场回暖']
+
+
+def _en_name(rng: random.Random) -> str:
+    return ''.join(rng.choice(_EN_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def _make_title(rng: random.Random, keywords: list) -> str:
+    """生成一个标题：中英文各约一半，约四分之一不含任何关键词（会在评分阶段被过滤）"""
+    chinese = rng.random() < 0.5
+    keyword = rng.choice(keywords) if rng.random() < 0.75 else None
+    if chinese:
+        words = ''.join(rng.choice(_ZH_CHARS) for _ in range(rng.randint(6, 12)))
+        head = rng.choice(_NOISE_ZH) if keyword is None else f"{_en_name(rng)}{keyword}"
+        return f"{head}：{words}{rng.randint(2, 99)}"
+    words = ' '.join(rng.choice(_EN_WORDS) for _ in range(rng.randint(3, 6)))
+    head = rng.choice(_NOISE_EN) if keyword is None else f"{_en_name(rng)} {keyword}"
+    return f"{head} {words} {_en_name(rng)} {rng.randint(2, 999)}"
+
+
+def make_articles(count: int, seed: int = 42, now: datetime = None) -> list:
+    """
+    生成合成新闻：约10%为改写过的相似标题、约5%为重复URL，发布时间分布在最近5天内
+    :param count: 新闻条数
+    :param seed: 随机种子（相同种子生成相同数据）
+    :param now: 当前时间（UTC）
+    :return: 与 NewsFetcher._parse_feed_entries 输出格式相同的新闻列表
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    keywords = [keyword for _, tier_keywords in KEYWORD_TIERS for keyword in tier_keywords]
+    sources = list(SOURCE_WEIGHTS) + ['Reuters', 'Bloomberg Law']
+    articles = []
+    for i in range(count):
+        roll = rng.random()
+        if articles and roll < 0.05:
+            # 同一篇文章出现在两个源里（URL相同）
+            original = rng.choice(articles)
+            title, url = original['title'], original['url']
+        elif articles and roll < 0.15:
+            # 转载改写：加前后缀的相似标题
+            original = rng.choice(articles)
+            title = rng.choice(['{} - Reuters', '重磅：{}', '{} | Law.com', '{}（附全文）']).format(original['title'])
+            url = f"https://news.example.com/{i}"
+        else:
+            title = _make_title(rng, keywords)
+            url = f"https://news.example.com/{i}?utm_source=rss&utm_medium=feed"
+        description = (
+            f"<p>{title} &amp; related coverage.&nbsp;</p>"
+            + ' '.join(rng.choice(_EN_WORDS) for _ in range(rng.randint(10, 60)))
+            + (f"<p>The post {title[:30]} appeared first on {rng.choice(sources)}.</p>" if rng.random() < 0.3 else '')
+        )
+        published = now - timedelta(hours=rng.uniform(0, 120))
+        articles.append({
+            'title': title,
+            'description': description,
+            'url': url,
+            'source': {'name': rng.choice(sources)},
+            'publishedAt': published.replace(tzinfo=None).isoformat(timespec='seconds') if rng.random() < 0.95 else '',
+            'content': ''
+        })
+    return articles
+
+
+def load_fixtures() -> list:
+    """读取保存的RSS样本：[(源名称, 原始字节), ...]"""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.xml'))):
+        with open(path, 'rb') as f:
+            fixtures.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    return fixtures
+
+
+# ====================== 计时 ======================
+def measure(func, setup, repeat: int) -> dict:
+    """
+    执行 func(setup()) repeat 次，只统计 func 的耗时
+    :return: {'seconds_min', 'seconds_median', 'output'}
+    """
+    timings = []
+    output = None
+    for _ in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        output = func(data)
+        timings.append(time.perf_counter() - start)
+    return {
+        'seconds_min': min(timings),
+        'seconds_median': statistics.median(timings),
+        'output': output
+    }
+
+
+def fresh_copies(articles: list) -> list:
+    """浅拷贝每条新闻（评分会把特征写入 article['_features']，每轮都需要干净的输入）"""
+    return [dict(article) for article in articles]
+
+
+def seed_translation_cache(generator: NewsletterGenerator, articles: list) -> None:
+    """备用方案只测本地排版：预先写入"译文=原文"的翻译缓存，不发起翻译请求"""
+    for article in articles:
+        for text in (article.get('title', ''), article.get('description', '')):
+            cleaned = html_to_text(text)
+            if cleaned:
+                generator.translation_cache.put(cleaned, cleaned)
+
+
+def bench_fixtures(fetcher: NewsFetcher, repeat: int) -> list:
+    """RSS样本解析：feedparser完整解析 与 流式解析 对比"""
+    fixtures = load_fixtures()
+    results = []
+    for stage, parse in (
+        ('parse_feedparser', lambda body: feedparser.parse(body).entries),
+        ('parse_streaming', lambda body: list(iter_feed_entries([body], max_items=10 ** 9))),
+    ):
+        def run(_, parse=parse):
+            return sum(len(fetcher._parse_feed_entries(parse(body), name, 10 ** 9)) for name, body in fixtures)
+        result = measure(run, lambda: None, repeat)
+        results.append({'stage': stage, 'size': len(fixtures), 'output': result.pop('output'), **result})
+    return results
+
+
+def bench_size(fetcher: NewsFetcher, generator: NewsletterGenerator, config: Config,
+               size: int, repeat: int, seed: int) -> list:
+    """在一个规模下分别测各阶段，并测一次完整的 去重→评分→选取→摘要→渲染"""
+    articles = make_articles(size, seed)
+    unique = fetcher._deduplicate(fresh_copies(articles))
+    scored = fetcher._score_articles(fresh_copies(unique))
+    final = scored[:config.max_articles]
+    seed_translation_cache(generator, final)
+
+    def pipeline(data):
+        selected = fetcher._score_articles(fetcher._deduplicate(data))[:config.max_articles]
+        generator._prepare_news_summary(selected)
+        return generator._fallback_newsletter(selected)
+
+    stages = [
+        ('dedup', lambda data: fetcher._deduplicate(data), lambda: fresh_copies(articles), len(articles)),
+        ('score', lambda data: fetcher._score_articles(data), lambda: fresh_copies(unique), len(unique)),
+        # 分类单独计时：使用评分阶段已提取好的特征
+        ('classify', lambda data: [fetcher._classify_article(article) for article in data], lambda: scored, len(scored)),
+        ('summary', lambda data: generator._prepare_news_summary(data), lambda: final, len(final)),
+        ('fallback_render', lambda data: generator._fallback_newsletter(data), lambda: final, len(final)),
+        ('pipeline', pipeline, lambda: fresh_copies(articles), len(articles)),
+    ]
+    results = []
+    for stage, func, setup, input_count in stages:
+        result = measure(func, setup, repeat)
+        output = result.pop('output')
+        results.append({
+            'stage': stage,
+            'size': size,
+            'input': input_count,
+            'output': len(output) if isinstance(output, (list, str)) else output,
+            **result
+        })
+    return results
+
+
+# ====================== 结果输出与对比 ======================
+def git_revision() -> dict:
+    """当前提交号和工作区是否有未提交的改动（不是git仓库时返回空值）"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> bool:
+    """
+    与之前保存的结果逐项对比（按中位数耗时）
+    :return: 是否有阶段变慢超过阈值
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['stage'], r['size']): r for r in json.load(f)['results']}
+
+    regressed = False
+    print(f"\n与 {baseline_path} 对比（变慢超过 {threshold:.0%} 视为退化）")
+    print(f"{'阶段':<20}{'规模':>8}{'之前(ms)':>12}{'现在(ms)':>12}{'比值':>8}")
+    for result in results:
+        old = baseline.get((result['stage'], result['size']))
+        if not old:
+            continue
+        ratio = result['seconds_median'] / old['seconds_median'] if old['seconds_median'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  ⚠️ 变慢'
+            regressed = True
+        print(f"{result['stage']:<20}{result['size']:>8}{old['seconds_median'] * 1000:>12.2f}"
+              f"{result['seconds_median'] * 1000:>12.2f}{ratio:>7.2f}x{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='新闻处理流水线离线基准测试')
+    parser.add_argument('--sizes', default='100,1000,10000', help='合成新闻规模，逗号分隔（如 100,1000,10000,100000）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段的执行次数（取最小值和中位数）')
+    parser.add_argument('--seed', type=int, default=42, help='合成数据的随机种子')
+    parser.add_argument('--output', help='结果JSON文件路径（默认 benchmarks/results/pipeline-<提交号>.json）')
+    parser.add_argument('--compare', help='与之前保存的结果JSON对比')
+    parser.add_argument('--threshold', type=float, default=0.2, help='对比时视为退化的变慢比例')
+    args = parser.parse_args()
+
+    # 只保留基准测试自己的输出
+    logging.disable(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    config = Config()
+    fetcher = NewsFetcher(config)
+    generator = NewsletterGenerator(config)
+
+    results = bench_fixtures(fetcher, args.repeat)
+    for size in sizes:
+        results.extend(bench_size(fetcher, generator, config, size, args.repeat, args.seed))
+
+    print(f"{'阶段':<20}{'规模':>8}{'输入':>8}{'输出':>8}{'中位数(ms)':>12}{'每条(µs)':>10}")
+    for result in results:
+        count = result.get('input') or result['output'] or 1
+        print(f"{result['stage']:<20}{result['size']:>8}{result.get('input', ''):>8}{result['output']:>8}"
+              f"{result['seconds_median'] * 1000:>12.2f}{result['seconds_median'] / count * 1e6:>10.1f}")
+
+    revision = git_revision()
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            **revision,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results
+    }
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"pipeline-{(revision['commit'] or 'local')[:10]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
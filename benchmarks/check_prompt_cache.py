@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Claude提示词缓存的离线检查：启动一个本地Claude接口桩（模拟Anthropic的缓存行为并在usage中返回缓存读写token数），
+通过 CLAUDE_API_URL 指向它，连续生成两次Newsletter，检查：
+  1. 最小缓存长度调低（CLAUDE_CACHE_MIN_TOKENS）后，固定指令作为带cache_control的system前缀发送，
+     第一次写入缓存、第二次读取缓存（非流式和流式）
+  2. 默认的固定指令短于模型的最小缓存长度，不发送cache_control，只提示一次
+使用方法：python benchmarks/check_prompt_cache.py
+检查失败时以非0状态码退出
+"""
+
+import http.server
+import json
+import logging
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+class ClaudeStub(http.server.BaseHTTPRequestHandler):
+    """Claude Messages接口桩：system前缀带cache_control且不短于 min_tokens 时，首次记为缓存写入，之后记为缓存读取"""
+
+    protocol_version = 'HTTP/1.1'
+    min_tokens = 0
+    cached_prefixes = set()
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        type(self).requests.append(body)
+        from legal_tech_news_bot import estimate_tokens
+
+        usage = {'input_tokens': estimate_tokens(body['messages'][-1]['content']), 'output_tokens': 30,
+                 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        system = body.get('system')
+        if isinstance(system, list):
+            prefix = ''.join(block['text'] for block in system)
+            prefix_tokens = estimate_tokens(prefix)
+            if any('cache_control' in block for block in system) and prefix_tokens >= self.min_tokens:
+                key = 'cache_read_input_tokens' if prefix in self.cached_prefixes else 'cache_creation_input_tokens'
+                usage[key] = prefix_tokens
+                self.cached_prefixes.add(prefix)
+            else:
+                usage['input_tokens'] += prefix_tokens
+
+        text = "法律科技与AI日报 - 测试\n\n➤ 测试新闻\n摘要: 测试\n\n🤖 由法律科技新闻Bot自动推送（使用Claude API翻译）"
+        if body.get('stream'):
+            events = [
+                ('message_start', {'type': 'message_start', 'message': {'usage': {
+                    k: v for k, v in usage.items() if k != 'output_tokens'}}}),
+                ('content_block_delta', {'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': text}}),
+                ('message_delta', {'type': 'message_delta', 'usage': {'output_tokens': usage['output_tokens']}}),
+                ('message_stop', {'type': 'message_stop'}),
+            ]
+            payload = ''.join(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                              for event, data in events).encode('utf-8')
+            content_type = 'text/event-stream'
+        else:
+            payload = json.dumps({'content': [{'type': 'text', 'text': text}], 'usage': usage}).encode('utf-8')
+            content_type = 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class MessageCounter(logging.Handler):
+    """统计提示词缓存未启用/未生效的提示条数"""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.messages = []
+
+    def emit(self, record):
+        if '提示词缓存未' in record.getMessage():
+            self.messages.append(record.getMessage())
+
+
+def make_generator(bot, streaming: bool, min_tokens: int):
+    """创建一个不读写响应缓存、指向本地接口桩的 NewsletterGenerator"""
+    config = bot.Config()
+    config.llm_cache_enabled = False
+    config.llm_streaming = streaming
+    config.claude_cache_min_tokens = min_tokens
+    config.enable_fallback = False
+    return bot.NewsletterGenerator(config)
+
+
+def main():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ClaudeStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({
+        'NEWS_API_KEY': 'offline', 'FEISHU_WEBHOOK_URL': 'http://127.0.0.1:9/hook', 'CLAUDE_API_KEY': 'offline',
+        'CLAUDE_API_URL': f'http://127.0.0.1:{server.server_port}/v1/messages',
+        'CACHE_DIR': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'prompt-cache-check'),
+    })
+
+    import legal_tech_news_bot as bot
+    # 只在终端输出检查结果：已有的日志处理器只保留错误
+    for handler in logging.getLogger().handlers + bot.logger.handlers:
+        handler.setLevel(logging.ERROR)
+    messages = MessageCounter()
+    bot.logger.addHandler(messages)
+    bot.logger.setLevel(logging.INFO)
+
+    articles = [{
+        'title': 'Harvey raises new funding round', 'description': 'Legal AI startup Harvey raised new funding.',
+        'url': 'https://example.com/harvey', 'source': {'name': 'Artificial Lawyer'},
+        'publishedAt': '2026-01-01T00:00:00Z', '_category': 'legal_tech', '_score': 100,
+    }]
+    failures = []
+
+    def check(name: str, condition: bool, detail: str = '') -> None:
+        print(f"{'✅' if condition else '❌'} {name}{'：' + detail if detail else ''}")
+        if not condition:
+            failures.append(name)
+
+    # 1. 前缀达到最小缓存长度（接口桩和生成器都把最小长度调为1）：第一次写入缓存，第二次读取缓存
+    ClaudeStub.min_tokens = 1
+    for streaming in (False, True):
+        ClaudeStub.cached_prefixes.clear()
+        ClaudeStub.requests.clear()
+        generator = make_generator(bot, streaming, 1)
+        generator.generate_newsletter(articles)
+        generator.generate_newsletter(articles)
+        calls = generator.llm_metrics[-2:]
+        mode = '流式' if streaming else '非流式'
+        check(f"{mode}：system前缀带cache_control",
+              all('cache_control' in request['system'][0] for request in ClaudeStub.requests))
+        check(f"{mode}：第一次写入缓存", bool(calls[0]['cache_write_tokens']) and not calls[0]['cache_read_tokens'],
+              f"写入 {calls[0]['cache_write_tokens']}，读取 {calls[0]['cache_read_tokens']}")
+        check(f"{mode}：第二次读取缓存", bool(calls[1]['cache_read_tokens']) and not calls[1]['cache_write_tokens'],
+              f"写入 {calls[1]['cache_write_tokens']}，读取 {calls[1]['cache_read_tokens']}")
+    check("前缀足够长时没有缓存提示", not messages.messages, '；'.join(messages.messages))
+
+    # 2. 默认的固定指令短于当前模型的最小缓存长度：不发送cache_control，只提示一次
+    ClaudeStub.min_tokens = bot.claude_cache_min_tokens(bot.Config().claude_model)
+    ClaudeStub.requests.clear()
+    generator = make_generator(bot, False, 0)
+    generator.generate_newsletter(articles)
+    generator.generate_newsletter(articles)
+    check("前缀过短时不发送cache_control",
+          not any(isinstance(request.get('system'), list) for request in ClaudeStub.requests))
+    check("前缀过短时只提示一次", len(messages.messages) == 1, '；'.join(messages.messages))
+
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式（SSE）接收的离线检查：启动一个本地Claude/GLM接口桩（按场景逐段输出SSE事件），
+通过 CLAUDE_API_URL / GLM_API_URL 指向它，检查：
+  1. iter_sse_events 正确解析事件名、多行data、注释行和末尾没有空行的事件
+  2. 首字延迟按第一段内容到达的时间计算，且小于总耗时
+  3. 接口返回usage时记录输出token数和生成速度；没有返回usage时输出token数记为未知，不计算生成速度
+  4. 流式响应中途返回错误事件、连接中途断开时切换到备用方案（连接断开会先按退避重试）
+使用方法：python benchmarks/check_streaming.py
+检查失败时以非0状态码退出
+"""
+
+import http.server
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 第一段内容之前的等待时间（秒），用于检查首字延迟
+FIRST_TOKEN_DELAY = 0.3
+NEWSLETTER_CHUNKS = ["法律科技与AI日报 - 测试\n\n", "➤ 测试新闻\n摘要: 测试\n\n",
+                     "🤖 由法律科技新闻Bot自动推送（使用Claude API翻译）"]
+
+
+class StreamStub(http.server.BaseHTTPRequestHandler):
+    """
+    Claude/GLM流式接口桩，按 scenario 输出：
+      ok: 正常输出并返回usage；no_usage: 正常输出但不返回usage；
+      error: 输出一段内容后返回错误事件；drop: 输出一段内容后断开连接（分块传输没有结束块）
+    和真实接口一样使用分块传输（chunked），每个SSE事件一个分块
+    """
+
+    protocol_version = 'HTTP/1.1'
+    scenario = 'ok'
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        type(self).requests.append((self.path, body))
+        is_claude = self.path.startswith('/claude')
+        events = self._claude_events() if is_claude else self._glm_events()
+        # 第一帧是心跳注释，之后等待 FIRST_TOKEN_DELAY 秒再输出内容
+        payload = [b": keep-alive\n\n"] + [f"{frame}\n\n".encode('utf-8') for frame in events]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for i, frame in enumerate(payload):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(frame), frame))
+            self.wfile.flush()
+            time.sleep(FIRST_TOKEN_DELAY if i == 0 else 0.05)
+        # 连接中途断开：不发送结束块直接关闭连接
+        if self.scenario != 'drop':
+            self.wfile.write(b'0\r\n\r\n')
+        self.close_connection = True
+
+    def _claude_events(self):
+        frames = [self._frame('message_start', {'type': 'message_start', 'message': {
+            'usage': {'input_tokens': 500} if self.scenario != 'no_usage' else {}}})]
+        chunks = NEWSLETTER_CHUNKS[:1] if self.scenario in ('error', 'drop') else NEWSLETTER_CHUNKS
+        frames += [self._frame('content_block_delta', {'type': 'content_block_delta',
+                                                       'delta': {'type': 'text_delta', 'text': text}})
+                   for text in chunks]
+        if self.scenario == 'error':
+            frames.append(self._frame('error', {'type': 'error', 'error': {'type': 'overloaded_error'}}))
+        elif self.scenario != 'drop':
+            delta = {'type': 'message_delta'}
+            if self.scenario != 'no_usage':
+                delta['usage'] = {'output_tokens': 40}
+            frames += [self._frame('message_delta', delta), self._frame('message_stop', {'type': 'message_stop'})]
+        return frames
+
+    def _glm_events(self):
+        chunks = NEWSLETTER_CHUNKS[:1] if self.scenario in ('error', 'drop') else NEWSLETTER_CHUNKS
+        frames = [self._frame(None, {'choices': [{'delta': {'content': text.replace('Claude', 'GLM')}}]})
+                  for text in chunks]
+        if self.scenario == 'error':
+            frames.append(self._frame(None, {'error': {'code': '1302', 'message': '并发过高'}}))
+        elif self.scenario != 'drop':
+            if self.scenario != 'no_usage':
+                frames.append(self._frame(None, {'choices': [], 'usage': {'prompt_tokens': 500,
+                                                                         'completion_tokens': 40}}))
+            frames.append('data: [DONE]')
+        return frames
+
+    @staticmethod
+    def _frame(event, data) -> str:
+        text = f"data: {json.dumps(data, ensure_ascii=False)}"
+        return f"event: {event}\n{text}" if event else text
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeResponse:
+    """只提供 iter_lines 的响应对象，用于直接检查 iter_sse_events"""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self, chunk_size=1024):
+        return iter(self.lines)
+
+
+def make_generator(bot, provider: str):
+    """创建一个流式、不读写响应缓存、指向本地接口桩的 NewsletterGenerator"""
+    config = bot.Config()
+    config.translation_provider = provider
+    config.llm_streaming = True
+    config.llm_cache_enabled = False
+    config.llm_hedge_mode = 'off'
+    config.llm_max_retries = 1
+    config.retry_base_delay = 0.01
+    return bot.NewsletterGenerator(config)
+
+
+def main():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StreamStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    os.environ.update({
+        'NEWS_API_KEY': 'offline', 'FEISHU_WEBHOOK_URL': 'http://127.0.0.1:9/hook',
+        'CLAUDE_API_KEY': 'offline', 'GLM_API_KEY': 'offline',
+        'CLAUDE_API_URL': f'{base_url}/claude/v1/messages', 'GLM_API_URL': f'{base_url}/glm/chat/completions',
+        'CACHE_DIR': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'streaming-check'),
+        # 每次检查都会记录几次失败，调高熔断阈值，避免多次运行后熔断
+        'CIRCUIT_BREAKER_THRESHOLD': '1000',
+    })
+
+    import legal_tech_news_bot as bot
+    # 只在终端输出检查结果：已有的日志处理器只保留错误
+    for handler in logging.getLogger().handlers + bot.logger.handlers:
+        handler.setLevel(logging.ERROR)
+
+    failures = []
+
+    def check(name: str, condition: bool, detail: str = '') -> None:
+        print(f"{'✅' if condition else '❌'} {name}{'：' + detail if detail else ''}")
+        if not condition:
+            failures.append(name)
+
+    # 1. SSE解析
+    events = list(bot.iter_sse_events(FakeResponse([
+        b': ping', b'event: message_start', b'data: {"a": 1}', b'',
+        b'data: line1', b'data:line2', b'', b'', 'event: tail', 'data: last',
+    ])))
+    check("iter_sse_events 解析事件", events == [('message_start', '{"a": 1}'), (None, 'line1\nline2'), ('tail', 'last')],
+          repr(events))
+
+    articles = [{
+        'title': 'Harvey raises new funding round', 'description': 'Legal AI startup Harvey raised new funding.',
+        'url': 'https://example.com/harvey', 'source': {'name': 'Artificial Lawyer'},
+        'publishedAt': '2026-01-01T00:00:00Z', '_category': 'legal_tech', '_score': 100,
+    }]
+
+    for provider in ('claude', 'glm'):
+        label = provider.upper()
+
+        # 2/3. 首字延迟、输出token数和生成速度
+        for scenario in ('ok', 'no_usage'):
+            StreamStub.scenario = scenario
+            generator = make_generator(bot, provider)
+            newsletter = generator.generate_newsletter(articles)
+            call = generator.llm_metrics[-1]
+            check(f"{label} {scenario}：拼接完整内容", '➤ 测试新闻' in newsletter and call['streamed'])
+            ttft = call['time_to_first_token']
+            check(f"{label} {scenario}：首字延迟", ttft is not None and FIRST_TOKEN_DELAY <= ttft < call['duration'],
+                  f"首字 {ttft}秒，总耗时 {call['duration']}秒")
+            if scenario == 'ok':
+                check(f"{label} ok：记录输出token数和生成速度",
+                      call['output_tokens'] == 40 and bool(call['tokens_per_second']),
+                      f"{call['output_tokens']} tokens，{call['tokens_per_second']} tokens/秒")
+            else:
+                check(f"{label} no_usage：输出token数记为未知",
+                      call['output_tokens'] is None and call['tokens_per_second'] is None,
+                      f"{call['output_tokens']} tokens，{call['tokens_per_second']} tokens/秒")
+
+        # 4. 中途出错：切换到备用方案（连接断开属于可重试错误，先重试一次）
+        for scenario, expected_requests in (('error', 1), ('drop', 2)):
+            StreamStub.scenario = scenario
+            StreamStub.requests.clear()
+            generator = make_generator(bot, provider)
+            fallback_calls = []
+            generator._fallback_newsletter = lambda items: fallback_calls.append(items) or '备用方案'
+            newsletter = generator.generate_newsletter(articles)
+            check(f"{label} {scenario}：切换到备用方案", newsletter == '备用方案' and len(fallback_calls) == 1)
+            check(f"{label} {scenario}：请求次数", len(StreamStub.requests) == expected_requests,
+                  f"{len(StreamStub.requests)} 次")
+
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP录制/回放工具：把一次真实运行的所有HTTP请求和响应（RSS、NewsAPI、Claude、GLM、Google翻译、飞书）
+录制到一个压缩的cassette文件，之后在没有网络的机器上回放，完整地运行 LegalTechNewsBot.run_once 并计时/压测
+回放时可以注入延迟（按录制时的真实耗时缩放、额外固定延迟）和故障（超时、连接失败、指定状态码）
+
+实现方式：替换 requests.adapters.HTTPAdapter.send，所有Session（包括deep_translator内部的requests.get）都会经过这里
+cassette只保存请求的方法、URL（去掉密钥参数）和请求体哈希，不保存请求头，因此不含API密钥；
+但响应内容和飞书Webhook以外的URL会原样保存，请不要提交到仓库
+
+使用方法：
+  python benchmarks/http_cassette.py record run.cassette.json.gz          # 真实运行一次并录制（会真的推送到飞书）
+  python benchmarks/http_cassette.py replay run.cassette.json.gz --runs 5
+  python benchmarks/http_cassette.py replay run.cassette.json.gz --latency none --concurrency 4 --runs 8
+  python benchmarks/http_cassette.py replay run.cassette.json.gz --failure-rate 0.3 --failure 503 --failure-hosts api.anthropic.com
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.response import HTTPResponse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+# 不参与匹配的查询参数：密钥（不写入cassette）和每天都会变的日期范围
+_SECRET_PARAMS = frozenset(['apikey', 'api_key', 'key', 'token', 'access_token'])
+_VOLATILE_PARAMS = frozenset(['from', 'to', '_'])
+# 路径中的UUID（如飞书Webhook的hook id）视为密钥
+_UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+# 回放时需要保留的响应头
+_KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'retry-after', 'location')
+# 影响大模型提供商选择的环境变量：回放时只要录制时设置过，就用占位值补上，保证走同样的代码路径
+_PROVIDER_KEYS = ('CLAUDE_API_KEY', 'GLM_API_KEY')
+
+# 可注入的故障类型
+_FAILURE_EXCEPTIONS = {
+    'timeout': requests.exceptions.ReadTimeout,
+    'connection': requests.exceptions.ConnectionError,
+}
+
+
+def request_key(method: str, url: str) -> str:
+    """
+    请求的匹配键：方法 + 去掉密钥和日期参数（并排序）的URL，路径中的UUID替换为占位符
+    :param method: HTTP方法
+    :param url: 完整URL
+    :return: 匹配键
+    """
+    parts = urlsplit(url)
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in _SECRET_PARAMS and key.lower() not in _VOLATILE_PARAMS)
+    path = _UUID_RE.sub('{uuid}', parts.path)
+    return f"{method.upper()} {parts.scheme}://{parts.netloc}{path}" + (f"?{urlencode(query)}" if query else '')
+
+
+def body_hash(body) -> str:
+    """请求体的哈希（同一URL有多次请求时，优先回放请求体完全相同的那一次）"""
+    if body is None:
+        return ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if not isinstance(body, bytes):
+        return ''  # 流式上传的请求体无法哈希，只按URL匹配
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def _encode_body(content: bytes) -> dict:
+    """文本按UTF-8保存（便于查看、压缩率高），二进制内容用base64"""
+    try:
+        return {'text': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_body(entry: dict) -> bytes:
+    if 'base64' in entry:
+        return base64.b64decode(entry['base64'])
+    return entry.get('text', '').encode('utf-8')
+
+
+def build_response(adapter: HTTPAdapter, request: requests.PreparedRequest, status: int,
+                   headers: dict, content: bytes, reason: str = '', elapsed: float = 0.0) -> requests.Response:
+    """
+    用保存的内容构造一个和真实网络响应行为一致的Response（支持stream=True、iter_content、raw.tell()）
+    内容已经是解压后的，因此不带Content-Encoding头
+    """
+    headers = CaseInsensitiveDict(headers)
+    headers['Content-Length'] = str(len(content))
+    raw = HTTPResponse(body=io.BytesIO(content), headers=dict(headers), status=status, reason=reason,
+                       preload_content=False, decode_content=False,
+                       request_method=request.method, request_url=request.url)
+    response = requests.Response()
+    response.status_code = status
+    response.headers = headers
+    response.encoding = get_encoding_from_headers(headers)
+    response.raw = raw
+    response.reason = reason
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+class Cassette:
+    """录制的请求/响应列表，以及回放时的匹配索引"""
+
+    def __init__(self, entries: list = None, meta: dict = None):
+        self.entries = entries or []
+        self.meta = meta or {}
+        self._lock = threading.Lock()
+        self._exact = defaultdict(list)   # (匹配键, 请求体哈希) -> 条目列表
+        self._loose = defaultdict(list)   # 匹配键 -> 条目列表
+        self._served = defaultdict(int)   # 每个索引已回放的次数（按录制顺序依次回放，用完后重复最后一条）
+        for entry in self.entries:
+            self._exact[(entry['key'], entry['body_hash'])].append(entry)
+            self._loose[entry['key']].append(entry)
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self.entries.append(entry)
+
+    def match(self, key: str, request_body_hash: str):
+        """
+        找到与请求对应的录制条目：先按URL+请求体精确匹配，没有时按URL匹配（如提示词里的日期变了）
+        :return: 条目，找不到时返回None
+        """
+        with self._lock:
+            for index, candidates in (((key, request_body_hash), self._exact.get((key, request_body_hash))),
+                                      (key, self._loose.get(key))):
+                if candidates:
+                    position = min(self._served[index], len(candidates) - 1)
+                    self._served[index] += 1
+                    return candidates[position]
+        return None
+
+    def save(self, path: str) -> None:
+        """写入gzip压缩的JSON"""
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({'meta': self.meta, 'entries': self.entries}, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('entries', []), data.get('meta', {}))
+
+
+class HttpHarness:
+    """替换 HTTPAdapter.send 实现录制或回放"""
+
+    def __init__(self, cassette: Cassette, mode: str, latency: str = 'recorded', latency_scale: float = 1.0,
+                 extra_latency: float = 0.0, failure_rate: float = 0.0, failure: str = 'timeout',
+                 failure_hosts: tuple = (), seed: int = None, max_body_bytes: int = 0):
+        """
+        :param cassette: 录制目标或回放来源
+        :param mode: record / replay
+        :param latency: 回放延迟：recorded（按录制时的耗时）/ none（立即返回）
+        :param latency_scale: 录制耗时的缩放倍数
+        :param extra_latency: 每个请求额外增加的延迟（秒）
+        :param failure_rate: 注入故障的概率（0-1）
+        :param failure: 故障类型：timeout / connection / HTTP状态码（如 503）
+        :param failure_hosts: 只对这些主机注入故障（为空时对所有主机）
+        :param seed: 故障注入的随机种子
+        :param max_body_bytes: 录制时响应体的大小上限（与Bot抓取RSS的 FEED_MAX_MB 一致，0表示不限制）
+        """
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.extra_latency = extra_latency
+        self.failure_rate = failure_rate
+        self.failure = failure
+        self.failure_hosts = set(failure_hosts)
+        self.max_body_bytes = max_body_bytes
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._original_send = None
+        self.stats = defaultdict(int)
+        self._stats_lock = threading.Lock()
+
+    def install(self) -> None:
+        if self._original_send is not None:
+            return
+        self._original_send = HTTPAdapter.send
+        harness = self
+
+        def send(adapter, request, **kwargs):
+            if harness.mode == 'record':
+                return harness._record(adapter, request, **kwargs)
+            return harness._replay(adapter, request, **kwargs)
+
+        HTTPAdapter.send = send
+
+    def uninstall(self) -> None:
+        if self._original_send is not None:
+            HTTPAdapter.send = self._original_send
+            self._original_send = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _record(self, adapter, request, **kwargs):
+        """真实发送请求，读取完整响应（已解压）保存下来，再返回一个未读取的副本给调用方"""
+        entry = {'key': request_key(request.method, request.url), 'body_hash': body_hash(request.body)}
+        start = time.monotonic()
+        try:
+            response = self._original_send(adapter, request, **kwargs)
+            content = self._read_body(response)
+        except requests.exceptions.RequestException as e:
+            entry.update({'error': type(e).__name__, 'elapsed': round(time.monotonic() - start, 3)})
+            self.cassette.add(entry)
+            self._count('errors')
+            raise
+        entry.update({
+            'status': response.status_code,
+            'reason': response.reason or '',
+            'headers': {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers},
+            'elapsed': round(time.monotonic() - start, 3),
+            **_encode_body(content)
+        })
+        self.cassette.add(entry)
+        self._count('recorded')
+        return build_response(adapter, request, entry['status'], entry['headers'], content,
+                              entry['reason'], entry['elapsed'])
+
+    def _read_body(self, response) -> bytes:
+        """
+        读取响应体（已解压）；超过大小上限时和Bot抓取RSS一样不再继续下载，
+        只保存上限内的内容再多1字节，回放时Bot同样会判定为超限并截断
+        """
+        if not self.max_body_bytes:
+            return response.content
+        chunks, total = [], 0
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                total += len(chunk)
+                if total > self.max_body_bytes:
+                    self._count('truncated')
+                    break
+        finally:
+            response.close()
+        return b''.join(chunks)[:self.max_body_bytes + 1]
+
+    def _sleep(self, seconds: float, kwargs: dict) -> None:
+        """模拟网络延迟；超过请求的读取超时时按超时处理"""
+        timeout = kwargs.get('timeout')
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and seconds > read_timeout:
+            time.sleep(read_timeout)
+            self._count('timeouts')
+            raise requests.exceptions.ReadTimeout(f"回放延迟 {seconds:.1f}秒 超过读取超时 {read_timeout}秒")
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _should_fail(self, request) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        if self.failure_hosts and urlsplit(request.url).hostname not in self.failure_hosts:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.failure_rate
+
+    def _replay(self, adapter, request, **kwargs):
+        """按匹配键找到录制的响应，注入延迟/故障后返回"""
+        key = request_key(request.method, request.url)
+        entry = self.cassette.match(key, body_hash(request.body))
+        if entry is None:
+            self._count('misses')
+            raise requests.exceptions.ConnectionError(f"cassette中没有该请求的录制: {key}")
+
+        delay = self.extra_latency
+        if self.latency == 'recorded':
+            delay += entry.get('elapsed', 0) * self.latency_scale
+
+        if self._should_fail(request):
+            self._count('injected_failures')
+            if self.failure in _FAILURE_EXCEPTIONS:
+                self._sleep(delay, kwargs)
+                raise _FAILURE_EXCEPTIONS[self.failure](f"注入的故障: {self.failure}")
+            status = int(self.failure)
+            headers = {'Retry-After': '1'} if status in (429, 503) else {}
+            self._sleep(delay, kwargs)
+            return build_response(adapter, request, status, headers, b'', 'Injected', delay)
+
+        self._sleep(delay, kwargs)
+        if 'error' in entry:
+            self._count('replayed_errors')
+            exception = getattr(requests.exceptions, entry['error'], requests.exceptions.ConnectionError)
+            raise exception(f"录制时的错误: {entry['error']}")
+        self._count('replayed')
+        return build_response(adapter, request, entry['status'], entry.get('headers', {}), _decode_body(entry),
+                              entry.get('reason', ''), delay)
+
+
+# ====================== 命令行 ======================
+def _prepare_env(cache_dir: str) -> None:
+    """每次运行使用独立的空缓存目录，避免缓存命中导致跳过请求"""
+    os.environ['CACHE_DIR'] = cache_dir
+    os.environ['METRICS_DIR'] = os.path.join(cache_dir, 'metrics')
+
+
+def _read_run_metrics(cache_dir: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, 'metrics', 'last_run.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record(args) -> None:
+    """真实运行一次Bot并录制所有HTTP交互"""
+    from legal_tech_news_bot import Config, LegalTechNewsBot
+
+    _prepare_env(tempfile.mkdtemp(prefix='cassette-record-'))
+    cassette = Cassette(meta={
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'providers': [key for key in _PROVIDER_KEYS if os.getenv(key)],
+    })
+    with HttpHarness(cassette, 'record', max_body_bytes=Config().feed_max_bytes) as harness:
+        bot = LegalTechNewsBot()
+        start = time.monotonic()
+        bot.run_once()
+        duration = time.monotonic() - start
+    cassette.save(args.cassette)
+    size = os.path.getsize(args.cassette)
+    print(f"已录制 {harness.stats['recorded']} 个响应（{harness.stats['errors']} 个错误，"
+          f"{harness.stats['truncated']} 个超过 FEED_MAX_MB 被截断），"
+          f"运行耗时 {duration:.1f}秒，写入 {args.cassette}（{size / 1024:.0f}KB）")
+
+
+def replay(args) -> None:
+    """在没有网络的情况下回放cassette，多次运行Bot并统计耗时"""
+    cassette = Cassette.load(args.cassette)
+
+    # 回放时没有真实密钥：录制时配置过的提供商用占位值补上
+    os.environ.setdefault('NEWS_API_KEY', 'replay')
+    os.environ.setdefault('FEISHU_WEBHOOK_URL', 'https://open.feishu.cn/open-apis/bot/v2/hook/00000000-0000-0000-0000-000000000000')
+    for key in cassette.meta.get('providers', []):
+        os.environ.setdefault(key, 'replay')
+    # 新闻的发布时间是录制当天的：把时效窗口放宽录制至今的时长，保证筛选结果与录制时一致
+    if args.max_age_hours is None and cassette.meta.get('recorded_at') and 'NEWS_MAX_AGE_HOURS' not in os.environ:
+        recorded_at = datetime.fromisoformat(cassette.meta['recorded_at'])
+        age_hours = (datetime.now(timezone.utc) - recorded_at).total_seconds() / 3600
+        os.environ['NEWS_MAX_AGE_HOURS'] = str(72 + max(0.0, age_hours))
+    elif args.max_age_hours is not None:
+        os.environ['NEWS_MAX_AGE_HOURS'] = str(args.max_age_hours)
+
+    from legal_tech_news_bot import LegalTechNewsBot
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    harness = HttpHarness(
+        cassette, 'replay', latency=args.latency, latency_scale=args.latency_scale,
+        extra_latency=args.extra_latency, failure_rate=args.failure_rate, failure=args.failure,
+        failure_hosts=tuple(host for host in (args.failure_hosts or '').split(',') if host), seed=args.seed
+    )
+    base_dir = tempfile.mkdtemp(prefix='cassette-replay-')
+
+    # 按顺序创建Bot（Config在创建时读取环境变量），每个Bot使用自己的缓存目录
+    bots = []
+    for i in range(args.runs):
+        cache_dir = os.path.join(base_dir, f"run-{i}")
+        _prepare_env(cache_dir)
+        bots.append((cache_dir, LegalTechNewsBot()))
+
+    def run(item):
+        cache_dir, bot = item
+        start = time.monotonic()
+        bot.run_once()
+        return {'duration': round(time.monotonic() - start, 3), **_read_run_metrics(cache_dir)}
+
+    with harness:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            results = list(executor.map(run, bots))
+        wall = time.monotonic() - start
+
+    durations = [result['duration'] for result in results]
+    print(f"回放 {args.runs} 次（并发 {args.concurrency}），总耗时 {wall:.2f}秒")
+    print(f"单次耗时：最短 {min(durations):.2f}秒，中位数 {statistics.median(durations):.2f}秒，最长 {max(durations):.2f}秒")
+    print(f"成功推送：{sum(1 for result in results if result.get('success'))}/{args.runs}")
+    stage_names = list(dict.fromkeys(stage for result in results for stage in result.get('stages', {})))
+    for stage in stage_names:
+        values = [result['stages'][stage] for result in results if stage in result.get('stages', {})]
+        print(f"  {stage:<10} 中位数 {statistics.median(values):.3f}秒，最长 {max(values):.3f}秒")
+    print("HTTP：" + "，".join(f"{name} {count}" for name, count in sorted(harness.stats.items())))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'cassette': args.cassette,
+                'options': {key: value for key, value in vars(args).items() if key != 'func'},
+                'wall_seconds': round(wall, 3),
+                'http': dict(harness.stats),
+                'runs': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP录制/回放：离线、可复现地运行整个Bot')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='真实运行一次并录制所有HTTP请求')
+    record_parser.add_argument('cassette', help='cassette文件路径（.json.gz）')
+    record_parser.set_defaults(func=record)
+
+    replay_parser = subparsers.add_parser('replay', help='离线回放cassette并运行Bot')
+    replay_parser.add_argument('cassette', help='cassette文件路径（.json.gz）')
+    replay_parser.add_argument('--runs', type=int, default=1, help='运行次数')
+    replay_parser.add_argument('--concurrency', type=int, default=1, help='同时运行的Bot数量')
+    replay_parser.add_argument('--latency', choices=['recorded', 'none'], default='recorded',
+                               help='recorded：按录制时的耗时延迟返回；none：立即返回')
+    replay_parser.add_argument('--latency-scale', type=float, default=1.0, help='录制耗时的缩放倍数')
+    replay_parser.add_argument('--extra-latency', type=float, default=0.0, help='每个请求额外增加的延迟（秒）')
+    replay_parser.add_argument('--failure-rate', type=float, default=0.0, help='注入故障的概率（0-1）')
+    replay_parser.add_argument('--failure', default='timeout',
+                               help='故障类型：timeout / connection / HTTP状态码（如 429、503）')
+    replay_parser.add_argument('--failure-hosts', help='只对这些主机注入故障，逗号分隔（如 api.anthropic.com）')
+    replay_parser.add_argument('--seed', type=int, default=None, help='故障注入的随机种子')
+    replay_parser.add_argument('--max-age-hours', type=float, default=None,
+                               help='新闻时效窗口（默认按录制至今的时长自动放宽）')
+    replay_parser.add_argument('--output', help='把每次运行的耗时和阶段指标写入JSON文件')
+    replay_parser.add_argument('--verbose', action='store_true', help='输出Bot的运行日志')
+    replay_parser.set_defaults(func=replay)
+
+    args = parser.parse_args()
+    if args.command == 'replay' and args.failure not in _FAILURE_EXCEPTIONS and not args.failure.isdigit():
+        parser.error('--failure 只能是 timeout、connection 或HTTP状态码')
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,14 +12,28 @@ import json      # 用于处理JSON数据
 import time      # 用于时间处理和等待
 import schedule  # 用于定时任务
 import logging   # 用于日志记录
-from datetime import datetime
-from typing import List, Dict
+import hashlib   # 用于生成缓存键
+import threading # 用于线程安全
+import random    # 用于生成MinHash哈希函数
+import sqlite3   # 用于记录已推送的新闻
+from contextlib import contextmanager, nullcontext  # 用于阶段计时
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode  # 用于URL规范化
+from email.utils import parsedate_to_datetime  # 用于解析Retry-After和RSS中的HTTP日期
+from xml.etree import ElementTree  # 用于流式解析RSS
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # 用于并发抓取
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import List, Dict, Optional, Tuple, NamedTuple
+from collections import deque, OrderedDict  # 用于关键词匹配自动机和LRU缓存
 
 import requests      # 用于HTTP请求
+from requests.adapters import HTTPAdapter  # 用于配置连接池
+from urllib3.util.retry import Retry       # 用于自动重试
 from dotenv import load_dotenv  # 用于加载.env配置文件
 from deep_translator import GoogleTranslator  # 用于免费翻译
 import feedparser      # 用于RSS解析
 import re              # 用于正则表达式清理HTML
+from html import unescape as html_unescape  # 用于解码HTML实体
 import string          # 用于字符串处理
 from difflib import SequenceMatcher  # 用于计算字符串相似度
 
@@ -55,9 +69,10 @@ class Config:
 
         # Claude API配置
         self.claude_api_key = os.getenv('CLAUDE_API_KEY')
-        self.claude_api_url = 'https://api.anthropic.com/v1/messages'
+        self.claude_api_url = os.getenv('CLAUDE_API_URL', 'https://api.anthropic.com/v1/messages')
         # Claude Haiku价格：约$0.25/百万输入token，$1.25/百万输出token
         self.claude_max_tokens = 2000  # 每次请求最大token数
+        self.claude_model = os.getenv('CLAUDE_MODEL', 'claude-3-5-haiku-20241022')  # 默认使用Haiku模型，成本低
 
         # GLM API配置（智谱AI）
         self.glm_api_key = os.getenv('GLM_API_KEY')
@@ -67,8 +82,20 @@ class Config:
         # 翻译优先级：claude > glm > fallback
         self.translation_provider = os.getenv('TRANSLATION_PROVIDER', 'claude').lower()  # claude/glm/fallback
 
-        # 飞书机器人配置
+        # 飞书机器人配置（推送到多个群时，用英文逗号或换行分隔多个Webhook地址）
         self.feishu_webhook = os.getenv('FEISHU_WEBHOOK_URL')
+        self.feishu_webhooks = list(dict.fromkeys(
+            url for url in re.split(r'[,\s]+', self.feishu_webhook or '') if url
+        ))
+        # 多群推送：同时推送的Webhook数量、单个Webhook的重试次数
+        self.feishu_max_workers = int(os.getenv('FEISHU_MAX_WORKERS', '8'))
+        self.feishu_max_retries = int(os.getenv('FEISHU_MAX_RETRIES', '2'))
+        # 限流：每个Webhook（即每个机器人）单独计数，默认与飞书自定义机器人的限制一致（每秒5次、每分钟100次）
+        self.feishu_rate_limit = float(os.getenv('FEISHU_RATE_LIMIT', '5'))
+        self.feishu_rate_burst = int(os.getenv('FEISHU_RATE_BURST', '5'))
+        self.feishu_rate_limit_per_minute = int(os.getenv('FEISHU_RATE_LIMIT_PER_MINUTE', '100'))
+        # 所有Webhook合计的每秒请求数上限（可选，0表示不限制）
+        self.feishu_global_rate_limit = float(os.getenv('FEISHU_GLOBAL_RATE_LIMIT', '0'))
 
         # ========== 可选配置 ==========
         # 新闻搜索关键词（英文）
@@ -88,6 +115,105 @@ class Config:
         # 新闻数量限制
         self.max_articles = int(os.getenv('MAX_ARTICLES', '15'))
 
+        # 多份Newsletter配置档（JSON文件）：各配置档共用一次抓取和去重，分别评分、生成和推送
+        # 未配置时只生成一份默认Newsletter（即下方"关键词匹配模块"中的关键词和来源权重）
+        self.newsletter_profiles_path = os.getenv('NEWSLETTER_PROFILES', '')
+        self.profile_max_workers = int(os.getenv('PROFILE_MAX_WORKERS', '4'))
+
+        # 并发抓取配置：最大并发数、单个新闻源超时时间（秒）
+        self.fetch_max_workers = int(os.getenv('FETCH_MAX_WORKERS', '8'))
+        self.fetch_source_timeout = float(os.getenv('FETCH_SOURCE_TIMEOUT', '20'))
+
+        # 新闻时效：只保留最近多少小时内发布的新闻
+        self.news_max_age_hours = float(os.getenv('NEWS_MAX_AGE_HOURS', '72'))
+
+        # 标题去重：相似度阈值（0-1，越小去重越激进）、MinHash签名长度
+        self.title_similarity_threshold = float(os.getenv('TITLE_SIMILARITY_THRESHOLD', '0.6'))
+        self.title_minhash_permutations = int(os.getenv('TITLE_MINHASH_PERMUTATIONS', '64'))
+
+        # 本地缓存目录（RSS缓存等持久化数据都放在这里）
+        self.cache_dir = os.getenv('CACHE_DIR', '.cache')
+        # RSS条件请求缓存：源未更新时（HTTP 304）直接复用上次的解析结果
+        self.feed_cache_enabled = os.getenv('FEED_CACHE_ENABLED', 'true').lower() == 'true'
+        self.feed_cache_dir = os.path.join(self.cache_dir, 'feeds')
+        # 已推送新闻记录：跳过之前已推送过的新闻（SQLite数据库）
+        self.seen_store_enabled = os.getenv('SEEN_STORE_ENABLED', 'true').lower() == 'true'
+        self.seen_store_path = os.path.join(self.cache_dir, 'seen_articles.db')
+        self.seen_store_retention_days = int(os.getenv('SEEN_STORE_RETENTION_DAYS', '30'))
+        # 翻译缓存（备用方案使用）：同一段原文只调用一次翻译接口
+        self.translation_cache_enabled = os.getenv('TRANSLATION_CACHE_ENABLED', 'true').lower() == 'true'
+        self.translation_cache_path = os.path.join(self.cache_dir, 'translations.json')
+        self.translation_cache_max_bytes = int(os.getenv('TRANSLATION_CACHE_MAX_MB', '2')) * 1024 * 1024
+        # 备用方案并发翻译/排版的线程数，以及整体截止时间（秒），超时的新闻使用原文
+        self.fallback_render_workers = int(os.getenv('FALLBACK_RENDER_WORKERS', '4'))
+        self.fallback_render_deadline = float(os.getenv('FALLBACK_RENDER_DEADLINE', '120'))
+        # 大模型响应缓存：相同提示词在有效期内（小时）直接复用生成结果，重跑时不再重复付费
+        self.llm_cache_enabled = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        self.llm_cache_dir = os.path.join(self.cache_dir, 'llm')
+        self.llm_cache_ttl_hours = float(os.getenv('LLM_CACHE_TTL_HOURS', '24'))
+        # 强制刷新：不读缓存，重新生成并覆盖缓存
+        self.llm_cache_refresh = os.getenv('LLM_CACHE_REFRESH', 'false').lower() == 'true'
+        # 运行指标：每次运行后把各阶段耗时、各新闻源和大模型的耗时写入JSON和Prometheus文本文件
+        self.metrics_enabled = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+        self.metrics_dir = os.getenv('METRICS_DIR', os.path.join(self.cache_dir, 'metrics'))
+        # 流式模式（SSE）：边生成边接收，用"两段数据之间的最长间隔"代替总超时
+        self.llm_streaming = os.getenv('LLM_STREAMING', 'false').lower() == 'true'
+        self.llm_stream_idle_timeout = float(os.getenv('LLM_STREAM_IDLE_TIMEOUT', '20'))
+        # 对冲请求：同时（或延迟后）请求Claude和GLM，采用先返回且格式正确的结果
+        #   off: 关闭；delayed: 首选提供商超过LLM_HEDGE_DELAY秒未返回时启动另一个；immediate: 同时启动
+        self.llm_hedge_mode = os.getenv('LLM_HEDGE_MODE', 'off').lower()
+        self.llm_hedge_delay = float(os.getenv('LLM_HEDGE_DELAY', '15'))
+        # Newsletter生成模式：
+        #   single: 一次调用整理整份Newsletter（默认）
+        #   incremental: 每条新闻的中文标题和摘要只生成一次并按URL缓存，只把新新闻分批发给模型，本地拼装Newsletter
+        self.newsletter_mode = os.getenv('NEWSLETTER_MODE', 'single').lower()
+        self.article_summary_path = os.path.join(self.cache_dir, 'article_summaries.json')
+        self.article_summary_retention_days = int(os.getenv('ARTICLE_SUMMARY_RETENTION_DAYS', '30'))
+        self.article_summary_batch_size = int(os.getenv('ARTICLE_SUMMARY_BATCH_SIZE', '5'))
+        self.article_summary_workers = int(os.getenv('ARTICLE_SUMMARY_WORKERS', '3'))
+        # 模型输出格式（single模式）：
+        #   text: 模型按模板输出整份Newsletter（默认）
+        #   json: 模型只返回每条新闻的中文标题和摘要（JSON），来源、时间、链接、分隔线和落款由本地拼装，输出token约减半
+        self.llm_output_format = os.getenv('LLM_OUTPUT_FORMAT', 'text').lower()
+        # Claude提示词缓存：固定不变的指令部分作为system前缀并标记cache_control，
+        # 5分钟内的后续请求直接读取缓存（更便宜、首字更快）；前缀低于模型的最小缓存长度时不发送该标记
+        self.claude_prompt_caching = os.getenv('CLAUDE_PROMPT_CACHING', 'true').lower() == 'true'
+        # 可缓存前缀的最小token数：0表示按模型自动判断（Haiku 3/3.5为2048，多数其他模型为1024）；
+        # 固定指令的估算长度低于该值时不发送cache_control
+        self.claude_cache_min_tokens = int(os.getenv('CLAUDE_CACHE_MIN_TOKENS', '0'))
+        # 提示词的输入token预算（估算值）：超出时依次去除重复的套话、缩短描述、去掉低分新闻
+        self.prompt_token_budget = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+
+        # ========== HTTP客户端配置 ==========
+        # 连接超时、读取超时（两次收到数据之间的最长间隔，秒）
+        self.http_connect_timeout = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+        self.http_read_timeout = float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+        # 单个RSS源下载的总时限（秒），应小于 FETCH_SOURCE_TIMEOUT
+        self.feed_download_timeout = float(os.getenv('FEED_DOWNLOAD_TIMEOUT', '15'))
+        # 单个RSS源最多下载的字节数（解压后），超出部分直接丢弃
+        self.feed_max_bytes = int(float(os.getenv('FEED_MAX_MB', '5')) * 1024 * 1024)
+        # 流式解析：边下载边解析，取够条数或遇到超出时效的新闻就停止下载（解析失败时自动改用feedparser）
+        self.feed_streaming_parse = os.getenv('FEED_STREAMING_PARSE', 'false').lower() == 'true'
+        # GET请求失败（连接错误、429、5xx）时的自动重试次数
+        self.http_max_retries = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+        # 连接池：缓存的主机数量、每个主机的最大连接数
+        self.http_pool_connections = int(os.getenv('HTTP_POOL_CONNECTIONS', '20'))
+        self.http_max_connections_per_host = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '4'))
+
+        # ========== 大模型调用容错配置 ==========
+        # 单次调用失败（超时、连接错误、429、5xx）后的最大重试次数
+        self.llm_max_retries = int(os.getenv('LLM_MAX_RETRIES', '2'))
+        # 指数退避：第n次重试前随机等待 0 ~ min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2^n) 秒
+        self.retry_base_delay = float(os.getenv('RETRY_BASE_DELAY', '1'))
+        self.retry_max_delay = float(os.getenv('RETRY_MAX_DELAY', '30'))
+        # 每次运行所有提供商合计最多重试的次数，避免故障时把时间都耗在重试上
+        self.retry_budget = int(os.getenv('RETRY_BUDGET', '4'))
+        # 熔断器：连续失败达到阈值后，冷却期（秒）内直接跳过该提供商（状态跨运行保存）
+        self.circuit_breaker_threshold = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '3'))
+        self.circuit_breaker_cooldown = float(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '600'))
+        self.circuit_breaker_path = os.path.join(self.cache_dir, 'circuit_breaker.json')
+        self.http_user_agent = os.getenv('HTTP_USER_AGENT', 'Mozilla/5.0 (compatible; LegalTechNewsBot/1.0)')
+
         # ========== RSS新闻源配置 ==========
 
         # ---------- 法律科技专业源 ----------
@@ -147,8 +273,10 @@ class Config:
         """验证所有必需的配置是否存在"""
         required_configs = {
             'NEWS_API_KEY': self.news_api_key,
-            'FEISHU_WEBHOOK_URL': self.feishu_webhook
         }
+        # 使用配置档文件时，Webhook也可以在配置档中分别指定（由 load_profiles 检查）
+        if not self.newsletter_profiles_path:
+            required_configs['FEISHU_WEBHOOK_URL'] = self.feishu_webhook
 
         # Claude API密钥是可选的，如果没有则使用简单格式
         optional_configs = {
@@ -189,564 +317,2422 @@ class Config:
         logger.info("=" * 60 + "\n")
 
 
-# ====================== 多源新闻获取模块 ======================
-class NewsFetcher:
-    """新闻获取类：从多个来源（NewsAPI + RSS）获取法律科技新闻"""
+# ====================== 本地缓存模块 ======================
+def _read_json_file(path: str, default=None):
+    """
+    读取JSON文件，文件不存在或已损坏时返回默认值
+    :param path: 文件路径
+    :param default: 默认值
+    :return: 解析后的数据
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        logger.warning(f"⚠️ 缓存文件读取失败 {path}: {e}")
+        return default
 
-    def __init__(self, config: Config):
+
+def _write_json_file(path: str, data) -> None:
+    """
+    原子写入JSON文件（先写临时文件再替换，避免中途崩溃留下半个文件）
+    :param path: 文件路径
+    :param data: 要写入的数据
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class FeedCache:
+    """RSS缓存类：按URL保存ETag、Last-Modified和解析结果，用于条件请求"""
+
+    def __init__(self, cache_dir: str):
         """
-        初始化新闻获取器
-        :param config: 配置对象
+        初始化RSS缓存
+        :param cache_dir: 缓存目录
         """
-        self.config = config
-        self.session = requests.Session()  # 使用Session可以提高HTTP请求效率
+        self.cache_dir = cache_dir
 
-    def _fetch_from_rss(self, rss_url: str, source_name: str, max_items: int = 10) -> List[Dict]:
+    def _path(self, url: str) -> str:
+        """每个URL对应一个缓存文件，文件名为URL的哈希"""
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url: str) -> Optional[Dict]:
         """
-        从RSS源获取新闻
-        :param rss_url: RSS链接
-        :param source_name: 源名称（用于日志）
-        :param max_items: 最大获取数量
-        :return: 新闻列表
+        读取某个RSS源的缓存
+        :param url: RSS链接
+        :return: 缓存内容（etag、modified、articles等），没有缓存时返回None
         """
-        articles = []
-        try:
-            logger.info(f"📡 正在获取 {source_name} RSS...")
-            feed = feedparser.parse(rss_url)
+        entry = _read_json_file(self._path(url))
+        if not entry or entry.get('url') != url:
+            return None
+        return entry
 
-            if feed.bozo:
-                logger.warning(f"⚠️ {source_name} RSS解析可能有误: {feed.bozo_exception}")
+    def get_body(self, url: str) -> Optional[bytes]:
+        """
+        读取某个RSS源上次下载的原始内容
+        :param url: RSS链接
+        :return: 原始字节，没有缓存时返回None
+        """
+        try:
+            with open(self._path(url)[:-len('.json')] + '.body', 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
 
-            if not feed.entries:
-                logger.warning(f"⚠️ {source_name} RSS没有返回任何内容")
-                return articles
+    def put(self, url: str, etag: Optional[str], modified: Optional[str], articles: List[Dict],
+            body: Optional[bytes] = None, max_items: Optional[int] = None) -> None:
+        """
+        保存某个RSS源的验证器、原始内容和解析结果
+        :param url: RSS链接
+        :param etag: 服务器返回的ETag
+        :param modified: 服务器返回的Last-Modified
+        :param articles: 解析后的新闻列表
+        :param body: 原始内容（用于在解析条数变化时重新解析，无需重新下载）
+        :param max_items: 解析时使用的最大条数
+        """
+        try:
+            body_path = self._path(url)[:-len('.json')] + '.body'
+            if body is None:
+                # 没有完整内容（如流式解析提前停止下载）时，删除旧内容，避免与新的验证器不一致
+                if os.path.exists(body_path):
+                    os.remove(body_path)
+            else:
+                tmp_path = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, body_path)
+            _write_json_file(self._path(url), {
+                'url': url,
+                'etag': etag,
+                'modified': modified,
+                'max_items': max_items,
+                'fetched_at': datetime.now().isoformat(),
+                'articles': articles
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ RSS缓存写入失败: {e}")
 
-            # 解析RSS条目
-            for entry in feed.entries[:max_items]:
-                # 提取发布时间
-                published_at = ''
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    try:
-                        published_at = datetime(*entry.published_parsed[:6]).isoformat()
-                    except:
-                        pass
-                elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                    try:
-                        published_at = datetime(*entry.updated_parsed[:6]).isoformat()
-                    except:
-                        pass
 
-                # 构建标准化的新闻格式
-                # 清理description中的HTML标签
-                description_raw = entry.get('description', '')
-                title_raw = entry.get('title', '无标题')
+class TranslationCache:
+    """翻译缓存类：按原文哈希保存译文，按总大小做LRU淘汰，跨运行持久化到磁盘"""
 
-                # 清理HTML标签和多余空格
-                description_clean = re.sub(r'<[^>]+>', '', description_raw)
-                description_clean = re.sub(r'\s+', ' ', description_clean).strip()
+    def __init__(self, path: str, max_bytes: int = 2 * 1024 * 1024):
+        """
+        加载翻译缓存
+        :param path: 缓存文件路径
+        :param max_bytes: 缓存译文的总大小上限（字节），超出后淘汰最久未使用的条目
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._size = 0
+        # OrderedDict的顺序即使用顺序：越靠后越是最近使用
+        self._entries = OrderedDict()
+        for key, value in (_read_json_file(path, []) or []):
+            self._entries[key] = value
+            self._size += self._entry_size(key, value)
+        self._evict()
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key) + len(value.encode('utf-8'))
+
+    @staticmethod
+    def make_key(text: str, target: str = 'zh-CN') -> str:
+        """
+        根据原文内容和目标语言生成缓存键
+        :param text: 原文
+        :param target: 目标语言
+        :return: 缓存键
+        """
+        return hashlib.sha1(f"{target}\n{text}".encode('utf-8')).hexdigest()
 
-                # 如果description为空或与标题相同，尝试从content中获取
-                if not description_clean or description_clean.lower() == title_raw.lower():
-                    if hasattr(entry, 'content') and entry.get('content'):
-                        content_raw = entry.get('content', [{}])[0].get('value', '')
-                        description_clean = re.sub(r'<[^>]+>', '', content_raw)
-                        description_clean = re.sub(r'\s+', ' ', description_clean).strip()
-
-                        # 限制长度（取前200个字符）
-                        if len(description_clean) > 200:
-                            description_clean = description_clean[:200] + '...'
-
-                    # 如果content也没有或者还是和标题一样，就留空
-                    if not description_clean or description_clean.lower() == title_raw.lower():
-                        description_clean = ''
-
-                article = {
-                    'title': title_raw,
-                    'description': description_clean,
-                    'url': entry.get('link', ''),
-                    'source': {'name': source_name},
-                    'publishedAt': published_at,
-                    'content': entry.get('content', [{}])[0].get('value', '') if hasattr(entry, 'content') else ''
-                }
-                articles.append(article)
+    def get(self, text: str, target: str = 'zh-CN') -> Optional[str]:
+        """
+        查询译文
+        :param text: 原文
+        :param target: 目标语言
+        :return: 译文，没有缓存时返回None
+        """
+        key = self.make_key(text, target)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self.hits += 1
+            return value
+
+    def put(self, text: str, translated: str, target: str = 'zh-CN') -> None:
+        """
+        保存译文
+        :param text: 原文
+        :param translated: 译文
+        :param target: 目标语言
+        """
+        key = self.make_key(text, target)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entry_size(key, self._entries.pop(key))
+            self._entries[key] = translated
+            self._size += self._entry_size(key, translated)
+            self._dirty = True
+            self._evict()
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目，直到总大小不超过上限"""
+        while self._entries and self._size > self.max_bytes:
+            key, value = self._entries.popitem(last=False)
+            self._size -= self._entry_size(key, value)
+            self._dirty = True
+
+    def save(self) -> None:
+        """有变化时写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            items = list(self._entries.items())
+            self._dirty = False
+        try:
+            _write_json_file(self.path, items)
+        except Exception as e:
+            logger.warning(f"⚠️ 翻译缓存写入失败: {e}")
 
-            logger.info(f"✅ {source_name} RSS获取 {len(articles)} 条")
+    def stats(self) -> str:
+        """命中统计，用于日志"""
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"命中 {self.hits} 次，未命中 {self.misses} 次（命中率 {rate:.0f}%），缓存 {len(self._entries)} 条"
 
-        except Exception as e:
-            logger.error(f"❌ 获取 {source_name} RSS失败: {e}")
 
-        return articles
+class ArticleSummaryCache:
+    """单条新闻摘要缓存类：按规范化URL保存模型生成的中文标题和摘要，超过保留天数自动清理"""
 
-    def fetch_legal_tech_news(self) -> List[Dict]:
+    def __init__(self, path: str, retention_days: int = 30):
         """
-        从多个来源（5个RSS + NewsAPI）获取法律科技新闻
-        :return: 新闻列表，每条新闻包含标题、描述、URL、来源等
+        加载摘要缓存，并清理过期条目
+        :param path: 缓存文件路径
+        :param retention_days: 保留天数
         """
-        logger.info("🔍 开始获取法律科技新闻（多源模式）...")
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        now = time.time()
+        entries = _read_json_file(path, {}) or {}
+        self._entries = {
+            key: entry for key, entry in entries.items()
+            if now - entry.get('created_at', 0) <= self.retention_seconds
+        }
+        self._dirty = len(self._entries) != len(entries)
 
-        all_articles = []
+    @staticmethod
+    def make_key(article: Dict) -> str:
+        """
+        生成缓存键：优先使用规范化URL，没有链接时使用标题指纹
+        :param article: 新闻
+        :return: 缓存键，无法识别时返回空字符串
+        """
+        url = normalize_url(article.get('url', ''))
+        if url:
+            return url
+        fingerprint = title_fingerprint(article.get('title', ''))
+        return f"title:{fingerprint}" if fingerprint else ''
 
-        # ========== 第一步：从5个RSS源获取新闻（免费，无限制）==========
-        logger.info("\n" + "=" * 60)
-        logger.info("📡 开始获取RSS新闻源（5个源）...")
-        logger.info("=" * 60)
+    def get(self, article: Dict) -> Optional[Dict]:
+        """
+        查询新闻的中文标题和摘要
+        :param article: 新闻
+        :return: {'title': ..., 'summary': ...}，没有缓存时返回None
+        """
+        key = self.make_key(article)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {'title': entry['title'], 'summary': entry.get('summary', '')}
+
+    def put(self, article: Dict, title: str, summary: str, provider: str) -> None:
+        """
+        保存新闻的中文标题和摘要
+        :param article: 新闻
+        :param title: 中文标题
+        :param summary: 中文摘要
+        :param provider: 生成摘要的提供商
+        """
+        key = self.make_key(article)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = {
+                'title': title,
+                'summary': summary,
+                'provider': provider,
+                'created_at': time.time()
+            }
+            self._dirty = True
 
-        # 1. Google News RSS
-        google_news_articles = self._fetch_from_rss(
-            self.config.rss_google_news,
-            'Google News',
-            max_items=20
-        )
-        all_articles.extend(google_news_articles)
+    def save(self) -> None:
+        """有变化时写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        try:
+            _write_json_file(self.path, entries)
+        except Exception as e:
+            logger.warning(f"⚠️ 新闻摘要缓存写入失败: {e}")
 
-        # 2. JDSupra Legal Tech RSS
-        jdsupra_articles = self._fetch_from_rss(
-            self.config.rss_jdsupra,
-            'JDSupra Legal Tech',
-            max_items=20
-        )
-        all_articles.extend(jdsupra_articles)
 
-        # 3. Artificial Lawyer RSS
-        artificial_lawyer_articles = self._fetch_from_rss(
-            self.config.rss_artificial_lawyer,
-            'Artificial Lawyer',
-            max_items=20
-        )
-        all_articles.extend(artificial_lawyer_articles)
+class LLMResponseCache:
+    """大模型响应缓存类：按 提供商 + 模型 + 提示词哈希 保存生成结果，超过有效期自动失效"""
 
-        # 4. Above the Law RSS
-        above_the_law_articles = self._fetch_from_rss(
-            self.config.rss_above_the_law,
-            'Above the Law',
-            max_items=20
-        )
-        all_articles.extend(above_the_law_articles)
+    def __init__(self, cache_dir: str, ttl_seconds: float):
+        """
+        初始化响应缓存，并清理已过期的条目
+        :param cache_dir: 缓存目录
+        :param ttl_seconds: 有效期（秒）
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self._purge_expired()
 
-        # 5. TechLaw RSS
-        techlaw_articles = self._fetch_from_rss(
-            self.config.rss_techlaw,
-            'TechLaw',
-            max_items=10
-        )
-        all_articles.extend(techlaw_articles)
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str) -> str:
+        """
+        生成缓存键
+        :param provider: 提供商（claude / glm）
+        :param model: 模型名称
+        :param prompt: 完整提示词
+        :return: 缓存键
+        """
+        return hashlib.sha256(f"{provider}\n{model}\n{prompt}".encode('utf-8')).hexdigest()
 
-        logger.info(f"\n✅ 法律科技RSS源共获取 {len(all_articles)} 条新闻")
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.json')
 
-        # ========== 第二步：获取国内科技媒体新闻 ==========
-        logger.info("\n" + "=" * 60)
-        logger.info("📡 开始获取国内科技媒体新闻（5个源）...")
-        logger.info("=" * 60)
+    def _purge_expired(self) -> None:
+        """删除已过期的缓存文件"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            entry = _read_json_file(path) if name.endswith('.json') else None
+            if not entry or now - entry.get('created_at', 0) > self.ttl_seconds:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
 
-        # 6. 虎嗅网
-        huxiu_articles = self._fetch_from_rss(
-            self.config.rss_huxiu,
-            '虎嗅网',
-            max_items=15
-        )
-        all_articles.extend(huxiu_articles)
+    def get(self, provider: str, model: str, prompt: str) -> Optional[str]:
+        """
+        查询缓存的生成结果
+        :return: 生成结果，没有缓存或已过期时返回None
+        """
+        entry = _read_json_file(self._path(self.make_key(provider, model, prompt)))
+        if not entry or time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+            return None
+        return entry.get('response')
 
-        # 7. 钛媒体
-        ttm_articles = self._fetch_from_rss(
-            self.config.rss_ttm,
-            '钛媒体',
-            max_items=15
-        )
-        all_articles.extend(ttm_articles)
+    def put(self, provider: str, model: str, prompt: str, response: str) -> None:
+        """
+        保存生成结果
+        :param provider: 提供商
+        :param model: 模型名称
+        :param prompt: 完整提示词
+        :param response: 生成结果
+        """
+        try:
+            _write_json_file(self._path(self.make_key(provider, model, prompt)), {
+                'provider': provider,
+                'model': model,
+                'created_at': time.time(),
+                'response': response
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ 大模型响应缓存写入失败: {e}")
 
-        # 8. InfoQ 中文
-        infoq_articles = self._fetch_from_rss(
-            self.config.rss_infoq,
-            'InfoQ',
-            max_items=15
-        )
-        all_articles.extend(infoq_articles)
 
-        # 9. 极客公园
-        geekpark_articles = self._fetch_from_rss(
-            self.config.rss_geekpark,
-            '极客公园',
-            max_items=10
-        )
-        all_articles.extend(geekpark_articles)
+# ====================== 运行指标模块 ======================
+class RunMetrics:
+    """单次运行的指标：各阶段耗时、每个新闻源的耗时/字节数/条数/错误类型、各大模型提供商的耗时"""
 
-        logger.info(f"\n✅ 国内科技媒体共获取 {len(all_articles)} 条新闻")
+    # Prometheus指标名前缀
+    PREFIX = 'legal_news_bot'
 
-        # ========== 第三步：获取AI专业媒体新闻 ==========
-        logger.info("\n" + "=" * 60)
-        logger.info("🤖 开始获取AI专业媒体新闻（5个源）...")
-        logger.info("=" * 60)
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self.duration = None
+        self.success = False
+        self.error = None
+        self.stages = OrderedDict()  # 阶段名 -> 耗时（秒）
+        self.sources = OrderedDict()  # 源名称 -> 指标字典
+        self.llm_calls = []          # NewsletterGenerator._record_llm_metrics 记录的每次调用
+        self.hedge = OrderedDict()   # 提供商 -> 本次运行的对冲请求统计（见 set_hedge）
+        self.deliveries = []         # FeishuNotifier 每个Webhook的推送结果
+        self.profiles = OrderedDict()  # 配置档名称 -> {articles, success, error}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        统计一个阶段的耗时（同名阶段多次执行时累加；多个配置档并行时各自的阶段名带有 :配置档名称）
+        :param name: 阶段名（fetch / dedup / score / generate / push）
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = round(self.stages.get(name, 0) + time.monotonic() - start, 3)
 
-        # 10. 量子位
-        qbitai_articles = self._fetch_from_rss(
-            self.config.rss_qbitai,
-            '量子位',
-            max_items=20
-        )
-        all_articles.extend(qbitai_articles)
+    def record_source(self, name: str, **fields) -> None:
+        """
+        记录（合并）一个新闻源的指标，各抓取线程并发调用
+        :param name: 源名称
+        :param fields: latency（秒）、bytes（下载字节数）、entries（条数）、status、error（异常类名）
+        """
+        with self._lock:
+            metrics = self.sources.setdefault(name, {
+                'latency': None, 'bytes': 0, 'entries': 0, 'status': 'ok', 'error': None
+            })
+            metrics.update(fields)
 
-        # 11. 机器之心
-        jiqizhixin_articles = self._fetch_from_rss(
-            self.config.rss_jiqizhixin,
-            '机器之心',
-            max_items=20
-        )
-        all_articles.extend(jiqizhixin_articles)
+    def record_profile(self, name: str, **fields) -> None:
+        """
+        记录（合并）一个配置档的结果，各配置档线程并发调用
+        :param name: 配置档名称
+        :param fields: articles（选取条数）、success、error（异常类名）
+        """
+        with self._lock:
+            self.profiles.setdefault(name, {'articles': 0, 'success': False, 'error': None}).update(fields)
 
-        # 12. 新智元
-        aiyuan_articles = self._fetch_from_rss(
-            self.config.rss_aiyuan,
-            '新智元',
-            max_items=15
-        )
-        all_articles.extend(aiyuan_articles)
+    def set_hedge(self, before: Dict[str, Dict], after: Dict[str, Dict]) -> None:
+        """
+        根据运行前后的对冲统计快照（NewsletterGenerator.hedge_snapshot）计算本次运行的对冲请求统计
+        :param before: 运行开始时的快照
+        :param after: 运行结束时的快照
+        """
+        self.hedge = OrderedDict()
+        for provider, stats in after.items():
+            start = before.get(provider, {})
+            item = {key: stats[key] - start.get(key, 0)
+                    for key in ('started', 'wins', 'failures', 'cancelled', 'abandoned')}
+            if not item['started']:
+                continue
+            latencies = stats['latencies'][len(start.get('latencies', [])):]
+            item['avg_seconds'] = round(sum(latencies) / len(latencies), 3) if latencies else None
+            self.hedge[provider] = item
+
+    def finish(self, success: bool, error: Optional[Exception] = None) -> None:
+        """
+        结束本次运行
+        :param success: 是否成功推送
+        :param error: 导致失败的异常
+        """
+        self.duration = round(time.monotonic() - self._start, 3)
+        self.success = success
+        self.error = type(error).__name__ if error else None
 
-        # 13. TechCrunch AI
-        techcrunch_ai_articles = self._fetch_from_rss(
-            self.config.rss_techcrunch_ai,
-            'TechCrunch AI',
-            max_items=15
-        )
-        all_articles.extend(techcrunch_ai_articles)
+    def llm_summary(self) -> Dict[str, Dict]:
+        """
+        按提供商汇总大模型调用耗时
+        :return: {提供商: {calls, total_seconds, max_seconds, avg_time_to_first_token, output_tokens}}
+        """
+        summary = OrderedDict()
+        for call in self.llm_calls:
+            item = summary.setdefault(call['provider'], {
+                'model': call['model'], 'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'avg_time_to_first_token': None, 'output_tokens': 0, '_ttft': []
+            })
+            item['calls'] += 1
+            item['total_seconds'] = round(item['total_seconds'] + call['duration'], 3)
+            item['max_seconds'] = max(item['max_seconds'], call['duration'])
+            item['output_tokens'] += call.get('output_tokens') or 0
+            if call.get('time_to_first_token') is not None:
+                item['_ttft'].append(call['time_to_first_token'])
+        for item in summary.values():
+            ttft = item.pop('_ttft')
+            if ttft:
+                item['avg_time_to_first_token'] = round(sum(ttft) / len(ttft), 3)
+        return summary
+
+    def to_dict(self) -> Dict:
+        """导出为可写入JSON的字典"""
+        return {
+            'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(timespec='seconds'),
+            'duration': self.duration,
+            'success': self.success,
+            'error': self.error,
+            'stages': dict(self.stages),
+            'sources': dict(self.sources),
+            'llm': {'providers': self.llm_summary(), 'calls': self.llm_calls, 'hedge': dict(self.hedge)},
+            'deliveries': self.deliveries,
+            'profiles': dict(self.profiles),
+        }
 
-        # 14. The Verge AI
-        verge_ai_articles = self._fetch_from_rss(
-            self.config.rss_verge_ai,
-            'The Verge AI',
-            max_items=10
-        )
-        all_articles.extend(verge_ai_articles)
+    @staticmethod
+    def _label(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
 
-        logger.info(f"\n✅ AI专业媒体共获取 {len(all_articles)} 条新闻")
+    def to_prometheus(self) -> str:
+        """
+        导出为Prometheus文本格式（可供node_exporter的textfile收集器读取）
+        :return: 指标文本
+        """
+        lines = []
 
-        # ========== 第四步：从NewsAPI获取新闻（补充）==========
-        logger.info("\n" + "=" * 60)
-        logger.info("📰 开始获取NewsAPI新闻...")
-        logger.info("=" * 60)
+        def metric(name: str, help_text: str, samples: List[Tuple[Dict, float]]) -> None:
+            if not samples:
+                return
+            full_name = f"{self.PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{self._label(val)}"' for key, val in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        metric('run_timestamp_seconds', 'Start time of the last run (unix seconds)', [({}, round(self.started_at, 3))])
+        metric('run_duration_seconds', 'Wall time of the last run', [({}, self.duration or 0)])
+        metric('run_success', 'Whether the last run pushed a newsletter (1/0)', [({}, int(self.success))])
+        metric('stage_duration_seconds', 'Wall time per pipeline stage',
+               [({'stage': stage}, seconds) for stage, seconds in self.stages.items()])
+
+        sources = list(self.sources.items())
+        metric('source_latency_seconds', 'Fetch latency per news source',
+               [({'source': name}, item['latency']) for name, item in sources if item['latency'] is not None])
+        metric('source_bytes', 'Bytes downloaded per news source',
+               [({'source': name}, item['bytes']) for name, item in sources])
+        metric('source_entries', 'Articles returned per news source',
+               [({'source': name}, item['entries']) for name, item in sources])
+        metric('source_up', 'Whether the source was fetched without error (1/0)',
+               [({'source': name, 'status': item['status'], 'error': item['error'] or ''}, int(not item['error']))
+                for name, item in sources])
+
+        providers = self.llm_summary()
+        metric('llm_calls', 'LLM calls per provider in the last run',
+               [({'provider': provider, 'model': item['model']}, item['calls']) for provider, item in providers.items()])
+        metric('llm_duration_seconds_sum', 'Total LLM latency per provider',
+               [({'provider': provider}, item['total_seconds']) for provider, item in providers.items()])
+        metric('llm_duration_seconds_max', 'Slowest LLM call per provider',
+               [({'provider': provider}, item['max_seconds']) for provider, item in providers.items()])
+        metric('llm_time_to_first_token_seconds', 'Average time to first token per provider (streaming only)',
+               [({'provider': provider}, item['avg_time_to_first_token'])
+                for provider, item in providers.items() if item['avg_time_to_first_token'] is not None])
+        metric('llm_output_tokens', 'Output tokens per provider',
+               [({'provider': provider}, item['output_tokens']) for provider, item in providers.items()])
+        metric('llm_hedge_requests', 'Hedged LLM requests per provider and outcome',
+               [({'provider': provider, 'outcome': outcome}, item[outcome])
+                for provider, item in self.hedge.items()
+                for outcome in ('started', 'wins', 'failures', 'cancelled', 'abandoned')])
+
+        def delivery_labels(item: Dict) -> Dict:
+            # 同一个Webhook可能被多个配置档使用，按配置档区分
+            return {'webhook': item['webhook'], 'profile': item['profile']} if item.get('profile') \
+                else {'webhook': item['webhook']}
+
+        metric('feishu_delivery_up', 'Whether the newsletter was delivered to the webhook (1/0)',
+               [(delivery_labels(item), int(item['ok'])) for item in self.deliveries])
+        metric('feishu_delivery_seconds', 'Delivery latency per webhook (including rate-limit waits and retries)',
+               [(delivery_labels(item), item['latency']) for item in self.deliveries])
+        metric('feishu_delivery_attempts', 'Delivery attempts per webhook',
+               [(delivery_labels(item), item['attempts']) for item in self.deliveries])
+
+        metric('profile_success', 'Whether the newsletter profile was generated and delivered (1/0)',
+               [({'profile': name, 'error': item['error'] or ''}, int(item['success']))
+                for name, item in self.profiles.items()])
+        metric('profile_articles', 'Articles selected per newsletter profile',
+               [({'profile': name}, item['articles']) for name, item in self.profiles.items()])
+        return '\n'.join(lines) + '\n'
+
+    def save(self, directory: str) -> None:
+        """
+        写入 last_run.json 和 last_run.prom（原子替换）
+        :param directory: 输出目录
+        """
+        _write_json_file(os.path.join(directory, 'last_run.json'), self.to_dict())
+        prom_path = os.path.join(directory, 'last_run.prom')
+        tmp_path = f"{prom_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, prom_path)
+
+    def log_summary(self) -> None:
+        """在日志中输出各阶段耗时和最慢的新闻源"""
+        if self.stages:
+            logger.info("⏱️ 各阶段耗时：" + "，".join(f"{stage} {seconds:.2f}秒" for stage, seconds in self.stages.items()))
+        timed = [(item['latency'], name) for name, item in self.sources.items() if item['latency'] is not None]
+        if timed:
+            slowest = sorted(timed, reverse=True)[:3]
+            logger.info("🐢 最慢的新闻源：" + "，".join(f"{name} {latency:.2f}秒" for latency, name in slowest))
+        failed = [f"{name}（{item['error']}）" for name, item in self.sources.items() if item['error']]
+        if failed:
+            logger.info(f"⚠️ 失败的新闻源：{'，'.join(failed)}")
+        if self.deliveries:
+            delivered = sum(1 for item in self.deliveries if item['ok'])
+            logger.info(f"📤 飞书推送：成功 {delivered}/{len(self.deliveries)} 个群")
+        if len(self.profiles) > 1:
+            logger.info("🗂️ 配置档：" + "，".join(
+                f"{name} {'成功' if item['success'] else '失败'}（{item['articles']}条"
+                f"{'，' + item['error'] if item['error'] else ''}）"
+                for name, item in self.profiles.items()))
+
+
+# ====================== HTTP客户端模块 ======================
+def create_http_session(config: Config, pool_maxsize: Optional[int] = None) -> requests.Session:
+    """
+    创建带连接池、自动重试和压缩协商的HTTP Session
+    同一主机的连接会被复用（keep-alive），避免每次请求都重新握手TLS
+    :param config: 配置对象
+    :param pool_maxsize: 每个主机的最大连接数（默认使用配置项）
+    :return: 配置好的Session
+    """
+    session = requests.Session()
+
+    # 只对幂等请求（GET/HEAD）自动重试，POST请求由调用方自行决定是否重试
+    retry = Retry(
+        total=config.http_max_retries,
+        connect=config.http_max_retries,
+        read=config.http_max_retries,
+        status=config.http_max_retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.http_pool_connections,  # 缓存多少个主机的连接池
+        pool_maxsize=pool_maxsize or config.http_max_connections_per_host,  # 每个主机的最大连接数
+        pool_block=True,  # 连接数达到上限时排队等待，而不是新建连接
+        max_retries=retry
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': config.http_user_agent,
+        'Accept-Encoding': 'gzip, deflate'
+    })
+    return session
+
+
+def iter_sse_events(response: requests.Response):
+    """
+    解析SSE（Server-Sent Events）响应流，逐个产出事件
+    :param response: 以stream=True发起的响应
+    :return: 生成器，每项为 (事件名, 数据)，没有event字段时事件名为None
+    """
+    event, data_lines = None, []
+    for raw_line in response.iter_lines(chunk_size=1024):
+        line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+        if not line:
+            # 空行表示一个事件结束
+            if data_lines:
+                yield event, '\n'.join(data_lines)
+            event, data_lines = None, []
+            continue
+        if line.startswith(':'):
+            continue  # 注释行（常用作心跳）
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            event = value
+        elif field == 'data':
+            data_lines.append(value)
+    if data_lines:
+        yield event, '\n'.join(data_lines)
+
+
+# ====================== 容错模块 ======================
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析Retry-After响应头（秒数或HTTP日期）
+    :param value: 响应头的值
+    :return: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
 
-        # 检查API配额
-        self.config.news_api_request_count += 1
-        remaining_requests = self.config.news_api_daily_limit - self.config.news_api_request_count
 
-        if remaining_requests <= 0:
-            logger.warning(f"⚠️ NewsAPI配额已用完，仅使用RSS源")
-        elif remaining_requests <= 10:
-            logger.warning(f"⚠️ NewsAPI配额即将用尽：剩余 {remaining_requests}/{self.config.news_api_daily_limit} 次")
+class CircuitBreaker:
+    """熔断器类：按提供商记录连续失败次数，达到阈值后在冷却期内拒绝调用，状态保存在JSON文件中"""
 
+    def __init__(self, path: Optional[str], failure_threshold: int = 3, cooldown: float = 600):
+        """
+        初始化熔断器，读取上次运行保存的状态
+        :param path: 状态文件路径（None表示不持久化）
+        :param failure_threshold: 连续失败多少次后打开熔断器
+        :param cooldown: 打开后的冷却时间（秒），之后放行一次试探请求
+        """
+        self.path = path
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._states = (_read_json_file(path, {}) if path else {}) or {}
+        # 冷却期已过、正在发送试探请求的提供商 -> 发送试探请求的线程（半开状态只放行一个试探请求，不持久化）
+        self._probing = {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
         try:
-            # 计算日期范围（前3天）
-            from datetime import timedelta
-            from_date = (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
-            today = datetime.now().strftime('%Y-%m-%d')
-            logger.info(f"📅 搜索日期范围: {from_date} 至 {today}（近3天）")
-
-            # 构建搜索关键词
-            precise_keywords = 'legal tech OR legaltech OR legal AI OR law technology OR 法律科技 OR 法律AI'
-            logger.info(f"🔑 搜索关键词: {precise_keywords}")
-
-            # 构建API请求参数
-            params = {
-                'q': precise_keywords,
-                'sortBy': 'relevance',
-                'from': from_date,
-                'to': today,
-                'pageSize': 20,  # 获取20条用于补充
-                'apiKey': self.config.news_api_key
-            }
+            _write_json_file(self.path, self._states)
+        except Exception as e:
+            logger.warning(f"⚠️ 熔断器状态保存失败: {e}")
 
-            # 发送API请求
-            response = self.session.get(self.config.news_api_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+    def _is_tripped(self, key: str) -> bool:
+        """失败次数是否达到阈值（需持有锁）"""
+        state = self._states.get(key)
+        return bool(state) and state.get('failures', 0) >= self.failure_threshold
 
-            if data.get('status') == 'ok':
-                newsapi_articles = data.get('articles', [])
-                all_articles.extend(newsapi_articles)
-                logger.info(f"✅ NewsAPI获取 {len(newsapi_articles)} 条新闻")
+    def is_open(self, key: str) -> bool:
+        """
+        是否处于熔断状态（冷却期已过且没有试探请求在进行时视为可以试探，返回False）
+        :param key: 提供商
+        """
+        with self._lock:
+            if not self._is_tripped(key):
+                return False
+            return key in self._probing or time.time() - self._states[key].get('opened_at', 0) < self.cooldown
 
-        except Exception as e:
-            logger.warning(f"⚠️ NewsAPI获取失败: {e}，继续使用RSS源")
+    def allow(self, key: str) -> bool:
+        """
+        是否放行一次调用：关闭状态全部放行；冷却期内全部拒绝；冷却期已过（半开）时只放行一个试探请求，
+        其结果（record_success / record_failure / release）返回之前拒绝其他请求
+        :param key: 提供商
+        :return: 是否放行
+        """
+        with self._lock:
+            if not self._is_tripped(key):
+                return True
+            if key in self._probing or time.time() - self._states[key].get('opened_at', 0) < self.cooldown:
+                return False
+            self._probing[key] = threading.get_ident()
+            return True
+
+    def release(self, key: str) -> None:
+        """当前线程的试探请求没有得出结果就结束（被取消、不可重试的错误）：允许下一个试探请求"""
+        with self._lock:
+            if self._probing.get(key) == threading.get_ident():
+                del self._probing[key]
+
+    def retry_in(self, key: str) -> float:
+        """距离熔断器允许试探还有多少秒"""
+        with self._lock:
+            state = self._states.get(key) or {}
+            return max(0.0, self.cooldown - (time.time() - state.get('opened_at', 0)))
+
+    def record_success(self, key: str) -> None:
+        """调用成功：清零失败次数，关闭熔断器"""
+        with self._lock:
+            self._probing.pop(key, None)
+            if self._states.pop(key, None) is None:
+                return
+            self._save()
+        logger.info(f"✅ {key.upper()} 已恢复，熔断器关闭")
+
+    def record_failure(self, key: str) -> None:
+        """调用失败：累计失败次数，达到阈值（或试探失败）时打开熔断器"""
+        with self._lock:
+            self._probing.pop(key, None)
+            state = self._states.setdefault(key, {'failures': 0, 'opened_at': 0})
+            state['failures'] += 1
+            opened = state['failures'] >= self.failure_threshold
+            if opened:
+                state['opened_at'] = time.time()
+            self._save()
+        if opened:
+            logger.warning(f"🔌 {key.upper()} 连续失败{state['failures']}次，熔断{self.cooldown:.0f}秒")
+
+
+class ResilientCaller:
+    """容错调用类：对外部调用统一做指数退避重试（带随机抖动、遵守Retry-After）、重试预算和熔断"""
+
+    # 可重试的HTTP状态码：限流和服务端错误
+    RETRYABLE_STATUS = frozenset([408, 429, 500, 502, 503, 504, 529])
+
+    def __init__(self, breaker: CircuitBreaker, max_retries: int = 2, base_delay: float = 1.0,
+                 max_delay: float = 30.0, retry_budget: int = 4):
+        """
+        :param breaker: 熔断器
+        :param max_retries: 单次调用的最大重试次数
+        :param base_delay: 指数退避的基础等待时间（秒）
+        :param max_delay: 单次等待的上限（秒），Retry-After超过该值时不再等待，直接失败
+        :param retry_budget: 每次运行所有调用合计的重试次数上限
+        """
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self._budget_left = retry_budget
+        self._lock = threading.Lock()
+
+    def reset_budget(self) -> None:
+        """每次运行开始时重置重试预算"""
+        with self._lock:
+            self._budget_left = self.retry_budget
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._budget_left <= 0:
+                return False
+            self._budget_left -= 1
+            return True
+
+    @classmethod
+    def is_retryable(cls, error: Exception) -> bool:
+        """超时、连接错误、限流和服务端错误可以重试；认证失败、参数错误等重试也没有用"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            return error.response is not None and error.response.status_code in cls.RETRYABLE_STATUS
+        return isinstance(error, (requests.exceptions.Timeout,
+                                  requests.exceptions.ConnectionError,
+                                  requests.exceptions.ChunkedEncodingError))
+
+    def backoff_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        计算第attempt次重试前的等待时间
+        :return: 等待秒数；服务端要求的等待时间超过上限时返回None（不再重试）
+        """
+        response = getattr(error, 'response', None)
+        retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        # 全抖动（full jitter）：避免多个客户端同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, key: str, func, max_retries: Optional[int] = None,
+             cancel_event: Optional[threading.Event] = None):
+        """
+        执行一次带容错的调用
+        :param key: 提供商（用于熔断和日志）
+        :param func: 无参调用，失败时抛出异常
+        :param max_retries: 覆盖默认的最大重试次数
+        :param cancel_event: 被设置后调用结果已无人使用：不再重试，也不计入熔断器
+        :return: func的返回值
+        """
+        if not self.breaker.allow(key):
+            retry_in = self.breaker.retry_in(key)
+            if retry_in > 0:
+                raise CircuitOpenError(f"{key.upper()} 处于熔断状态，{retry_in:.0f}秒后再试")
+            raise CircuitOpenError(f"{key.upper()} 正在试探恢复，暂不放行其他请求")
+
+        cancelled = lambda: cancel_event is not None and cancel_event.is_set()
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        try:
+            while True:
+                try:
+                    result = func()
+                except Exception as e:
+                    if cancelled() or not self.is_retryable(e):
+                        raise
+                    if attempt >= max_retries:
+                        self.breaker.record_failure(key)
+                        raise
+                    delay = self.backoff_delay(attempt, e)
+                    if delay is None:
+                        logger.warning(f"⚠️ {key.upper()} 要求等待的时间过长，不再重试")
+                        self.breaker.record_failure(key)
+                        raise
+                    if not self._take_budget():
+                        logger.warning(f"⚠️ 重试预算已用完，{key.upper()} 不再重试")
+                        self.breaker.record_failure(key)
+                        raise
+                    attempt += 1
+                    logger.warning(f"🔄 {key.upper()} 调用失败（{e}），{delay:.1f}秒后第{attempt}次重试")
+                    time.sleep(delay)
+                    continue
+                if not cancelled():
+                    self.breaker.record_success(key)
+                return result
+        finally:
+            # 试探请求没有记录成功或失败就结束时（取消、不可重试的错误）释放试探名额
+            self.breaker.release(key)
 
-        # ========== 第三步：智能去重（URL + 标题相似度）==========
-        logger.info("\n" + "=" * 60)
-        logger.info("🔍 开始智能去重...")
-        logger.info("=" * 60)
 
-        def is_similar_title(title1, title2):
-            """判断两个标题是否相似（避免重复新闻）"""
-            if not title1 or not title2:
-                return False
+class TokenBucket:
+    """令牌桶限流：平均每秒放行rate个请求，最多允许burst个请求连续放行（线程安全，先到先得）"""
 
-            # 清理标题
-            t1 = title1.lower().strip()
-            t2 = title2.lower().strip()
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: 每秒补充的令牌数，<=0 表示不限流
+        :param burst: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-            # 完全相同
-            if t1 == t2:
-                return True
+    def acquire(self) -> float:
+        """
+        取一个令牌，没有令牌时等待
+        :return: 实际等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 先预订令牌（可以为负数），再在锁外等待，后来的请求排在后面
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+# ====================== 文本清理模块 ======================
+# 一次匹配去掉：<script>/<style>及其内容（没有闭合标签时去到末尾）、HTML注释、其余所有标签
+_HTML_STRIP_RE = re.compile(
+    r'<(?:(script|style)\b.*?(?:</\1\s*>|\Z)|!--.*?(?:-->|\Z)|[^>]+>)',
+    re.DOTALL | re.IGNORECASE
+)
+# 只匹配需要改写的空白（连续空白或换行、制表符等），单个空格保持不动，替换次数少很多
+_WHITESPACE_RE = re.compile(r'(?: \s|[^\S ])\s*')
+# 常见实体之外的实体（&#8217; &mdash; 等），出现时才交给 html.unescape 完整解码
+_RARE_ENTITY_RE = re.compile(r'&(?!(?:nbsp|lt|gt|quot|#39|apos|amp);)[#\w]+;')
+# 常见实体直接替换（&amp; 放在最后，避免 &amp;lt; 被解码两次）
+_COMMON_ENTITIES = (('&nbsp;', ' '), ('&lt;', '<'), ('&gt;', '>'), ('&quot;', '"'),
+                    ('&#39;', "'"), ('&apos;', "'"), ('&amp;', '&'))
+
+
+def _html_to_text_once(html_text: str) -> str:
+    text = _HTML_STRIP_RE.sub('', html_text) if '<' in html_text else html_text
+    if '&' in text:
+        if _RARE_ENTITY_RE.search(text):
+            text = html_unescape(text)  # 解码全部HTML实体
+        else:
+            for entity, char in _COMMON_ENTITIES:
+                text = text.replace(entity, char)
+    return _WHITESPACE_RE.sub(' ', text).strip()
 
-            # 一个标题是另一个的子集（超过80%相似度）
-            if len(t1) > 0 and len(t2) > 0:
-                if t1 in t2 or t2 in t1:
-                    # 检查长度相似度
-                    ratio = min(len(t1), len(t2)) / max(len(t1), len(t2))
-                    if ratio >= 0.8:  # 80%以上相似
-                        return True
 
-            return False
+def html_to_text(html_text: str, max_chars: Optional[int] = None) -> str:
+    """
+    把HTML转换为纯文本：去掉标签、脚本和样式，解码HTML实体，合并空白
+    RSS抓取和Newsletter排版共用这一个实现
+    :param html_text: HTML文本
+    :param max_chars: 最多返回的字符数；指定后只处理输入的开头部分（不够时再逐步扩大），
+                      超长的content正文不会被完整处理
+    :return: 纯文本
+    """
+    if not html_text:
+        return html_text
+    if not max_chars or len(html_text) <= max_chars * 4:
+        text = _html_to_text_once(html_text)
+        return text[:max_chars] if max_chars else text
+
+    window = max(max_chars * 4, 4096)
+    while True:
+        chunk = html_text[:window]
+        if window < len(html_text):
+            # 不要从标签中间截断
+            open_pos = chunk.rfind('<')
+            if open_pos > chunk.rfind('>'):
+                chunk = chunk[:open_pos]
+        text = _html_to_text_once(chunk)
+        # 多留一点余量：截断处可能有半个单词或实体
+        if len(text) > max_chars + 16 or window >= len(html_text):
+            return text[:max_chars]
+        window *= 2
+
+
+# ====================== RSS流式解析模块 ======================
+# 流式解析只关心条目中的这些字段（按不带命名空间的标签名匹配，兼容RSS 2.0 / RSS 1.0 / Atom）
+_FEED_ENTRY_TAGS = frozenset(['item', 'entry'])
+_FEED_PUBLISHED_TAGS = frozenset(['pubDate', 'published', 'issued', 'date'])
+_FEED_UPDATED_TAGS = frozenset(['updated', 'modified'])
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def parse_feed_date(text: str) -> Optional[datetime]:
+    """
+    解析RSS/Atom中的时间（RFC 822 或 ISO 8601）
+    :param text: 时间字符串
+    :return: UTC时间，无法解析时返回None
+    """
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        dt = parse_published_at(text)
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
 
-        # 第一层去重：URL去重
-        seen_urls = set()
-        unique_by_url = []
-        for article in all_articles:
-            url = article.get('url', '')
-            if url and url not in seen_urls:
-                seen_urls.add(url)
-                unique_by_url.append(article)
 
-        logger.info(f"✅ URL去重后剩余 {len(unique_by_url)} 条新闻")
+def _feed_entry_from_element(element) -> 'feedparser.FeedParserDict':
+    """
+    把一个 <item> / <entry> 元素转换成与feedparser条目相同结构的字典（供 _parse_feed_entries 使用）
+    """
+    entry = feedparser.FeedParserDict()
+    guid_link = None
+    for child in element:
+        name = _local_name(child.tag)
+        text = ''.join(child.itertext()).strip() if len(child) else (child.text or '').strip()
+        if name == 'title':
+            entry['title'] = html_to_text(text) if '<' in text or '&' in text else text
+        elif name == 'link':
+            href = child.get('href')
+            if href:
+                # Atom：优先使用 rel="alternate"（或未标注rel）的链接
+                if child.get('rel', 'alternate') == 'alternate' and 'link' not in entry:
+                    entry['link'] = href.strip()
+            elif text and 'link' not in entry:
+                entry['link'] = text
+        elif name == 'guid':
+            if child.get('isPermaLink', 'true') == 'true' and text.startswith('http'):
+                guid_link = text
+        elif name in ('description', 'summary'):
+            entry.setdefault('summary', text)
+        elif name in ('encoded', 'content'):
+            entry['content'] = [feedparser.FeedParserDict(value=text)]
+        elif name in _FEED_PUBLISHED_TAGS or name in _FEED_UPDATED_TAGS:
+            dt = parse_feed_date(text)
+            key = 'published_parsed' if name in _FEED_PUBLISHED_TAGS else 'updated_parsed'
+            if dt and key not in entry:
+                entry[key] = dt.timetuple()
+    if 'link' not in entry and guid_link:
+        entry['link'] = guid_link
+    return entry
+
+
+def iter_feed_entries(chunks, max_items: int, min_published: Optional[datetime] = None,
+                      max_stale: int = 3):
+    """
+    边读取边解析RSS/Atom，逐条产出条目；取够条数或连续遇到过期条目时停止（不再读取后面的内容）
+    :param chunks: 字节块迭代器（已解压）
+    :param max_items: 最多产出的条目数
+    :param min_published: 早于该时间的条目跳过
+    :param max_stale: 连续遇到多少条过期条目后停止（大多数源按时间倒序排列）
+    :return: 生成器，每项为feedparser风格的条目；XML格式错误时抛出 ElementTree.ParseError
+    """
+    parser = ElementTree.XMLPullParser(events=('end',))
+    produced = 0
+    stale = 0
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if _local_name(element.tag) not in _FEED_ENTRY_TAGS:
+                continue
+            entry = _feed_entry_from_element(element)
+            element.clear()  # 释放已处理条目占用的内存
+
+            published = entry.get('published_parsed') or entry.get('updated_parsed')
+            if min_published and published and \
+                    datetime(*published[:6], tzinfo=timezone.utc) < min_published:
+                stale += 1
+                if stale >= max_stale:
+                    return
+                continue
+            stale = 0
+
+            yield entry
+            produced += 1
+            if produced >= max_items:
+                return
+    try:
+        parser.close()
+    except ElementTree.ParseError:
+        # 内容被大小上限截断时文档不完整；已经解析出条目就直接使用
+        if not produced:
+            raise
 
-        # 第二层去重：标题相似度去重
-        unique_articles = []
-        seen_titles = []
 
-        for article in unique_by_url:
-            title = article.get('title', '')
-            is_duplicate = False
-
-            # 检查是否与已见过的标题相似
-            for seen_title in seen_titles:
-                if is_similar_title(title, seen_title):
-                    is_duplicate = True
-                    logger.debug(f"🔄 发现相似标题，已去重: {title[:50]}...")
-                    break
+# ====================== 关键词匹配模块 ======================
+# 来源权重（评分时乘以10）
+SOURCE_WEIGHTS = {
+    # 法律科技专业源
+    'Artificial Lawyer': 3.0,
+    'JDSupra Legal Tech': 3.0,
+    'Above the Law': 2.0,
+    'Law.com': 2.0,
+    'LegalTechnology.News': 2.5,
+    'TechLaw': 2.0,
+    # AI专业媒体（高权重）
+    '量子位': 3.0,
+    '机器之心': 3.0,
+    '新智元': 2.8,
+    'TechCrunch AI': 2.5,
+    'The Verge AI': 2.5,
+    # 国内科技媒体
+    '虎嗅网': 1.8,
+    '钛媒体': 1.8,
+    'InfoQ': 1.8,
+    '极客公园': 1.5,
+    '36氪': 1.5,
+    # 通用新闻
+    'Google News': 1.5,
+    'Business Insider': 1.0,
+    'TechCrunch': 1.0,
+    'Forbes': 1.0,
+}
+
+# ========== 法律科技关键词 ==========
+LEGAL_TECH_KEYWORDS = [
+    'legal ai', 'legal artificial intelligence', '法律ai', '法律AI', '法律人工智能'
+]
+
+LEGAL_TECH_SECONDARY_KEYWORDS = [
+    'legal tech', 'legal technology', 'legaltech', 'lawtech',
+    'law tech', 'law technology', '法律科技',
+    'legal automation', 'contract AI', 'e-discovery', 'document automation'
+]
+
+# ========== AI重大新闻关键词（国内 + 国外）==========
+# 国内AI公司和产品
+AI_MAJOR_KEYWORDS = [
+    # 大模型产品
+    'kimi', '月之暗面', 'moonshot',
+    'chatglm', '智谱ai', '智谱AI', 'zhipu',
+    '文心一言', 'ernie bot', '百度ai', 'paddlepaddle',
+    '通义千问', 'qwen', '阿里ai', '通义',
+    '混元', 'hunyuan', '腾讯ai',
+    '星火', '讯飞ai', 'iflytek',
+    '豆包', '字节ai', '字节跳动ai',
+    '百川智能', 'baichuan',
+    '零一万物', '01ai', 'yi模型',
+    '深度求索', 'deepseek',
+    '面壁智能', 'cpm',
+    'minimax',
+    # 开源模型
+    '开源大模型', '开源llm', '开源模型',
+    '世界模型', 'world model',
+    # AI公司动态
+    '发布', '上线', '推出', '开源', '更新',
+    # AI技术和应用
+    'gpt-4', 'gpt4', 'claude', 'anthropic',
+    'gemini', 'llama', 'meta ai', 'grok',
+    'sora', 'midjourney', 'stable diffusion',
+    'chatgpt', 'openai',
+]
+
+# AI技术关键词
+AI_TECH_KEYWORDS = [
+    '大模型', 'llm', '大型语言模型',
+    'aigc', '生成式ai', 'generative ai',
+    'transformer', 'attention机制',
+    '多模态', '视觉模型', '语音模型',
+    'agent', 'ai代理', '智能体',
+    'rag', '检索增强生成',
+    '微调', 'fine-tuning', '训练',
+]
+
+# 关键词层级（按优先级排列，同一关键词以先出现的层级为准）
+KEYWORD_TIERS = [
+    ('legal_core', LEGAL_TECH_KEYWORDS),
+    ('ai_major', AI_MAJOR_KEYWORDS),
+    ('legal_secondary', LEGAL_TECH_SECONDARY_KEYWORDS),
+    ('ai_tech', AI_TECH_KEYWORDS),
+]
+
+# 标题命中各层级关键词的得分
+KEYWORD_TIER_SCORES = {
+    'legal_core': 60,       # 法律科技核心关键词：最高优先级
+    'ai_major': 55,         # AI重大新闻关键词：高优先级
+    'legal_secondary': 45,  # 法律科技次要关键词
+    'ai_tech': 40,          # AI技术关键词
+}
+
+# 用于新闻分类的层级
+LEGAL_TECH_TIERS = {'legal_core', 'legal_secondary'}
+AI_MAJOR_TIERS = {'ai_major', 'ai_tech'}
+
+
+class KeywordHit(NamedTuple):
+    """一次关键词命中：关键词、所属层级、在文本中的起始位置"""
+    keyword: str
+    tier: str
+    start: int
+
+
+class KeywordMatcher:
+    """关键词匹配类：基于Aho-Corasick自动机，一次扫描找出文本中的所有关键词"""
+
+    def __init__(self, keyword_tiers: List[Tuple[str, List[str]]]):
+        """
+        构建匹配自动机
+        :param keyword_tiers: [(层级名称, 关键词列表), ...]，按优先级排列
+        """
+        # 关键词统一转为小写（待匹配文本也是小写），重复的关键词只保留优先级最高的层级
+        self.keywords = []  # [(关键词, 层级), ...]
+        seen = set()
+        for tier, keywords in keyword_tiers:
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and keyword not in seen:
+                    seen.add(keyword)
+                    self.keywords.append((keyword, tier))
+
+        # 状态转移表、失败指针、每个状态的输出（以该状态结尾的关键词编号）
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        # 第一步：把所有关键词插入字典树
+        for index, (keyword, _) in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # 第二步：广度优先计算失败指针，并把失败状态的输出合并进来
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """
+        扫描一遍文本，返回所有关键词命中（包括重叠的命中）
+        :param text: 待匹配文本（应已转为小写）
+        :return: 命中列表
+        """
+        hits = []
+        if not text:
+            return hits
+
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self.keywords
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                keyword, tier = keywords[index]
+                hits.append(KeywordHit(keyword, tier, position - len(keyword) + 1))
+        return hits
+
+
+# ====================== Newsletter配置档模块 ======================
+class NewsProfile:
+    """Newsletter配置档：一份Newsletter的关键词层级、来源权重、分类方式、选取条数和推送目标"""
+
+    # 未配置 NEWSLETTER_PROFILES 时使用的默认配置档名称
+    DEFAULT_NAME = 'default'
+
+    def __init__(self, name: str, keyword_tiers: Optional[List[Tuple[str, List[str]]]] = None,
+                 tier_scores: Optional[Dict[str, float]] = None, source_weights: Optional[Dict[str, float]] = None,
+                 default_source_weight: float = 1.0, legal_tech_tiers=None, ai_major_tiers=None,
+                 sources: Optional[List[str]] = None, max_articles: int = 15,
+                 webhooks: Optional[List[str]] = None, seen_store_path: Optional[str] = None):
+        """
+        :param name: 配置档名称（用于日志、运行指标和已推送记录文件名）
+        :param keyword_tiers: [(层级名称, 关键词列表), ...]，默认 KEYWORD_TIERS
+        :param tier_scores: 各层级的标题命中得分，覆盖 KEYWORD_TIER_SCORES 中的同名层级
+        :param source_weights: 来源权重，覆盖 SOURCE_WEIGHTS 中的同名来源
+        :param default_source_weight: 未列出的来源的权重
+        :param legal_tech_tiers: 归为"法律科技新闻"的层级，默认 LEGAL_TECH_TIERS
+        :param ai_major_tiers: 归为"AI重大新闻"的层级，默认 AI_MAJOR_TIERS
+        :param sources: 只使用这些来源的新闻（为空时使用全部来源）
+        :param max_articles: 最多选取的新闻条数
+        :param webhooks: 推送的飞书Webhook列表
+        :param seen_store_path: 已推送新闻记录的数据库路径
+        """
+        self.name = name
+        self.keyword_tiers = list(keyword_tiers) if keyword_tiers is not None else KEYWORD_TIERS
+        self.tier_scores = dict(KEYWORD_TIER_SCORES, **(tier_scores or {}))
+        self.source_weights = dict(SOURCE_WEIGHTS, **(source_weights or {}))
+        self.default_source_weight = default_source_weight
+        self.legal_tech_tiers = set(legal_tech_tiers) if legal_tech_tiers is not None else LEGAL_TECH_TIERS
+        self.ai_major_tiers = set(ai_major_tiers) if ai_major_tiers is not None else AI_MAJOR_TIERS
+        self.sources = set(sources) if sources else None
+        self.max_articles = max_articles
+        self.webhooks = list(webhooks or [])
+        self.seen_store_path = seen_store_path
+        # 关键词匹配自动机：每个配置档只构建一次
+        self.matcher = KeywordMatcher(self.keyword_tiers)
+
+    @property
+    def log_prefix(self) -> str:
+        """日志前缀：默认配置档不加前缀，保持原来的日志格式"""
+        return '' if self.name == self.DEFAULT_NAME else f"[{self.name}] "
+
+    def stage_name(self, stage: str) -> str:
+        """运行指标中的阶段名：默认配置档为 score / generate / push，其他为 score:名称 等"""
+        return stage if self.name == self.DEFAULT_NAME else f"{stage}:{self.name}"
+
+    @classmethod
+    def from_dict(cls, data: Dict, config: Config, seen_store_path: str) -> 'NewsProfile':
+        """
+        从配置档文件中的一项创建配置档
+        :param data: {"name", "keywords", "tier_scores", "source_weights", "default_source_weight",
+                      "categories": {"legal_tech": [...], "ai_major": [...]}, "sources", "max_articles", "webhooks"}
+        :param config: 配置对象（未指定的选项使用全局配置）
+        :param seen_store_path: 已推送新闻记录的数据库路径
+        :return: 配置档
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"配置档必须是JSON对象: {data!r}")
+        name = str(data.get('name') or '').strip()
+        if not re.fullmatch(r'[\w-]+', name):
+            raise ValueError(f"配置档名称只能包含字母、数字、下划线和短横线: {name!r}")
+
+        def is_str_list(value) -> bool:
+            return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+        def is_number_map(value) -> bool:
+            return isinstance(value, dict) and all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) for v in value.values())
+
+        # keywords: {"层级名称": [关键词, ...], ...}，按书写顺序作为优先级
+        keywords = data.get('keywords')
+        keyword_tiers = None
+        if keywords is not None:
+            if not isinstance(keywords, dict) or not keywords or not all(map(is_str_list, keywords.values())):
+                raise ValueError(f"配置档 {name} 的 keywords 必须是 {{层级名称: [关键词, ...]}}")
+            keyword_tiers = list(keywords.items())
+        tiers = {tier for tier, _ in (keyword_tiers if keyword_tiers is not None else KEYWORD_TIERS)}
+
+        # categories / tier_scores 中引用的层级必须存在，否则分类和加分会静默失效
+        categories = data.get('categories', {})
+        if not isinstance(categories, dict) or not all(map(is_str_list, categories.values())):
+            raise ValueError(f"配置档 {name} 的 categories 必须是 {{\"legal_tech\": [层级名称, ...], \"ai_major\": [...]}}")
+        unknown_categories = set(categories) - {'legal_tech', 'ai_major'}
+        if unknown_categories:
+            raise ValueError(f"配置档 {name} 的 categories 只支持 legal_tech 和 ai_major: {sorted(unknown_categories)}")
+        tier_scores = data.get('tier_scores', {})
+        if not is_number_map(tier_scores):
+            raise ValueError(f"配置档 {name} 的 tier_scores 必须是 {{层级名称: 分数}}")
+        referenced = set(tier_scores).union(*categories.values())
+        if referenced - tiers:
+            raise ValueError(f"配置档 {name} 引用了不存在的关键词层级: {sorted(referenced - tiers)}"
+                             f"（可用层级: {', '.join(sorted(tiers))}）")
+
+        # 自定义关键词层级但没有写 categories 时，默认分类中的层级名称多半不存在，所有新闻都会被归为"其他"
+        if keyword_tiers is not None and not categories and not (tiers & (LEGAL_TECH_TIERS | AI_MAJOR_TIERS)):
+            raise ValueError(f"配置档 {name} 自定义了 keywords，请用 categories 指定哪些层级归为 legal_tech / ai_major")
+
+        source_weights = data.get('source_weights', {})
+        if not is_number_map(source_weights):
+            raise ValueError(f"配置档 {name} 的 source_weights 必须是 {{来源名称: 权重}}")
+        sources = data.get('sources')
+        if sources is not None and not is_str_list(sources):
+            raise ValueError(f"配置档 {name} 的 sources 必须是来源名称列表，如 [\"量子位\", \"机器之心\"]")
+        webhooks = data.get('webhooks')
+        if webhooks is not None and not is_str_list(webhooks):
+            raise ValueError(f"配置档 {name} 的 webhooks 必须是Webhook地址列表")
+        webhooks = webhooks or config.feishu_webhooks
+        if not webhooks:
+            raise ValueError(f"配置档 {name} 没有可推送的Webhook（请配置 webhooks 或 FEISHU_WEBHOOK_URL）")
+        try:
+            default_source_weight = float(data.get('default_source_weight', 1.0))
+            max_articles = int(data.get('max_articles', config.max_articles))
+        except (TypeError, ValueError):
+            raise ValueError(f"配置档 {name} 的 default_source_weight / max_articles 必须是数字")
+
+        return cls(
+            name,
+            keyword_tiers=keyword_tiers,
+            tier_scores=tier_scores,
+            source_weights=source_weights,
+            default_source_weight=default_source_weight,
+            legal_tech_tiers=categories.get('legal_tech'),
+            ai_major_tiers=categories.get('ai_major'),
+            sources=sources,
+            max_articles=max_articles,
+            webhooks=list(dict.fromkeys(webhooks)),
+            seen_store_path=seen_store_path,
+        )
 
-            if not is_duplicate:
-                seen_titles.append(title)
-                unique_articles.append(article)
 
-        removed_count = len(unique_by_url) - len(unique_articles)
-        if removed_count > 0:
-            logger.info(f"✅ 标题相似度去重：移除 {removed_count} 条重复新闻")
+def load_profiles(config: Config) -> List[NewsProfile]:
+    """
+    读取 NEWSLETTER_PROFILES 指定的配置档文件；未配置时返回一个与原来行为相同的默认配置档
+    第一个配置档沿用原来的已推送记录数据库，其他配置档各自使用 seen_articles.<名称>.db
+    :param config: 配置对象
+    :return: 配置档列表
+    """
+    if not config.newsletter_profiles_path:
+        return [NewsProfile(NewsProfile.DEFAULT_NAME, max_articles=config.max_articles,
+                            webhooks=config.feishu_webhooks, seen_store_path=config.seen_store_path)]
 
-        logger.info(f"✅ 最终去重后剩余 {len(unique_articles)} 条新闻")
+    path = config.newsletter_profiles_path
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"配置档文件 {path} 读取失败: {e}")
+
+    items = data.get('profiles') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"配置档文件 {path} 中没有配置档（格式：{{\"profiles\": [{{\"name\": ...}}, ...]}}）")
+
+    profiles = []
+    for index, item in enumerate(items):
+        name = str(item.get('name') or '').strip() if isinstance(item, dict) else ''
+        seen_store_path = config.seen_store_path if index == 0 else \
+            os.path.join(config.cache_dir, f'seen_articles.{name}.db')
+        profile = NewsProfile.from_dict(item, config, seen_store_path)
+        if any(existing.name == profile.name for existing in profiles):
+            raise ValueError(f"配置档名称重复: {profile.name}")
+        profiles.append(profile)
+
+    logger.info(f"🗂️ 已加载 {len(profiles)} 个Newsletter配置档：{', '.join(p.name for p in profiles)}")
+    return profiles
+
+
+# ====================== 标题去重模块 ======================
+class TitleLSHIndex:
+    """
+    标题相似度索引：字符shingle + MinHash + LSH分桶，近似常数时间找出相似标题（中英文通用）
+    原有的包含规则（一个标题包含另一个且长度比例达到80%）另用标题子串索引查找候选，不依赖LSH分桶是否命中
+    """
 
-        # ========== 第五步：智能评分排序（来源权重 + 相关性评分）+ 新闻分类 ==========
-        logger.info("🎯 开始智能评分排序和分类...")
-
-        # 定义来源权重
-        source_weights = {
-            # 法律科技专业源
-            'Artificial Lawyer': 3.0,
-            'JDSupra Legal Tech': 3.0,
-            'Above the Law': 2.0,
-            'Law.com': 2.0,
-            'LegalTechnology.News': 2.5,
-            'TechLaw': 2.0,
-            # AI专业媒体（高权重）
-            '量子位': 3.0,
-            '机器之心': 3.0,
-            '新智元': 2.8,
-            'TechCrunch AI': 2.5,
-            'The Verge AI': 2.5,
-            # 国内科技媒体
-            '虎嗅网': 1.8,
-            '钛媒体': 1.8,
-            'InfoQ': 1.8,
-            '极客公园': 1.5,
-            '36氪': 1.5,
-            # 通用新闻
-            'Google News': 1.5,
-            'Business Insider': 1.0,
-            'TechCrunch': 1.0,
-            'Forbes': 1.0,
-        }
+    _NON_WORD_RE = re.compile(r'[\W_]+')
+    _CJK_RE = re.compile(r'[\u3400-\u9fff]')
+    # 原有规则：较短标题的长度至少为较长标题的80%
+    LEGACY_MIN_RATIO = 0.8
+    # 包含规则索引的子串长度（字符）
+    CONTAIN_KEY_LENGTH = 8
 
-        # ========== 法律科技关键词 ==========
-        legal_tech_keywords = [
-            'legal ai', 'legal artificial intelligence', '法律ai', '法律AI', '法律人工智能'
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, seed: int = 1, max_bucket_size: int = 16):
+        """
+        初始化索引
+        :param threshold: 相似度阈值（shingle集合的Jaccard相似度，0-1）
+        :param num_perm: MinHash签名长度，越大越准确但越慢
+        :param seed: 哈希函数随机种子（固定种子保证结果可复现）
+        :param max_bucket_size: 每个分桶最多保留的标题数；大量结构相同的标题落入同一分桶时，
+                                之后的标题只和分桶中先加入的标题比较（去重耗时保持线性，代价是极少数相似标题可能漏掉）
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_bucket_size = max(1, max_bucket_size)
+        # 每个"排列"用一个64位随机掩码实现：h XOR mask 的最小值即该排列下的MinHash
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+        # 选择分段数(bands)和每段行数(rows)，使LSH的"S曲线"拐点 (1/b)^(1/r) 略低于阈值：
+        # 宁可多召回一些候选（误报会被精确的Jaccard校验排除），也不要漏掉相似标题
+        target = threshold * 0.85
+        self.bands, self.rows = min(
+            ((b, num_perm // b) for b in range(1, num_perm + 1)),
+            key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - target)
+        )
+        self._buckets = [{} for _ in range(self.bands)]
+        self._exact = set()       # 规范化后的标题，用于完全相同的快速判断
+        self._titles = []         # [(原始标题小写, shingle集合), ...]
+        # 包含规则的索引（键为原始标题小写的子串）
+        self._prefixes = {}       # 前 CONTAIN_KEY_LENGTH 个字符 -> [标题编号]
+        self._windows = {}        # 靠前位置（不超过长度的20%）开始的子串 -> [标题编号]
+        self._short_titles = []   # 太短、无法用子串索引的标题编号
+
+    def _normalize(self, title: str) -> str:
+        """转小写并去掉空白和标点"""
+        return self._NON_WORD_RE.sub('', title.lower())
+
+    def _shingles(self, text: str) -> set:
+        """切分为字符shingle：中文用2字符，英文用3字符"""
+        size = 2 if self._CJK_RE.search(text) else 3
+        if len(text) <= size:
+            return {text}
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def _signature(self, shingles: set) -> List[int]:
+        """计算MinHash签名（每个shingle只做一次64位哈希）"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles
         ]
+        return [min(h ^ mask for h in hashes) for mask in self._masks]
+
+    def _is_legacy_similar(self, t1: str, t2: str) -> bool:
+        """原有规则：完全相同，或一个标题包含另一个且长度比例达到80%"""
+        if t1 == t2:
+            return True
+        if t1 and t2 and (t1 in t2 or t2 in t1):
+            return min(len(t1), len(t2)) / max(len(t1), len(t2)) >= self.LEGACY_MIN_RATIO
+        return False
+
+    def _add_to_bucket(self, buckets: Dict, key, item_id: int) -> None:
+        """加入分桶，分桶已满时不再加入"""
+        bucket = buckets.setdefault(key, [])
+        if len(bucket) < self.max_bucket_size:
+            bucket.append(item_id)
+
+    def _window_count(self, length: int) -> int:
+        """长度为length的标题中，能包含长度比例达到80%的较短标题的起始位置数"""
+        return length - int(length * self.LEGACY_MIN_RATIO) + 1
+
+    def _containment_candidates(self, lowered: str) -> set:
+        """
+        查找可能满足原有包含规则的已有标题
+        较短标题的开头子串一定出现在较长标题靠前（不超过长度的20%）的位置上
+        :param lowered: 原始标题小写
+        :return: 候选标题编号
+        """
+        key_length = self.CONTAIN_KEY_LENGTH
+        candidates = set()
+        if len(lowered) < key_length / self.LEGACY_MIN_RATIO:
+            candidates.update(self._short_titles)
+        if len(lowered) >= key_length:
+            # 当前标题被已有的较长标题包含
+            candidates.update(self._windows.get(lowered[:key_length], ()))
+            # 已有的较短标题被当前标题包含
+            for start in range(min(self._window_count(len(lowered)), len(lowered) - key_length + 1)):
+                candidates.update(self._prefixes.get(lowered[start:start + key_length], ()))
+        return candidates
+
+    def _index_containment(self, lowered: str, item_id: int) -> None:
+        """把标题加入包含规则的索引"""
+        key_length = self.CONTAIN_KEY_LENGTH
+        if len(lowered) < key_length / self.LEGACY_MIN_RATIO and len(self._short_titles) < self.max_bucket_size:
+            self._short_titles.append(item_id)
+        if len(lowered) >= key_length:
+            self._add_to_bucket(self._prefixes, lowered[:key_length], item_id)
+            for start in range(min(self._window_count(len(lowered)), len(lowered) - key_length + 1)):
+                self._add_to_bucket(self._windows, lowered[start:start + key_length], item_id)
+
+    def add_if_new(self, title: str) -> bool:
+        """
+        如果索引中没有相似标题，则加入索引
+        :param title: 标题
+        :return: True表示是新标题（已加入），False表示与已有标题相似
+        """
+        normalized = self._normalize(title)
+        if not normalized:
+            # 空标题无法判断相似度，直接保留（与原逻辑一致）
+            return True
+        if normalized in self._exact:
+            return False
 
-        legal_tech_secondary = [
-            'legal tech', 'legal technology', 'legaltech', 'lawtech',
-            'law tech', 'law technology', '法律科技',
-            'legal automation', 'contract AI', 'e-discovery', 'document automation'
+        lowered = title.lower().strip()
+        shingles = self._shingles(normalized)
+        signature = self._signature(shingles)
+        band_keys = [
+            tuple(signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
         ]
 
-        # ========== AI重大新闻关键词（国内 + 国外）==========
-        # 国内AI公司和产品
-        ai_major_domestic = [
-            # 大模型产品
-            'kimi', '月之暗面', 'moonshot',
-            'chatglm', '智谱ai', '智谱AI', 'zhipu',
-            '文心一言', 'ernie bot', '百度ai', 'paddlepaddle',
-            '通义千问', 'qwen', '阿里ai', '通义',
-            '混元', 'hunyuan', '腾讯ai',
-            '星火', '讯飞ai', 'iflytek',
-            '豆包', '字节ai', '字节跳动ai',
-            '百川智能', 'baichuan',
-            '零一万物', '01ai', 'yi模型',
-            '深度求索', 'deepseek',
-            '面壁智能', 'cpm',
-            'minimax',
-            # 开源模型
-            '开源大模型', '开源llm', '开源模型',
-            '世界模型', 'world model',
-            # AI公司动态
-            '发布', '上线', '推出', '开源', '更新',
-            # AI技术和应用
-            'gpt-4', 'gpt4', 'claude', 'anthropic',
-            'gemini', 'llama', 'meta ai', 'grok',
-            'sora', 'midjourney', 'stable diffusion',
-            'chatgpt', 'openai',
-        ]
+        # 只和至少有一个分段完全相同的候选标题比较
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
 
-        # AI技术关键词
-        ai_tech_keywords = [
-            '大模型', 'llm', '大型语言模型',
-            'aigc', '生成式ai', 'generative ai',
-            'transformer', 'attention机制',
-            '多模态', '视觉模型', '语音模型',
-            'agent', 'ai代理', '智能体',
-            'rag', '检索增强生成',
-            '微调', 'fine-tuning', '训练',
-        ]
+        for candidate in candidates:
+            candidate_title, candidate_shingles = self._titles[candidate]
+            common = len(shingles & candidate_shingles)
+            jaccard = common / (len(shingles) + len(candidate_shingles) - common)
+            if jaccard >= self.threshold or self._is_legacy_similar(lowered, candidate_title):
+                return False
 
-        # 合并所有关键词（用于筛选）
-        all_keywords = legal_tech_keywords + legal_tech_secondary + ai_major_domestic + ai_tech_keywords
-
-        def calculate_relevance_score(article):
-            """计算单条新闻的相关性得分"""
-            score = 0
-            title = str(article.get('title') or '').lower()
-            description = str(article.get('description') or '').lower()
-            source = article.get('source', {}).get('name', '') or ''
-
-            # 1. 来源权重（0-30分）
-            source_weight = source_weights.get(source, 1.0)
-            score += source_weight * 10
-
-            # 2. 关键词匹配得分
-            # 检查标题中的关键词匹配
-            for keyword in all_keywords:
-                if keyword in title:
-                    # 法律科技核心关键词
-                    if keyword in legal_tech_keywords:
-                        score += 60  # 最高优先级
-                    # AI重大新闻关键词
-                    elif keyword in ai_major_domestic:
-                        score += 55  # 高优先级
-                    # 法律科技次要关键词
-                    elif keyword in legal_tech_secondary:
-                        score += 45
-                    # AI技术关键词
-                    elif keyword in ai_tech_keywords:
-                        score += 40
-                    else:
-                        score += 20
+        # 原有的包含规则不依赖LSH分桶是否命中（短标题的shingle很少，分桶容易错过）
+        for candidate in self._containment_candidates(lowered) - candidates:
+            if self._is_legacy_similar(lowered, self._titles[candidate][0]):
+                return False
 
-                    # 关键词在标题开头（前50个字符）
-                    if len(title) > 0 and keyword in title[:50]:
-                        score += 10
+        item_id = len(self._titles)
+        self._titles.append((lowered, shingles))
+        self._exact.add(normalized)
+        for band, key in enumerate(band_keys):
+            self._add_to_bucket(self._buckets[band], key, item_id)
+        self._index_containment(lowered, item_id)
+        return True
 
-            # 检查描述中的关键词匹配
-            desc_keyword_count = sum(1 for kw in all_keywords if kw in description)
-            score += desc_keyword_count * 5  # 每个关键词+5分
+    def __len__(self) -> int:
+        return len(self._titles)
 
-            # 3. 时间新鲜度得分（0-20分）
-            pub_time = article.get('publishedAt', '')
-            if pub_time:
-                try:
-                    from datetime import timezone, timedelta
-                    dt = datetime.fromisoformat(pub_time.replace('Z', '+00:00'))
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=timezone.utc)
-
-                    now = datetime.now(timezone.utc)
-                    time_diff = (now - dt).total_seconds() / 3600  # 小时
-
-                    if time_diff <= 24:
-                        score += 20  # 24小时内
-                    elif time_diff <= 48:
-                        score += 10  # 48小时内
-                    elif time_diff <= 168:  # 7天
-                        score += 5
-                except:
-                    pass
 
-            return score
+# ====================== 新闻特征提取 ======================
+def parse_published_at(published_at: str) -> Optional[datetime]:
+    """
+    解析ISO格式的发布时间（兼容末尾的Z）
+    :param published_at: 发布时间字符串
+    :return: datetime对象（保留原始时区，无时区的视为UTC），无法解析时返回None
+    """
+    if not published_at:
+        return None
+    try:
+        dt = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
 
-        def classify_article(article):
-            """将新闻分类为：法律科技新闻、AI重大新闻、或其他"""
-            title = str(article.get('title') or '').lower()
-            description = str(article.get('description') or '').lower()
 
-            # 检查是否包含法律科技关键词
-            has_legal_tech = any(kw in title or kw in description for kw in legal_tech_keywords + legal_tech_secondary)
+def extract_article_features(article: Dict, now: Optional[datetime] = None) -> Dict:
+    """
+    提取新闻的基础特征（小写标题/描述、发布时间、距今小时数），结果缓存在 article['_features']
+    同一条新闻只计算一次，后续的筛选、评分、分类和渲染直接复用
+    :param article: 新闻
+    :param now: 当前时间（UTC），默认取调用时的时间
+    :return: 特征字典
+    """
+    features = article.get('_features')
+    if features is not None:
+        return features
 
-            # 检查是否包含AI重大新闻关键词
-            has_ai_major = any(kw in title or kw in description for kw in ai_major_domestic + ai_tech_keywords)
+    published_dt = parse_published_at(article.get('publishedAt', ''))
+    age_hours = None
+    if published_dt is not None:
+        now = now or datetime.now(timezone.utc)
+        age_hours = (now - published_dt).total_seconds() / 3600
 
-            if has_legal_tech and has_ai_major:
-                return 'both'  # 两者都是
-            elif has_legal_tech:
-                return 'legal_tech'
-            elif has_ai_major:
-                return 'ai_major'
-            else:
-                return 'other'
+    features = {
+        'title': str(article.get('title') or '').lower(),
+        'description': str(article.get('description') or '').lower(),
+        'published_dt': published_dt,
+        'age_hours': age_hours,
+    }
+    article['_features'] = features
+    return features
 
-        # 为每条新闻计算得分、分类并保留通过基本筛选的
-        scored_articles = []
-        for article in unique_articles:
-            title = str(article.get('title') or '').lower()
-            description = str(article.get('description') or '').lower()
-            pub_time = article.get('publishedAt', '')
-
-            # 时间筛选：只保留3天内的新闻
-            is_recent = True
-            if pub_time:
+
+# ====================== 已推送新闻记录模块 ======================
+# URL中常见的跟踪参数，规范化URL时去掉
+_TRACKING_PARAMS = {'spm', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'from', 'share', 'share_token'}
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL，使同一篇文章的不同链接形式得到相同的结果
+    （协议和域名小写、去掉www.、去掉跟踪参数和锚点、参数排序、去掉末尾斜杠）
+    :param url: 原始URL
+    :return: 规范化后的URL
+    """
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    netloc = parts.netloc.lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in _TRACKING_PARAMS
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(query), ''))
+
+
+def title_fingerprint(title: str) -> str:
+    """
+    计算标题指纹（转小写、去掉空白和标点后取哈希），用于识别换了链接的同一篇文章
+    :param title: 标题
+    :return: 指纹字符串，标题为空时返回空字符串
+    """
+    normalized = TitleLSHIndex._NON_WORD_RE.sub('', str(title or '').lower())
+    if not normalized:
+        return ''
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class SeenArticleStore:
+    """已推送新闻记录类：用SQLite记录每条新闻首次出现和推送的时间，跨运行跳过已推送的新闻"""
+
+    def __init__(self, db_path: str, retention_days: int = 30):
+        """
+        打开（或创建）记录数据库
+        :param db_path: SQLite数据库文件路径
+        :param retention_days: 记录保留天数，过期记录会被清理
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen_articles ('
+            ' url_key TEXT PRIMARY KEY,'
+            ' title_fp TEXT,'
+            ' title TEXT,'
+            ' first_seen TEXT NOT NULL,'
+            ' pushed_at TEXT)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_title_fp ON seen_articles (title_fp)')
+        self._conn.commit()
+        self._cleanup(retention_days)
+
+    def _cleanup(self, retention_days: int) -> None:
+        """删除超过保留天数的记录"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            self._conn.execute('DELETE FROM seen_articles WHERE first_seen < ?', (cutoff,))
+            self._conn.commit()
+
+    def filter_unpushed(self, articles: List[Dict]) -> List[Dict]:
+        """
+        去掉已推送过的新闻（URL或标题指纹匹配），并记录新出现新闻的首次出现时间
+        :param articles: 新闻列表
+        :return: 未推送过的新闻列表
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        remaining = []
+        with self._lock:
+            pushed_urls = {row[0] for row in self._conn.execute(
+                'SELECT url_key FROM seen_articles WHERE pushed_at IS NOT NULL')}
+            pushed_titles = {row[0] for row in self._conn.execute(
+                "SELECT title_fp FROM seen_articles WHERE pushed_at IS NOT NULL AND title_fp != ''")}
+
+            new_rows = []
+            for article in articles:
+                url_key = normalize_url(article.get('url', ''))
+                title_fp = title_fingerprint(article.get('title', ''))
+                if url_key in pushed_urls or (title_fp and title_fp in pushed_titles):
+                    continue
+                remaining.append(article)
+                if url_key:
+                    new_rows.append((url_key, title_fp, str(article.get('title') or '')[:200], now))
+
+            # 已存在的记录保留原来的首次出现时间
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO seen_articles (url_key, title_fp, title, first_seen) VALUES (?, ?, ?, ?)',
+                new_rows
+            )
+            self._conn.commit()
+        return remaining
+
+    def mark_pushed(self, articles: List[Dict]) -> int:
+        """
+        记录这些新闻已推送
+        :param articles: 已推送的新闻列表
+        :return: 记录的条数
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for article in articles:
+            url_key = normalize_url(article.get('url', ''))
+            if url_key:
+                rows.append((url_key, title_fingerprint(article.get('title', '')),
+                             str(article.get('title') or '')[:200], now, now))
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO seen_articles (url_key, title_fp, title, first_seen, pushed_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(url_key) DO UPDATE SET pushed_at = excluded.pushed_at',
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# ====================== 多源新闻获取模块 ======================
+class NewsFetcher:
+    """新闻获取类：从多个来源（NewsAPI + RSS）获取法律科技新闻"""
+
+    def __init__(self, config: Config, seen_store: Optional[SeenArticleStore] = None):
+        """
+        初始化新闻获取器
+        :param config: 配置对象
+        :param seen_store: 已推送新闻记录（可选，用于跳过已推送过的新闻）
+        """
+        self.config = config
+        self.seen_store = seen_store
+        # 共享的连接池Session：RSS和NewsAPI都通过它下载，连接可以复用
+        self.session = create_http_session(config)
+        # RSS条件请求缓存（ETag / Last-Modified）
+        self.feed_cache = FeedCache(config.feed_cache_dir) if config.feed_cache_enabled else None
+        # 默认配置档（未指定配置档时评分、分类使用它的关键词和来源权重）
+        self.profile = NewsProfile(NewsProfile.DEFAULT_NAME, max_articles=config.max_articles,
+                                   webhooks=config.feishu_webhooks, seen_store_path=config.seen_store_path)
+        # 本次运行的指标（由 LegalTechNewsBot 在每次运行前设置，未设置时不统计）
+        self.metrics: Optional[RunMetrics] = None
+
+    def _stage(self, name: str):
+        """统计一个阶段的耗时（未启用运行指标时什么也不做）"""
+        return self.metrics.stage(name) if self.metrics else nullcontext()
+
+    def _record_source(self, name: str, **fields) -> None:
+        """记录新闻源的指标（未启用运行指标时什么也不做）"""
+        if self.metrics:
+            self.metrics.record_source(name, **fields)
+
+    @staticmethod
+    def _downloaded_bytes(response: requests.Response) -> int:
+        """实际从网络读取的字节数（压缩传输时为压缩后的大小；流式解析提前停止时只计已读取的部分）"""
+        try:
+            return int(response.raw.tell())
+        except Exception:
+            return len(response._content) if isinstance(response._content, bytes) else 0
+
+    def _download_feed(self, rss_url: str, cached: Optional[Dict],
+                       stream_max_items: Optional[int] = None) -> Tuple[requests.Response, Optional[List]]:
+        """
+        通过共享Session下载RSS内容（带条件请求头、总超时和大小上限）
+        :param rss_url: RSS链接
+        :param cached: 该源的缓存（用于发送If-None-Match / If-Modified-Since）
+        :param stream_max_items: 指定时边下载边流式解析，取够条数后停止下载
+        :return: (响应对象, 流式解析出的条目)；未使用流式解析或解析失败时条目为None，
+                 此时响应体已完整读取到 response._content
+        """
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('modified'):
+                headers['If-Modified-Since'] = cached['modified']
+
+        deadline = time.monotonic() + self.config.feed_download_timeout
+        response = self.session.get(
+            rss_url,
+            headers=headers,
+            timeout=(self.config.http_connect_timeout, self.config.http_read_timeout),
+            stream=True
+        )
+        try:
+            response.raise_for_status()
+            if response.status_code == 304:
+                return response, None
+
+            # 分块读取（gzip等压缩内容按块解压），检查总耗时和总大小：
+            # read超时只限制两次数据之间的间隔，服务器"慢慢吐数据"时需要这个总时限兜底
+            received = []
+            body_chunks = self._iter_feed_body(response, deadline, received)
+
+            if stream_max_items:
+                min_published = datetime.now(timezone.utc) - timedelta(hours=self.config.news_max_age_hours)
                 try:
-                    from datetime import timezone, timedelta
-                    dt = datetime.fromisoformat(pub_time.replace('Z', '+00:00'))
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=timezone.utc)
+                    entries = list(iter_feed_entries(body_chunks, stream_max_items, min_published))
+                    return response, entries
+                except ElementTree.ParseError as e:
+                    logger.debug(f"RSS流式解析失败，改用feedparser: {e}")
+
+            # 读完剩余内容（流式解析失败时接着已读取的部分继续）
+            for _ in body_chunks:
+                pass
+            response._content = b''.join(received)
+        finally:
+            response.close()
+        return response, None
+
+    def _iter_feed_body(self, response: requests.Response, deadline: float, received: List[bytes]):
+        """
+        逐块产出响应体（已解压），并记录到received中；超过总时限时抛出超时，超过大小上限时截断
+        :param response: 以stream=True发起的响应
+        :param deadline: 下载截止时间（time.monotonic()）
+        :param received: 用于保存已读取的字节块
+        """
+        total = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if time.monotonic() > deadline:
+                raise requests.exceptions.Timeout(
+                    f"下载超过{self.config.feed_download_timeout}秒"
+                )
+            remaining = self.config.feed_max_bytes - total
+            # 恰好等于上限时继续读取：只有确实还有多出的内容时才截断并提示
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                if chunk:
+                    received.append(chunk)
+                    yield chunk
+                logger.warning(f"⚠️ RSS内容超过{self.config.feed_max_bytes // 1024}KB，只读取前面部分: {response.url}")
+                return
+            total += len(chunk)
+            received.append(chunk)
+            yield chunk
+
+    def _fetch_from_rss(self, rss_url: str, source_name: str, max_items: int = 10) -> List[Dict]:
+        """
+        从RSS源获取新闻（支持ETag / Last-Modified条件请求，源未更新时直接使用缓存）
+        :param rss_url: RSS链接
+        :param source_name: 源名称（用于日志）
+        :param max_items: 最大获取数量
+        :return: 新闻列表
+        """
+        articles = []
+        cached = self.feed_cache.get(rss_url) if self.feed_cache else None
+        try:
+            logger.info(f"📡 正在获取 {source_name} RSS...")
+            stream_max_items = max_items if self.config.feed_streaming_parse else None
+            response, stream_entries = self._download_feed(rss_url, cached, stream_max_items)
+
+            self._record_source(source_name, bytes=self._downloaded_bytes(response))
+
+            # 304 Not Modified：源内容没有变化，直接返回上次解析好的结果
+            if cached and response.status_code == 304:
+                self._record_source(source_name, status='not_modified')
+                articles = cached.get('articles', [])
+                # 上次解析的条数不够时，用缓存的原始内容重新解析（无需重新下载）
+                if (cached.get('max_items') or 0) < max_items:
+                    body = self.feed_cache.get_body(rss_url)
+                    if body:
+                        feed = feedparser.parse(body, response_headers={
+                            'content-location': rss_url
+                        })
+                        articles = self._parse_feed_entries(feed.entries, source_name, max_items)
+                logger.info(f"♻️ {source_name} RSS未更新，使用缓存 {len(articles)} 条")
+                return articles[:max_items]
+
+            if stream_entries is not None:
+                # 流式解析：只解析了需要的条目，没有完整的原始内容可供缓存
+                entries, body = stream_entries, None
+            else:
+                # 把下载好的字节交给feedparser解析（带上响应头，便于识别编码）
+                feed = feedparser.parse(response.content, response_headers={
+                    'content-type': response.headers.get('Content-Type', ''),
+                    'content-location': response.url
+                })
+
+                if feed.bozo:
+                    logger.warning(f"⚠️ {source_name} RSS解析可能有误: {feed.bozo_exception}")
+                entries, body = feed.entries, response.content
+
+            if not entries:
+                logger.warning(f"⚠️ {source_name} RSS没有返回任何内容")
+                return articles
+
+            articles = self._parse_feed_entries(entries, source_name, max_items)
+
+            # 保存验证器、原始内容和解析结果，供下次条件请求使用
+            etag = response.headers.get('ETag')
+            modified = response.headers.get('Last-Modified')
+            if self.feed_cache and (etag or modified):
+                self.feed_cache.put(rss_url, etag, modified, articles,
+                                    body=body, max_items=max_items)
+
+            logger.info(f"✅ {source_name} RSS获取 {len(articles)} 条")
 
-                    now = datetime.now(timezone.utc)
-                    time_diff = (now - dt).total_seconds() / 86400  # 转换为天数
+        except Exception as e:
+            logger.error(f"❌ 获取 {source_name} RSS失败: {e}")
+            self._record_source(source_name, status='error', error=type(e).__name__)
+            # 网络异常时退回到上次缓存的结果（总比没有好）
+            if cached and cached.get('articles'):
+                articles = cached['articles'][:max_items]
+                self._record_source(source_name, status='stale_cache')
+                logger.info(f"♻️ {source_name} 使用上次缓存的 {len(articles)} 条新闻")
 
-                    if time_diff > 3:  # 超过3天
-                        is_recent = False
+        return articles
+
+    def _parse_feed_entries(self, entries, source_name: str, max_items: int) -> List[Dict]:
+        """
+        将feedparser解析出的条目转换为标准化的新闻格式
+        :param entries: feedparser条目列表
+        :param source_name: 源名称
+        :param max_items: 最大获取数量
+        :return: 新闻列表
+        """
+        articles = []
+        for entry in entries[:max_items]:
+            # 提取发布时间
+            published_at = ''
+            if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                try:
+                    published_at = datetime(*entry.published_parsed[:6]).isoformat()
+                except:
+                    pass
+            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+                try:
+                    published_at = datetime(*entry.updated_parsed[:6]).isoformat()
                 except:
                     pass
 
-            if not is_recent:
-                continue  # 跳过超过3天的新闻
+            # 构建标准化的新闻格式
+            # 清理description中的HTML标签
+            description_raw = entry.get('description', '')
+            title_raw = entry.get('title', '无标题')
 
-            # 基本筛选：必须包含至少一个关键词
-            contains_keyword = any(
-                kw in title or kw in description
-                for kw in all_keywords
+            # 清理HTML标签、HTML实体和多余空格
+            description_clean = html_to_text(description_raw)
+
+            # 如果description为空或与标题相同，尝试从content中获取
+            if not description_clean or description_clean.lower() == title_raw.lower():
+                if hasattr(entry, 'content') and entry.get('content'):
+                    content_raw = entry.get('content', [{}])[0].get('value', '')
+                    # 限制长度（取前200个字符），超长正文只处理开头部分
+                    description_clean = html_to_text(content_raw, max_chars=201)
+                    if len(description_clean) > 200:
+                        description_clean = description_clean[:200] + '...'
+
+                # 如果content也没有或者还是和标题一样，就留空
+                if not description_clean or description_clean.lower() == title_raw.lower():
+                    description_clean = ''
+
+            article = {
+                'title': title_raw,
+                'description': description_clean,
+                'url': entry.get('link', ''),
+                'source': {'name': source_name},
+                'publishedAt': published_at,
+                'content': entry.get('content', [{}])[0].get('value', '') if hasattr(entry, 'content') else ''
+            }
+            articles.append(article)
+
+        return articles
+
+    def _get_sources(self) -> List[Dict]:
+        """
+        按固定顺序列出所有新闻源（顺序决定合并结果的顺序，进而影响去重保留哪一条）
+        :return: 新闻源列表，每项包含分组、名称和抓取函数
+        """
+        rss_sources = [
+            # (分组, RSS链接, 源名称, 最大条数)
+            # ---------- 法律科技专业源 ----------
+            ('法律科技RSS源', self.config.rss_google_news, 'Google News', 20),
+            ('法律科技RSS源', self.config.rss_jdsupra, 'JDSupra Legal Tech', 20),
+            ('法律科技RSS源', self.config.rss_artificial_lawyer, 'Artificial Lawyer', 20),
+            ('法律科技RSS源', self.config.rss_above_the_law, 'Above the Law', 20),
+            ('法律科技RSS源', self.config.rss_techlaw, 'TechLaw', 10),
+            # ---------- 国内科技媒体源 ----------
+            ('国内科技媒体', self.config.rss_huxiu, '虎嗅网', 15),
+            ('国内科技媒体', self.config.rss_ttm, '钛媒体', 15),
+            ('国内科技媒体', self.config.rss_infoq, 'InfoQ', 15),
+            ('国内科技媒体', self.config.rss_geekpark, '极客公园', 10),
+            # ---------- AI专业媒体源 ----------
+            ('AI专业媒体', self.config.rss_qbitai, '量子位', 20),
+            ('AI专业媒体', self.config.rss_jiqizhixin, '机器之心', 20),
+            ('AI专业媒体', self.config.rss_aiyuan, '新智元', 15),
+            ('AI专业媒体', self.config.rss_techcrunch_ai, 'TechCrunch AI', 15),
+            ('AI专业媒体', self.config.rss_verge_ai, 'The Verge AI', 10),
+        ]
+
+        sources = []
+        for group, url, name, max_items in rss_sources:
+            sources.append({
+                'group': group,
+                'name': name,
+                # 用默认参数绑定当前循环变量，避免闭包晚绑定
+                'fetch': lambda url=url, name=name, max_items=max_items: self._fetch_from_rss(url, name, max_items=max_items)
+            })
+
+        # NewsAPI作为补充来源，放在最后
+        sources.append({
+            'group': 'NewsAPI',
+            'name': 'NewsAPI',
+            'fetch': self._fetch_from_newsapi
+        })
+        return sources
+
+    def _fetch_from_newsapi(self) -> List[Dict]:
+        """
+        从NewsAPI获取近3天的法律科技新闻（补充来源）
+        :return: 新闻列表
+        """
+        try:
+            # 计算日期范围（前3天）
+            from_date = (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
+            today = datetime.now().strftime('%Y-%m-%d')
+            logger.info(f"📅 NewsAPI搜索日期范围: {from_date} 至 {today}（近3天）")
+
+            # 构建搜索关键词
+            precise_keywords = 'legal tech OR legaltech OR legal AI OR law technology OR 法律科技 OR 法律AI'
+            logger.info(f"🔑 NewsAPI搜索关键词: {precise_keywords}")
+
+            # 构建API请求参数
+            params = {
+                'q': precise_keywords,
+                'sortBy': 'relevance',
+                'from': from_date,
+                'to': today,
+                'pageSize': 20,  # 获取20条用于补充
+                'apiKey': self.config.news_api_key
+            }
+
+            # 发送API请求
+            response = self.session.get(
+                self.config.news_api_url,
+                params=params,
+                timeout=(self.config.http_connect_timeout, 10)
             )
+            self._record_source('NewsAPI', bytes=len(response.content))
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get('status') == 'ok':
+                newsapi_articles = data.get('articles', [])
+                logger.info(f"✅ NewsAPI获取 {len(newsapi_articles)} 条新闻")
+                return newsapi_articles
+
+        except Exception as e:
+            logger.warning(f"⚠️ NewsAPI获取失败: {e}，继续使用RSS源")
+            self._record_source('NewsAPI', status='error', error=type(e).__name__)
+
+        return []
+
+    def _fetch_sources_concurrently(self, sources: List[Dict]) -> List[List[Dict]]:
+        """
+        使用有上限的线程池并发抓取所有新闻源
+        每个源从开始执行起单独计时，超时的源直接放弃（记为空结果），不影响其他源
+        :param sources: 新闻源列表（见 _get_sources）
+        :return: 与sources顺序一一对应的新闻列表
+        """
+        results = [[] for _ in sources]
+        if not sources:
+            return results
+
+        max_workers = max(1, min(self.config.fetch_max_workers, len(sources)))
+        source_timeout = self.config.fetch_source_timeout
+
+        # 记录每个源真正开始执行的时间（排队等待的时间不计入超时）
+        started_at = {}
+        # 已放弃的源：之后才返回的结果不再计入指标
+        abandoned = set()
+
+        def run(index, source):
+            started_at[index] = time.monotonic()
+            articles = source['fetch']()
+            if index not in abandoned:
+                self._record_source(source['name'], latency=round(time.monotonic() - started_at[index], 3),
+                                    entries=len(articles or []))
+            return articles
+
+        # 按源的固定顺序登记指标，输出顺序与完成先后无关
+        for source in sources:
+            self._record_source(source['name'])
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='news-fetch')
+        futures = {executor.submit(run, i, source): i for i, source in enumerate(sources)}
+        pending = set(futures)
+
+        # 兜底总时限：即使线程池被卡死的源占满，也不会无限等待排队中的源
+        rounds = -(-len(sources) // max_workers)
+        hard_deadline = time.monotonic() + source_timeout * rounds + 1
+
+        try:
+            while pending:
+                now = time.monotonic()
+
+                # 放弃已经超时的源
+                for future in list(pending):
+                    index = futures[future]
+                    if index in started_at and now - started_at[index] > source_timeout and not future.done():
+                        pending.discard(future)
+                        abandoned.add(index)
+                        self._record_source(sources[index]['name'], latency=round(now - started_at[index], 3),
+                                            status='timeout', error='TimeoutError')
+                        logger.warning(f"⏰ {sources[index]['name']} 抓取超时（超过{source_timeout}秒），已跳过")
+
+                if pending and now >= hard_deadline:
+                    for future in pending:
+                        future.cancel()
+                        abandoned.add(futures[future])
+                        self._record_source(sources[futures[future]]['name'], status='timeout', error='TimeoutError')
+                        logger.warning(f"⏰ {sources[futures[future]]['name']} 未能在总时限内完成，已跳过")
+                    break
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    index = futures[future]
+                    try:
+                        results[index] = future.result() or []
+                    except Exception as e:
+                        logger.error(f"❌ 获取 {sources[index]['name']} 失败: {e}")
+                        self._record_source(sources[index]['name'], status='error', error=type(e).__name__)
+        finally:
+            # 不等待被放弃的线程，尚未开始的任务直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    def _deduplicate(self, articles: List[Dict]) -> List[Dict]:
+        """
+        两层去重：先按URL去重，再用MinHash/LSH索引去掉标题相似的新闻（保留先出现的）
+        :param articles: 合并后的新闻列表
+        :return: 去重后的新闻列表
+        """
+        # 第一层去重：URL去重
+        seen_urls = set()
+        unique_by_url = []
+        for article in articles:
+            url = article.get('url', '')
+            if url and url not in seen_urls:
+                seen_urls.add(url)
+                unique_by_url.append(article)
+
+        logger.info(f"✅ URL去重后剩余 {len(unique_by_url)} 条新闻")
+
+        # 第二层去重：标题相似度去重（每条新闻只和LSH分桶命中的候选标题比较）
+        title_index = TitleLSHIndex(
+            threshold=self.config.title_similarity_threshold,
+            num_perm=self.config.title_minhash_permutations
+        )
+        unique_articles = []
+        for article in unique_by_url:
+            title = str(article.get('title') or '')
+            if title_index.add_if_new(title):
+                unique_articles.append(article)
+            else:
+                logger.debug(f"🔄 发现相似标题，已去重: {title[:50]}...")
+
+        removed_count = len(unique_by_url) - len(unique_articles)
+        if removed_count > 0:
+            logger.info(f"✅ 标题相似度去重：移除 {removed_count} 条重复新闻")
+
+        logger.info(f"✅ 最终去重后剩余 {len(unique_articles)} 条新闻")
+        return unique_articles
+
+    def _calculate_relevance_score(self, article: Dict, profile: Optional[NewsProfile] = None) -> float:
+        """
+        计算单条新闻的相关性得分（需先由 _score_articles 写入关键词命中）
+        :param article: 新闻
+        :param profile: 配置档（默认 self.profile）
+        :return: 得分
+        """
+        profile = profile or self.profile
+        features = article['_features']
+        score = 0
+        source = article.get('source', {}).get('name', '') or ''
+
+        # 1. 来源权重（0-30分）
+        source_weight = profile.source_weights.get(source, profile.default_source_weight)
+        score += source_weight * 10
+
+        # 2. 关键词匹配得分
+        # 检查标题中的关键词匹配（同一关键词出现多次只计一次）
+        title_keywords = {}
+        for hit in features['title_hits']:
+            end = hit.start + len(hit.keyword)
+            if hit.keyword not in title_keywords or end < title_keywords[hit.keyword][1]:
+                title_keywords[hit.keyword] = (hit.tier, end)
+
+        for keyword, (tier, first_end) in title_keywords.items():
+            # 按关键词层级加分（法律科技核心 > AI重大新闻 > 法律科技次要 > AI技术）
+            score += profile.tier_scores.get(tier, 20)
+
+            # 关键词在标题开头（前50个字符）
+            if first_end <= 50:
+                score += 10
+
+        # 检查描述中的关键词匹配
+        desc_keyword_count = len({hit.keyword for hit in features['desc_hits']})
+        score += desc_keyword_count * 5  # 每个关键词+5分
+
+        # 3. 时间新鲜度得分（0-20分）
+        age_hours = features['age_hours']
+        if age_hours is not None:
+            if age_hours <= 24:
+                score += 20  # 24小时内
+            elif age_hours <= 48:
+                score += 10  # 48小时内
+            elif age_hours <= 168:  # 7天
+                score += 5
+
+        return score
+
+    def _classify_article(self, article: Dict, profile: Optional[NewsProfile] = None) -> str:
+        """
+        将新闻分类为：法律科技新闻、AI重大新闻、或其他（需先由 _score_articles 写入关键词命中）
+        :param article: 新闻
+        :param profile: 配置档（默认 self.profile）
+        :return: 'legal_tech' / 'ai_major' / 'both' / 'other'
+        """
+        profile = profile or self.profile
+        features = article['_features']
+        tiers = {hit.tier for hit in features['title_hits']}
+        tiers.update(hit.tier for hit in features['desc_hits'])
+
+        # 检查是否包含法律科技关键词
+        has_legal_tech = bool(tiers & profile.legal_tech_tiers)
+
+        # 检查是否包含AI重大新闻关键词
+        has_ai_major = bool(tiers & profile.ai_major_tiers)
+
+        if has_legal_tech and has_ai_major:
+            return 'both'  # 两者都是
+        elif has_legal_tech:
+            return 'legal_tech'
+        elif has_ai_major:
+            return 'ai_major'
+        else:
+            return 'other'
+
+    def _score_articles(self, articles: List[Dict], profile: Optional[NewsProfile] = None) -> List[Dict]:
+        """
+        筛选（近3天 + 至少命中一个关键词）、评分、分类，并按得分从高到低排序
+        多个配置档共用同一批新闻，因此不修改传入的新闻，而是返回写入了本配置档结果的浅拷贝
+        :param articles: 去重后的新闻列表
+        :param profile: 配置档（默认 self.profile）
+        :return: 通过筛选的新闻列表（已写入 _score、_category 和含关键词命中的 _features）
+        """
+        profile = profile or self.profile
+        now = datetime.now(timezone.utc)
+        scored_articles = []
+        for article in articles:
+            # 基础特征（小写标题/描述、发布时间）各配置档共用，只计算一次
+            base_features = extract_article_features(article, now)
+
+            # 时间筛选：只保留3天内的新闻（NEWS_MAX_AGE_HOURS）
+            if base_features['age_hours'] is not None and base_features['age_hours'] > self.config.news_max_age_hours:
+                continue  # 跳过超过3天的新闻
 
-            if contains_keyword:
-                score = calculate_relevance_score(article)
-                category = classify_article(article)
-                article['_score'] = score
-                article['_category'] = category
-                scored_articles.append(article)
+            # 标题和描述各扫描一次，筛选、评分、分类都使用这次扫描的结果
+            title_hits = profile.matcher.find_all(base_features['title'])
+            desc_hits = profile.matcher.find_all(base_features['description'])
+
+            # 基本筛选：必须包含至少一个关键词
+            if title_hits or desc_hits:
+                scored = dict(article)
+                scored['_features'] = dict(base_features, title_hits=title_hits, desc_hits=desc_hits)
+                scored['_score'] = self._calculate_relevance_score(scored, profile)
+                scored['_category'] = self._classify_article(scored, profile)
+                scored_articles.append(scored)
 
         # 按得分排序（从高到低）
         scored_articles.sort(key=lambda x: x.get('_score', 0), reverse=True)
+        return scored_articles
+
+    def fetch_legal_tech_news(self) -> List[Dict]:
+        """
+        从多个来源（14个RSS + NewsAPI）获取法律科技新闻（默认配置档）
+        :return: 新闻列表，每条新闻包含标题、描述、URL、来源等
+        """
+        return self.select_articles(self.fetch_shared_articles(), self.profile, self.seen_store)
+
+    def fetch_shared_articles(self) -> List[Dict]:
+        """
+        并发抓取所有新闻源并去重（所有配置档共用这一次抓取，配置档再多也只下载一遍）
+        :return: 去重后的新闻列表（未评分）
+        """
+        logger.info("🔍 开始获取法律科技新闻（多源模式）...")
+
+        # ========== 第一步：并发获取所有新闻源（RSS + NewsAPI）==========
+        sources = self._get_sources()
+        logger.info("\n" + "=" * 60)
+        logger.info(f"📡 开始并发获取 {len(sources)} 个新闻源（最多 {self.config.fetch_max_workers} 个并发）...")
+        logger.info("=" * 60)
+
+        # 检查NewsAPI配额
+        self.config.news_api_request_count += 1
+        remaining_requests = self.config.news_api_daily_limit - self.config.news_api_request_count
+
+        if remaining_requests <= 0:
+            logger.warning(f"⚠️ NewsAPI配额已用完，仅使用RSS源")
+        elif remaining_requests <= 10:
+            logger.warning(f"⚠️ NewsAPI配额即将用尽：剩余 {remaining_requests}/{self.config.news_api_daily_limit} 次")
 
-        logger.info(f"✅ 评分后剩余 {len(scored_articles)} 条精准新闻")
+        fetch_start = time.monotonic()
+        with self._stage('fetch'):
+            source_results = self._fetch_sources_concurrently(sources)
+        logger.info(f"⏱️ 新闻源抓取耗时 {time.monotonic() - fetch_start:.1f} 秒")
+
+        # 按源的固定顺序合并，保证后续去重和排序结果稳定
+        all_articles = []
+        group_count = {}
+        for source, articles in zip(sources, source_results):
+            all_articles.extend(articles)
+            group_count[source['group']] = group_count.get(source['group'], 0) + len(articles)
+
+        for group, count in group_count.items():
+            logger.info(f"✅ {group}共获取 {count} 条新闻")
+        logger.info(f"✅ 所有来源共获取 {len(all_articles)} 条新闻")
+
+        # ========== 第二步：智能去重（URL + 标题相似度）==========
+        logger.info("\n" + "=" * 60)
+        logger.info("🔍 开始智能去重...")
+        logger.info("=" * 60)
+        with self._stage('dedup'):
+            unique_articles = self._deduplicate(all_articles)
+
+            # 预先提取基础特征，各配置档并行评分时直接复用
+            now = datetime.now(timezone.utc)
+            for article in unique_articles:
+                extract_article_features(article, now)
+
+        return unique_articles
+
+    def select_articles(self, articles: List[Dict], profile: Optional[NewsProfile] = None,
+                        seen_store: Optional[SeenArticleStore] = None) -> List[Dict]:
+        """
+        按配置档筛选新闻：跳过已推送过的、评分分类、取前N条（不同配置档可以在多个线程中同时调用）
+        :param articles: fetch_shared_articles 返回的新闻列表（不会被修改）
+        :param profile: 配置档（默认 self.profile）
+        :param seen_store: 该配置档的已推送新闻记录（可选）
+        :return: 新闻列表；没有符合条件的新闻时返回只含 no_news_message 的列表
+        """
+        profile = profile or self.profile
+        prefix = profile.log_prefix
+
+        # 只使用配置档指定的来源
+        if profile.sources is not None:
+            articles = [a for a in articles if (a.get('source', {}).get('name') or '') in profile.sources]
+            logger.info(f"{prefix}📡 按来源筛选后剩余 {len(articles)} 条新闻")
+
+        # ========== 第三步：跳过之前已推送过的新闻（跨运行记录）==========
+        with self._stage(profile.stage_name('dedup')):
+            if seen_store:
+                before_count = len(articles)
+                articles = seen_store.filter_unpushed(articles)
+                skipped_count = before_count - len(articles)
+                if skipped_count > 0:
+                    logger.info(f"{prefix}♻️ 跳过 {skipped_count} 条之前已推送过的新闻，剩余 {len(articles)} 条")
+
+        # ========== 第四步：智能评分排序（来源权重 + 相关性评分）+ 新闻分类 ==========
+        logger.info(f"{prefix}🎯 开始智能评分排序和分类...")
+        with self._stage(profile.stage_name('score')):
+            scored_articles = self._score_articles(articles, profile)
+
+        logger.info(f"{prefix}✅ 评分后剩余 {len(scored_articles)} 条精准新闻")
 
         # 统计分类
         legal_tech_count = sum(1 for a in scored_articles if a.get('_category') in ['legal_tech', 'both'])
         ai_major_count = sum(1 for a in scored_articles if a.get('_category') in ['ai_major', 'both'])
         both_count = sum(1 for a in scored_articles if a.get('_category') == 'both')
 
-        logger.info(f"📊 新闻分类统计：")
+        logger.info(f"{prefix}📊 新闻分类统计：")
         logger.info(f"   • 法律科技新闻：{legal_tech_count} 条")
         logger.info(f"   • AI重大新闻：{ai_major_count} 条")
         if both_count > 0:
@@ -754,7 +2740,7 @@ class NewsFetcher:
 
         # 显示得分最高的前3条新闻
         if scored_articles:
-            logger.info("\n🏆 得分最高的新闻预览:")
+            logger.info(f"\n{prefix}🏆 得分最高的新闻预览:")
             for i, article in enumerate(scored_articles[:3], 1):
                 score = article.get('_score', 0)
                 title = article.get('title', '无标题')[:50]
@@ -762,21 +2748,16 @@ class NewsFetcher:
                 category = article.get('_category', 'unknown')
                 logger.info(f"   {i}. [{score}分] [{category}] {source}: {title}...")
 
-        # ========== 第六步：处理无新闻的情况 ==========
+        # ========== 第五步：处理无新闻的情况 ==========
         if len(scored_articles) == 0:
-            logger.warning("⚠️ 今日暂无精准的法律科技/AI相关新闻")
+            logger.warning(f"{prefix}⚠️ 今日暂无精准的法律科技/AI相关新闻")
             return [{
                 'no_news_message': '今日暂无精准的法律科技/AI相关新闻'
             }]
 
-        # ========== 第七步：取前N条（按综合得分排序）==========
-        final_articles = scored_articles[:self.config.max_articles]
-        logger.info(f"🎯 最终选取 {len(final_articles)} 条新闻（按综合得分排序）")
-
-        # 保留分类信息
-        for article in final_articles:
-            if '_category' not in article:
-                article['_category'] = classify_article(article)
+        # ========== 第六步：取前N条（按综合得分排序）==========
+        final_articles = scored_articles[:profile.max_articles]
+        logger.info(f"{prefix}🎯 最终选取 {len(final_articles)} 条新闻（按综合得分排序）")
 
         # 显示来源分布
         source_count = {}
@@ -784,14 +2765,125 @@ class NewsFetcher:
             source = article.get('source', {}).get('name', '未知')
             source_count[source] = source_count.get(source, 0) + 1
 
-        logger.info("\n📊 新闻来源分布:")
+        logger.info(f"\n{prefix}📊 新闻来源分布:")
         for source, count in source_count.items():
             logger.info(f"   • {source}: {count} 条")
 
         return final_articles
 
 
+# ====================== 提示词Token估算模块 ======================
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数（不依赖各家的分词器）
+    英文、数字、URL等ASCII字符约4个字符1个token；中文、emoji、分隔线等非ASCII字符基本每个字符1个token
+    :param text: 文本
+    :return: 估算的token数
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+# RSS描述中常见的套话（"The post ... appeared first on ..."、"Continue reading" 等）
+_BOILERPLATE_RE = re.compile(
+    r'The post .{1,300}? appeared first on [^.\n]{1,100}\.?'
+    r'|(?:Continue reading|Read more|Read the full (?:story|article))\b.*$'
+    r'|\[(?:…|\.\.\.)\]',
+    re.IGNORECASE | re.MULTILINE
+)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?。！？])\s+')
+
+
+def strip_boilerplate(descriptions: List[str], min_length: int = 20) -> List[str]:
+    """
+    去掉描述中的套话：已知的RSS尾巴，以及在两条及以上新闻中重复出现的句子
+    :param descriptions: 描述列表
+    :param min_length: 参与重复检测的最短句子长度（太短的句子重复很正常）
+    :return: 处理后的描述列表（顺序不变）
+    """
+    split = [
+        [sentence for sentence in _SENTENCE_SPLIT_RE.split(_BOILERPLATE_RE.sub('', text or '').strip()) if sentence]
+        for text in descriptions
+    ]
+    counts = {}
+    for sentences in split:
+        for key in {' '.join(sentence.lower().split()) for sentence in sentences if len(sentence) >= min_length}:
+            counts[key] = counts.get(key, 0) + 1
+    repeated = {key for key, count in counts.items() if count > 1}
+    return [
+        ' '.join(sentence for sentence in sentences if ' '.join(sentence.lower().split()) not in repeated)
+        for sentences in split
+    ]
+
+
+def shorten_text(text: str, max_chars: int) -> str:
+    """
+    截断文本到指定长度，尽量在单词边界处截断
+    :param text: 文本
+    :param max_chars: 最大字符数
+    :return: 截断后的文本（被截断时以…结尾）
+    """
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(' ')
+    if space > max_chars * 0.6:
+        cut = cut[:space]
+    return cut.rstrip(' ,;:，；：') + '…'
+
+
+def parse_json_response(text: str):
+    """
+    从模型返回的文本中解析JSON（兼容 ```json 代码块和前后多余的说明文字）
+    :param text: 模型返回的文本
+    :return: 解析后的数据，解析失败时抛出ValueError
+    """
+    text = (text or '').strip()
+    fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    # 截取第一个 [ 或 { 到最后一个 ] 或 } 之间的内容
+    starts = [i for i in (text.find('['), text.find('{')) if i >= 0]
+    end = max(text.rfind(']'), text.rfind('}'))
+    if not starts or end <= min(starts):
+        raise ValueError("返回内容中没有JSON")
+    return json.loads(text[min(starts):end + 1])
+
+
 # ====================== Claude AI 内容生成模块 ======================
+# Claude各模型可缓存前缀的最小token数（低于该长度时接口会忽略cache_control，既不写入也不读取缓存）
+# 按模型名前缀匹配，未列出的模型为 CLAUDE_CACHE_DEFAULT_MIN_TOKENS
+CLAUDE_CACHE_MIN_TOKENS = (
+    ('claude-haiku-4', 4096),
+    ('claude-opus-4-5', 4096),
+    ('claude-3-5-haiku', 2048),
+    ('claude-3-haiku', 2048),
+)
+CLAUDE_CACHE_DEFAULT_MIN_TOKENS = 1024
+
+
+def claude_cache_min_tokens(model: str) -> int:
+    """
+    查询模型可缓存前缀的最小token数
+    :param model: Claude模型名称
+    :return: 最小token数
+    """
+    for prefix, min_tokens in CLAUDE_CACHE_MIN_TOKENS:
+        if model.startswith(prefix):
+            return min_tokens
+    return CLAUDE_CACHE_DEFAULT_MIN_TOKENS
+
+
+class LLMRequestCancelled(Exception):
+    """对冲请求中另一个提供商已胜出，中止仍在接收的流式响应"""
+
+
 class NewsletterGenerator:
     """Newsletter生成类：使用Claude API将新闻整理成中文格式"""
 
@@ -802,6 +2894,46 @@ class NewsletterGenerator:
         """
         self.config = config
         self.session = requests.Session()
+        # 翻译缓存：同一段原文只翻译一次（跨运行有效）
+        self.translation_cache = TranslationCache(
+            config.translation_cache_path, config.translation_cache_max_bytes
+        ) if config.translation_cache_enabled else None
+        # 每个线程复用一个翻译器（GoogleTranslator在translate时会修改自身参数，不能跨线程共享）
+        self._translator_local = threading.local()
+        # 每次大模型调用的耗时指标（总耗时、首字延迟、生成速度）
+        self.llm_metrics = []
+        # 单条新闻摘要缓存（增量模式）：已生成过的新闻直接复用中文标题和摘要
+        self.article_summary_cache = ArticleSummaryCache(
+            config.article_summary_path, config.article_summary_retention_days
+        ) if config.newsletter_mode == 'incremental' else None
+        # 容错调用：指数退避重试、重试预算、跨运行保存的熔断器
+        self.resilience = ResilientCaller(
+            CircuitBreaker(config.circuit_breaker_path, config.circuit_breaker_threshold,
+                           config.circuit_breaker_cooldown),
+            max_retries=config.llm_max_retries,
+            base_delay=config.retry_base_delay,
+            max_delay=config.retry_max_delay,
+            retry_budget=config.retry_budget
+        )
+        # 对冲请求统计：各提供商的启动/胜出/失败/取消（流式）/放弃（非流式，请求无法中止）次数和成功耗时
+        # 多个配置档并行生成时共用，需加锁
+        self.hedge_stats = {
+            provider: {'started': 0, 'wins': 0, 'failures': 0, 'cancelled': 0, 'abandoned': 0, 'latencies': []}
+            for provider in ('claude', 'glm')
+        }
+        self._hedge_lock = threading.Lock()
+        # 对冲请求只用于一次调用生成整份Newsletter（single模式、text格式），其他模式下不生效，启动时提示一次
+        if config.llm_hedge_mode in ('delayed', 'immediate') \
+                and (config.newsletter_mode == 'incremental' or config.llm_output_format == 'json'):
+            logger.warning(f"⚠️ 对冲请求（LLM_HEDGE_MODE={config.llm_hedge_mode}）只在 NEWSLETTER_MODE=single 且 "
+                           f"LLM_OUTPUT_FORMAT=text 时生效，当前为 {config.newsletter_mode} / "
+                           f"{config.llm_output_format}，不使用对冲请求")
+        # 大模型响应缓存：同一天重跑时，相同的提示词直接复用上次的生成结果
+        self.llm_cache = LLMResponseCache(
+            config.llm_cache_dir, config.llm_cache_ttl_hours * 3600
+        ) if config.llm_cache_enabled else None
+        # 提示词缓存未生效的原因只提示一次（前缀过短 / 接口未返回缓存读写）
+        self._prompt_cache_warnings = set()
 
     def generate_newsletter(self, articles: List[Dict]) -> str:
         """
@@ -857,13 +2989,484 @@ class NewsletterGenerator:
                 logger.error("❌ 请检查GitHub Secrets中是否配置了GLM_API_KEY或CLAUDE_API_KEY")
                 return self._fallback_newsletter(articles)
 
+        # 首选提供商处于熔断状态时，直接切换到另一个可用的提供商
+        other = 'glm' if provider == 'claude' else 'claude'
+        other_key = self.config.glm_api_key if other == 'glm' else self.config.claude_api_key
+        if self.resilience.breaker.is_open(provider) and other_key and not self.resilience.breaker.is_open(other):
+            logger.info(f"🔌 {provider.upper()} 处于熔断状态，切换到 {other.upper()} API")
+            provider = other
+
         logger.info(f"✅ 将使用 {provider.upper()} API 生成Newsletter")
+
+        # 增量模式：只为新出现的新闻生成摘要，本地拼装Newsletter
+        if self.article_summary_cache is not None:
+            return self._generate_incremental(articles, provider)
+
+        # JSON输出模式：模型只返回翻译后的标题和摘要，Newsletter在本地拼装
+        if self.config.llm_output_format == 'json':
+            return self._generate_structured(articles, provider)
+
+        # 两个API都配置时可以开启对冲请求，降低单个提供商变慢时的尾部延迟
+        if self.config.llm_hedge_mode in ('delayed', 'immediate') \
+                and self.config.claude_api_key and self.config.glm_api_key:
+            return self._generate_hedged(articles, provider)
+
         # 使用选定的provider生成Newsletter
         if provider == 'glm':
             return self._call_glm_api(articles)
         else:  # claude
             return self._call_claude_api(articles)
 
+    def _generate_hedged(self, articles: List[Dict], primary: str) -> str:
+        """
+        对冲请求：先请求首选提供商，超过LLM_HEDGE_DELAY秒未返回（或已失败）时启动另一个提供商
+        （immediate模式下同时启动），采用先返回且格式正确的结果，并取消另一路请求
+        :param articles: 新闻列表
+        :param primary: 首选提供商（claude / glm）
+        :return: 格式化后的中文Newsletter文本
+        """
+        secondary = 'glm' if primary == 'claude' else 'claude'
+        delay = 0.0 if self.config.llm_hedge_mode == 'immediate' else max(0.0, self.config.llm_hedge_delay)
+        logger.info(f"🏁 对冲请求模式（{self.config.llm_hedge_mode}）：首选{primary.upper()}，"
+                    f"{'同时' if delay == 0 else f'{delay:.0f}秒后'}启动{secondary.upper()}")
+
+        news_summary = self._prepare_news_summary(articles)
+        prompts = {
+            provider: self._build_prompt_parts(news_summary, self._provider_label(provider))
+            for provider in (primary, secondary)
+        }
+
+        # 任一提供商命中缓存都无需发起请求
+        for provider in (primary, secondary):
+            cached = self._get_cached_response(provider, self._provider_model(provider), ''.join(prompts[provider]))
+            if cached is not None:
+                return cached
+
+        cancel_event = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='llm-hedge')
+        start = time.monotonic()
+        futures = {executor.submit(self._hedge_attempt, primary, prompts[primary], cancel_event): primary}
+        pending = set(futures)
+        secondary_started = False
+        winner = None
+
+        try:
+            while pending or not secondary_started:
+                if not secondary_started and (not pending or time.monotonic() - start >= delay):
+                    if pending:
+                        logger.info(f"⏳ {primary.upper()} 超过{delay:.0f}秒未返回，启动{secondary.upper()}对冲请求")
+                    else:
+                        logger.info(f"🔄 {primary.upper()} 未返回有效结果，启动{secondary.upper()}")
+                    future = executor.submit(self._hedge_attempt, secondary, prompts[secondary], cancel_event)
+                    futures[future] = secondary
+                    pending.add(future)
+                    secondary_started = True
+
+                timeout = None if secondary_started else max(0.0, start + delay - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                # 两路可能在同一轮中都已结束：逐个处理（首选提供商优先），先成功的一路胜出
+                for future in sorted(done, key=lambda f: futures[f] != primary):
+                    provider = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self._count_hedge(provider, 'failures')
+                        logger.warning(f"⚠️ 对冲请求：{provider.upper()} 失败: {e}")
+                        continue
+                    if winner is None:
+                        winner = (provider, result)
+                    else:
+                        self._count_hedge(provider, 'abandoned')
+                        logger.info(f"🛑 {provider.upper()} 同时返回，结果未被采用")
+                if winner:
+                    break
+        finally:
+            # 通知仍在进行的请求停止（流式请求会在下一段数据到达时中止；非流式请求无法中止，结果会被丢弃），不等待其结束
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if winner is None:
+            logger.error("❌ 对冲请求：Claude和GLM都未返回有效结果")
+            self._log_hedge_stats()
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            return "抱歉，Newsletter生成失败，且备用方案已禁用"
+
+        provider, newsletter_content = winner
+        self._count_hedge(provider, 'wins')
+        for future in pending:
+            if future.cancelled():
+                continue  # 尚未开始执行，请求没有发出
+            if self.config.llm_streaming:
+                self._count_hedge(futures[future], 'cancelled')
+                logger.info(f"🛑 已取消{futures[future].upper()}请求")
+            else:
+                self._count_hedge(futures[future], 'abandoned')
+                logger.info(f"🛑 已放弃{futures[future].upper()}请求（非流式请求无法中止，将在后台完成后丢弃结果）")
+        logger.info(f"🏆 对冲请求：{provider.upper()} 胜出（耗时 {time.monotonic() - start:.2f}秒）")
+        self._log_hedge_stats()
+
+        self._store_cached_response(provider, self._provider_model(provider), ''.join(prompts[provider]),
+                                    newsletter_content)
+        logger.info(f"✅ Newsletter生成成功（使用{self._provider_label(provider)} API）")
+        return newsletter_content
+
+    def _hedge_attempt(self, provider: str, prompt: Tuple[str, str], cancel_event: threading.Event) -> str:
+        """
+        对冲请求中的单路调用：只尝试一次（由另一个提供商代替重试），结果需通过格式校验
+        :param provider: 提供商（claude / glm）
+        :param prompt: (固定指令, 新闻内容)
+        :param cancel_event: 另一路胜出时被设置
+        :return: 修正落款后的Newsletter，失败时抛出异常
+        """
+        self._count_hedge(provider, 'started')
+        start = time.monotonic()
+        instructions, content = prompt
+        if provider == 'claude':
+            request = lambda: self._request_claude(content, cancel_event, system=instructions)
+        else:
+            request = lambda: self._request_glm(instructions + content, 60, cancel_event)
+        # 熔断中的提供商立即失败，另一路会马上启动；另一路胜出后本路的结果不计入熔断器
+        newsletter_content = self.resilience.call(provider, request, max_retries=0, cancel_event=cancel_event)
+        if cancel_event.is_set():
+            raise LLMRequestCancelled(f"{provider.upper()} 已被取消")
+
+        newsletter_content = self._fix_signature(newsletter_content, self._provider_label(provider))
+        if not self._is_valid_newsletter(newsletter_content):
+            raise ValueError(f"{provider.upper()} 返回内容格式不符合要求")
+
+        with self._hedge_lock:
+            self.hedge_stats[provider]['latencies'].append(round(time.monotonic() - start, 3))
+        return newsletter_content
+
+    def hedge_snapshot(self) -> Dict[str, Dict]:
+        """
+        对冲统计的副本（线程安全）
+        :return: {提供商: {started, wins, failures, cancelled, abandoned, latencies}}
+        """
+        with self._hedge_lock:
+            return {provider: dict(stats, latencies=list(stats['latencies']))
+                    for provider, stats in self.hedge_stats.items()}
+
+    def _count_hedge(self, provider: str, key: str) -> None:
+        """对冲统计计数加1（线程安全）"""
+        with self._hedge_lock:
+            self.hedge_stats[provider][key] += 1
+
+    def _is_valid_newsletter(self, newsletter_content: str) -> bool:
+        """
+        格式校验：必须包含日报标题和至少一条 ➤ 新闻
+        :param newsletter_content: 模型生成的Newsletter
+        :return: 是否可用
+        """
+        return bool(newsletter_content) and '日报' in newsletter_content and '➤' in newsletter_content
+
+    def _log_hedge_stats(self) -> None:
+        """输出对冲请求的累计统计"""
+        parts = []
+        for provider, stats in self.hedge_snapshot().items():
+            if not stats['started']:
+                continue
+            latencies = stats['latencies']
+            avg = f"{sum(latencies) / len(latencies):.2f}秒" if latencies else '-'
+            parts.append(f"{provider.upper()} 启动{stats['started']}次/胜出{stats['wins']}次/"
+                         f"失败{stats['failures']}次/取消{stats['cancelled']}次/放弃{stats['abandoned']}次/平均耗时{avg}")
+        if parts:
+            logger.info(f"📊 对冲统计：{'；'.join(parts)}")
+
+    def _provider_label(self, provider: str) -> str:
+        """提供商在提示词和落款中的名称"""
+        return 'Claude' if provider == 'claude' else 'GLM'
+
+    def _provider_model(self, provider: str) -> str:
+        """提供商当前使用的模型"""
+        return self.config.claude_model if provider == 'claude' else self.config.glm_model
+
+    def _generate_incremental(self, articles: List[Dict], provider: str) -> str:
+        """
+        增量模式：每条新闻的中文标题和摘要只生成一次（按URL缓存），只把新新闻分批并发发给模型，本地拼装Newsletter
+        模型调用次数和耗时只随新新闻数量增长
+        :param articles: 新闻列表
+        :param provider: 提供商（claude / glm）
+        :return: 格式化后的中文Newsletter文本
+        """
+        label = self._provider_label(provider)
+        logger.info(f"🧩 增量模式：逐条生成新闻摘要（使用{label} API），本地拼装Newsletter")
+
+        sections = self._select_sections(articles)
+        summaries = {}
+        missing = []
+        for _, section_articles in sections:
+            for article in section_articles:
+                cached = self.article_summary_cache.get(article)
+                if cached is not None:
+                    summaries[id(article)] = cached
+                else:
+                    missing.append(article)
+        logger.info(f"♻️ 新闻摘要缓存命中 {len(summaries)} 条，需要新生成 {len(missing)} 条")
+
+        failed = []
+        if missing:
+            batch_size = max(1, self.config.article_summary_batch_size)
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+            workers = max(1, min(self.config.article_summary_workers, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary') as executor:
+                futures = {executor.submit(self._summarize_batch, provider, batch): batch for batch in batches}
+                for future in futures:
+                    batch = futures[future]
+                    try:
+                        generated = future.result()
+                    except Exception as e:
+                        logger.warning(f"⚠️ {label} 生成{len(batch)}条新闻摘要失败: {e}")
+                        generated = {}
+                    for article in batch:
+                        item = generated.get(id(article))
+                        if item:
+                            summaries[id(article)] = item
+                            self.article_summary_cache.put(article, item['title'], item['summary'], provider)
+                        else:
+                            failed.append(article)
+            self.article_summary_cache.save()
+
+        if failed:
+            # 所有新闻都没有拿到模型结果时，整体改用备用方案（与单次调用模式失败时一致）
+            if not summaries:
+                logger.error(f"❌ {label} API未能生成任何新闻摘要")
+                if self.config.enable_fallback:
+                    logger.info("🔄 自动切换到备用方案...")
+                    return self._fallback_newsletter(articles)
+                return "抱歉，Newsletter生成失败，且备用方案已禁用"
+            # 部分失败的新闻使用免费翻译补齐，下次运行会重新交给模型生成
+            logger.info(f"🔄 {len(failed)}条新闻改用免费翻译")
+            summaries.update(self._translate_summaries(failed))
+
+        logger.info(f"✅ Newsletter生成成功（增量模式，使用{label} API）")
+        return self._render_newsletter(sections, summaries, label)
+
+    def _select_sections(self, articles: List[Dict]) -> List[Tuple[str, List[Dict]]]:
+        """
+        按提示词的排版规则选出要展示的区块：法律科技新闻、AI重大新闻，每个区块最多5条
+        :param articles: 新闻列表
+        :return: [(区块标题, 新闻列表)]，没有新闻的区块不返回
+        """
+        legal_tech_articles = [a for a in articles if a.get('_category') in ('legal_tech', 'both')]
+        ai_major_articles = [a for a in articles if a.get('_category') == 'ai_major']
+        sections = []
+        if legal_tech_articles:
+            sections.append(("📌【法律科技新闻】", legal_tech_articles[:5]))
+        if ai_major_articles:
+            sections.append(("🎂【AI重大新闻】", ai_major_articles[:5]))
+        return sections
+
+    def _generate_structured(self, articles: List[Dict], provider: str) -> str:
+        """
+        JSON输出模式：一次调用让模型只返回每条新闻的中文标题和摘要，Newsletter由本地按模板拼装
+        （模型不再重复输出来源、时间、链接、分隔线和落款，输出token和生成时间大幅减少）
+        :param articles: 新闻列表
+        :param provider: 提供商（claude / glm）
+        :return: 格式化后的中文Newsletter文本
+        """
+        label = self._provider_label(provider)
+        model = self._provider_model(provider)
+        logger.info(f"🤖 开始使用{label} API生成Newsletter（JSON输出，本地排版）...")
+
+        sections = self._select_sections(articles)
+        selected = [article for _, section_articles in sections for article in section_articles]
+        prompt_parts = self._build_summary_prompt_parts(selected)
+        prompt = ''.join(prompt_parts)
+
+        try:
+            # 缓存模型返回的原始JSON，命中时重新排版（日期等始终是当天的）
+            response_text = self._get_cached_response(provider, model, prompt)
+            cached = response_text is not None
+            if not cached:
+                response_text = self.resilience.call(provider, lambda: self._request_text(provider, prompt_parts))
+
+            summaries = self._parse_summaries(response_text, selected)
+            if not summaries:
+                raise ValueError(f"{label} 返回的JSON中没有可用的新闻摘要")
+            if not cached and self.llm_cache:
+                self.llm_cache.put(provider, model, prompt, response_text)
+
+            missing = [article for article in selected if id(article) not in summaries]
+            if missing:
+                logger.warning(f"⚠️ {label} 返回结果缺少{len(missing)}条新闻，改用免费翻译")
+                summaries.update(self._translate_summaries(missing))
+
+            logger.info(f"✅ Newsletter生成成功（使用{label} API，JSON输出）")
+            return self._render_newsletter(sections, summaries, label)
+
+        except CircuitOpenError as e:
+            logger.warning(f"🔌 {e}")
+        except Exception as e:
+            logger.error(f"❌ {label} API生成Newsletter失败: {e}")
+
+        if self.config.enable_fallback:
+            logger.info("🔄 自动切换到备用方案...")
+            return self._fallback_newsletter(articles)
+        return "抱歉，Newsletter生成失败，且备用方案已禁用"
+
+    def _request_text(self, provider: str, prompt: Tuple[str, str]) -> str:
+        """
+        按提供商发送一次请求，返回模型生成的原始文本
+        :param provider: 提供商（claude / glm）
+        :param prompt: (固定指令, 新闻内容)，Claude把固定指令作为可缓存的system前缀
+        """
+        instructions, content = prompt
+        if provider == 'claude':
+            return self._request_claude(content, system=instructions)
+        return self._request_glm(instructions + content, 60)
+
+    def _summarize_batch(self, provider: str, batch: List[Dict]) -> Dict[int, Dict]:
+        """
+        让模型为一小批新闻生成中文标题和摘要（要求返回JSON）
+        :param provider: 提供商（claude / glm）
+        :param batch: 新闻列表
+        :return: {id(新闻): {'title': ..., 'summary': ...}}，缺失或格式不对的新闻不返回
+        """
+        prompt = self._build_summary_prompt_parts(batch)
+        text = self.resilience.call(provider, lambda: self._request_text(provider, prompt))
+        return self._parse_summaries(text, batch)
+
+    def _build_summary_prompt_parts(self, batch: List[Dict]) -> Tuple[str, str]:
+        """
+        构建只要求返回JSON（每条新闻的中文标题和摘要）的提示词
+        :param batch: 新闻列表，编号从1开始
+        :return: (固定指令, 新闻内容)，两者直接拼接即为完整提示词
+        """
+        lines = []
+        for i, article in enumerate(batch, 1):
+            title = self._clean_html(article.get('title', '无标题'))
+            description = shorten_text(self._clean_html(article.get('description') or ''), 600)
+            lines.append(f"{i}. 标题: {title}")
+            if description:
+                lines.append(f"   描述: {description}")
+        instructions = """你是一个专业的法律科技新闻编辑。请把下面每条新闻的标题翻译成简洁的中文标题，并用一两句话写出中文摘要（不超过100字）。
+
+只输出JSON数组，不要输出任何其他内容，格式如下：
+[{"id": 1, "title": "中文标题", "summary": "中文摘要"}]
+
+"""
+        return instructions, '\n'.join(lines)
+
+    def _parse_summaries(self, text: str, batch: List[Dict]) -> Dict[int, Dict]:
+        """
+        解析模型返回的JSON摘要
+        :param text: 模型返回的文本
+        :param batch: 提示词中的新闻列表（id为其中的编号）
+        :return: {id(新闻): {'title': ..., 'summary': ...}}，缺失或格式不对的新闻不返回
+        """
+        items = parse_json_response(text)
+        if isinstance(items, dict):
+            items = items.get('items') or items.get('news') or []
+        result = {}
+        for item in items:
+            try:
+                index = int(item.get('id')) - 1
+                title = str(item.get('title') or '').strip()
+            except (TypeError, ValueError, AttributeError):
+                continue
+            if 0 <= index < len(batch) and title:
+                result[id(batch[index])] = {'title': title, 'summary': str(item.get('summary') or '').strip()}
+        return result
+
+    def _translate_summaries(self, articles: List[Dict]) -> Dict[int, Dict]:
+        """
+        用免费翻译为新闻生成中文标题和摘要（模型生成失败时的补充方案，结果不写入摘要缓存）
+        :param articles: 新闻列表
+        :return: {id(新闻): {'title': ..., 'summary': ...}}
+        """
+        texts = {}
+        for article in articles:
+            texts[id(article)] = (
+                self._clean_html(article.get('title', '无标题')),
+                shorten_text(self._clean_html(article.get('description') or ''), 300)
+            )
+        deadline = time.monotonic() + self.config.fallback_render_deadline
+        translations = self._translate_batch([t for pair in texts.values() for t in pair if t], deadline=deadline)
+        if self.translation_cache:
+            self.translation_cache.save()
+        return {
+            key: {'title': translations.get(title, title), 'summary': translations.get(summary, summary)}
+            for key, (title, summary) in texts.items()
+        }
+
+    def _format_publish_time(self, article: Dict) -> str:
+        """
+        格式化发布时间（复用评分阶段已解析好的时间）
+        :param article: 新闻
+        :return: 形如 2025-01-01 08:00 的时间，无法解析时返回原始字符串
+        """
+        published_at = article.get('publishedAt', '')
+        if not published_at:
+            return ''
+        dt = extract_article_features(article)['published_dt']
+        return dt.strftime('%Y-%m-%d %H:%M') if dt else published_at
+
+    def _render_newsletter(self, sections: List[Tuple[str, List[Dict]]], summaries: Dict[int, Dict],
+                           api_provider: str) -> str:
+        """
+        按提示词中约定的格式在本地拼装Newsletter
+        :param sections: [(区块标题, 新闻列表)]
+        :param summaries: {id(新闻): {'title': 中文标题, 'summary': 中文摘要}}
+        :param api_provider: API提供商（'Claude' 或 'GLM'），用于落款
+        :return: Newsletter文本
+        """
+        lines = [
+            f"法律科技与AI日报 - {datetime.now().strftime('%Y年%m月%d日')}",
+            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+            ""
+        ]
+        for section_index, (section_title, section_articles) in enumerate(sections):
+            if section_index > 0:
+                lines.append("……………………………………………………………………………………………………")
+                lines.append("")
+            lines.append(section_title)
+            lines.append("")
+            for article in section_articles:
+                item = summaries.get(id(article)) or {}
+                lines.append(f"➤ {item.get('title') or self._clean_html(article.get('title', '无标题'))}")
+                if item.get('summary'):
+                    lines.append(f"摘要: {item['summary']}")
+                lines.append(f"来源: {article.get('source', {}).get('name', '未知来源')}")
+                publish_time = self._format_publish_time(article)
+                if publish_time:
+                    lines.append(f"发布时间: {publish_time}")
+                lines.append(f"链接: {article.get('url', '')}")
+                lines.append("")
+
+        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        lines.append(f"🤖 由法律科技新闻Bot自动推送（使用{api_provider} API翻译）")
+        return '\n'.join(lines)
+
+    def _get_cached_response(self, provider: str, model: str, prompt: str) -> Optional[str]:
+        """
+        查询大模型响应缓存
+        绕过规则：未启用缓存（LLM_CACHE_ENABLED=false）或要求强制刷新（LLM_CACHE_REFRESH=true）时不读缓存
+        :param provider: 提供商（claude / glm）
+        :param model: 模型名称
+        :param prompt: 完整提示词
+        :return: 缓存的Newsletter，没有命中时返回None
+        """
+        if not self.llm_cache:
+            return None
+        if self.config.llm_cache_refresh:
+            logger.info("🔄 已设置强制刷新，跳过大模型响应缓存")
+            return None
+        cached = self.llm_cache.get(provider, model, prompt)
+        if cached is not None:
+            logger.info(f"♻️ 命中{provider.upper()}响应缓存（相同提示词），跳过API调用")
+        return cached
+
+    def _store_cached_response(self, provider: str, model: str, prompt: str, content: str) -> None:
+        """
+        保存大模型响应：只缓存成功生成且带有正确落款的Newsletter（备用方案和错误提示不会被缓存）
+        强制刷新模式下仍会写入，用新结果覆盖旧缓存
+        """
+        if self.llm_cache and content and '由法律科技新闻Bot自动推送' in content:
+            self.llm_cache.put(provider, model, prompt, content)
+
     def _call_claude_api(self, articles: List[Dict]) -> str:
         """
         使用Claude API生成中文Newsletter
@@ -879,71 +3482,138 @@ class NewsletterGenerator:
         try:
             # 构建发送给Claude的新闻摘要
             news_summary = self._prepare_news_summary(articles)
+            instructions, content = self._build_prompt_parts(news_summary, 'Claude')
+            prompt = instructions + content
+
+            # 相同的提示词在有效期内直接返回缓存结果
+            cached = self._get_cached_response('claude', self.config.claude_model, prompt)
+            if cached is not None:
+                return cached
+
+            # 发送请求到Claude API（流式模式下逐段接收；超时、限流、服务端错误会退避重试）
+            # 固定不变的指令作为可缓存的system前缀，当天的新闻放在用户消息中
+            newsletter_content = self.resilience.call(
+                'claude', lambda: self._request_claude(content, system=instructions)
+            )
 
-            # 构建Claude API请求
-            headers = {
-                'x-api-key': self.config.claude_api_key,
-                'anthropic-version': '2023-06-01',
-                'content-type': 'application/json'
-            }
+            # 强制修正落款
+            newsletter_content = self._fix_signature(newsletter_content, 'Claude')
+
+            self._store_cached_response('claude', self.config.claude_model, prompt, newsletter_content)
+            logger.info("✅ Newsletter生成成功（使用Claude API）")
+            return newsletter_content
+
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"❌ Claude API请求失败: {e}")
+            if e.response.status_code == 401:
+                logger.error("💡 提示：请检查CLAUDE_API_KEY是否正确")
+            elif e.response.status_code == 429:
+                logger.error("💡 提示：请求过于频繁，请稍后再试")
+            elif e.response.status_code == 400:
+                logger.error("💡 提示：请求参数错误或API余额不足")
+
+            # 使用备用方案
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            else:
+                logger.error("❌ 备用方案已禁用，无法生成Newsletter")
+                return "抱歉，Newsletter生成失败，且备用方案已禁用"
+
+        except CircuitOpenError as e:
+            logger.warning(f"🔌 {e}")
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            else:
+                return "抱歉，Claude API暂不可用，且备用方案已禁用"
+
+        except requests.exceptions.Timeout:
+            logger.error("❌ Claude API请求超时")
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            else:
+                return "抱歉，API请求超时，且备用方案已禁用"
+
+        except Exception as e:
+            logger.error(f"❌ Newsletter生成失败: {e}")
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            else:
+                return "抱歉，Newsletter生成失败，且备用方案已禁用"
+
+    def _call_glm_api(self, articles: List[Dict]) -> str:
+        """
+        使用GLM API（智谱AI）生成中文Newsletter
+        :param articles: 新闻列表
+        :return: 格式化后的中文Newsletter文本
+        """
+        logger.info(f"🤖 开始使用GLM API生成Newsletter（模型：{self.config.glm_model}）...")
+
+        # 检查是否启用备用方案
+        if not self.config.enable_fallback:
+            logger.info("📌 备用方案已禁用，仅使用GLM API")
+
+        # 构建发送给GLM的新闻摘要和提示词（重试时复用）
+        news_summary = self._prepare_news_summary(articles)
+        prompt = self._build_prompt(news_summary, 'GLM')
+
+        # 相同的提示词在有效期内直接返回缓存结果
+        cached = self._get_cached_response('glm', self.config.glm_model, prompt)
+        if cached is not None:
+            return cached
 
-            # Claude API请求体
-            payload = {
-                'model': 'claude-3-5-haiku-20241022',  # 使用Haiku模型，成本低
-                'max_tokens': self.config.claude_max_tokens,  # 最大返回token数
-                'messages': [{
-                    'role': 'user',
-                    'content': self._build_prompt(news_summary, 'Claude')
-                }]
-            }
+        timeout = 60  # 增加到60秒超时
 
-            # 发送请求到Claude API
-            response = self.session.post(
-                self.config.claude_api_url,
-                headers=headers,
-                json=payload,
-                timeout=30  # 30秒超时
-            )
+        try:
+            # 发送请求到GLM API（超时、限流、服务端错误会退避重试）
+            newsletter_content = self.resilience.call('glm', lambda: self._request_glm(prompt, timeout))
 
-            # 检查响应状态
-            response.raise_for_status()
+            # 🔍 调试日志：输出GLM API返回的原始内容（最后500字符）
+            logger.info(f"🔍 GLM API返回内容（末尾500字符）:\n{newsletter_content[-500:]}")
 
-            # 解析响应
-            result = response.json()
-            newsletter_content = result['content'][0]['text']
-
-            # 强制修正落款：使用正则表达式匹配并替换最后的落款行
-            import re
-            # 匹配各种可能的落款格式
-            patterns_to_replace = [
-                r'🤖 由法律科技新闻Bot自动推送（使用备用翻译方案）',
-                r'🤖 由法律科技新闻Bot自动推送（使用免费翻译）',
-                r'🤖 由法律科技新闻Bot自动推送（使用本地翻译）',
-                r'🤖 由法律科技新闻Bot自动推送$',
-            ]
-            correct_signature = '🤖 由法律科技新闻Bot自动推送（使用Claude API翻译）'
-
-            # 尝试匹配并替换
-            for pattern in patterns_to_replace:
-                newsletter_content = re.sub(pattern, correct_signature, newsletter_content, flags=re.MULTILINE)
+            # 强制修正落款
+            newsletter_content = self._fix_signature(newsletter_content, 'GLM')
 
-            # 如果没有找到任何落款，在末尾添加正确的落款
-            if '由法律科技新闻Bot自动推送' not in newsletter_content:
-                newsletter_content = newsletter_content.rstrip() + '\n\n' + correct_signature
+            # 🔍 调试日志：输出修正后的内容（最后500字符）
+            logger.info(f"🔍 修正后的内容（末尾500字符）:\n{newsletter_content[-500:]}")
 
-            logger.info("✅ Newsletter生成成功（使用Claude API）")
+            self._store_cached_response('glm', self.config.glm_model, prompt, newsletter_content)
+            logger.info("✅ Newsletter生成成功（使用GLM API）")
             return newsletter_content
 
+        except CircuitOpenError as e:
+            logger.warning(f"🔌 {e}")
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            else:
+                return "抱歉，GLM API暂不可用，且备用方案已禁用"
+
+        except requests.exceptions.Timeout:
+            logger.error(f"❌ GLM API请求超时（超时限制{timeout}秒）")
+            if self.config.enable_fallback:
+                logger.info("🔄 自动切换到备用方案...")
+                return self._fallback_newsletter(articles)
+            else:
+                return "抱歉，API请求超时，且备用方案已禁用"
+
         except requests.exceptions.HTTPError as e:
-            logger.error(f"❌ Claude API请求失败: {e}")
+            logger.error(f"❌ GLM API请求失败: {e}")
             if e.response.status_code == 401:
-                logger.error("💡 提示：请检查CLAUDE_API_KEY是否正确")
+                logger.error("💡 提示：请检查GLM_API_KEY是否正确")
             elif e.response.status_code == 429:
                 logger.error("💡 提示：请求过于频繁，请稍后再试")
             elif e.response.status_code == 400:
                 logger.error("💡 提示：请求参数错误或API余额不足")
+                try:
+                    error_detail = e.response.json()
+                    logger.error(f"📋 错误详情：{error_detail}")
+                except:
+                    pass
 
-            # 使用备用方案
             if self.config.enable_fallback:
                 logger.info("🔄 自动切换到备用方案...")
                 return self._fallback_newsletter(articles)
@@ -951,14 +3621,6 @@ class NewsletterGenerator:
                 logger.error("❌ 备用方案已禁用，无法生成Newsletter")
                 return "抱歉，Newsletter生成失败，且备用方案已禁用"
 
-        except requests.exceptions.Timeout:
-            logger.error("❌ Claude API请求超时")
-            if self.config.enable_fallback:
-                logger.info("🔄 自动切换到备用方案...")
-                return self._fallback_newsletter(articles)
-            else:
-                return "抱歉，API请求超时，且备用方案已禁用"
-
         except Exception as e:
             logger.error(f"❌ Newsletter生成失败: {e}")
             if self.config.enable_fallback:
@@ -967,143 +3629,357 @@ class NewsletterGenerator:
             else:
                 return "抱歉，Newsletter生成失败，且备用方案已禁用"
 
-    def _call_glm_api(self, articles: List[Dict]) -> str:
+    def _fix_signature(self, newsletter_content: str, api_provider: str) -> str:
         """
-        使用GLM API（智谱AI）生成中文Newsletter
-        :param articles: 新闻列表
-        :return: 格式化后的中文Newsletter文本
+        强制修正落款：使用正则表达式匹配并替换最后的落款行
+        :param newsletter_content: 模型生成的Newsletter
+        :param api_provider: API提供商（'Claude' 或 'GLM'）
+        :return: 修正落款后的Newsletter
         """
-        logger.info(f"🤖 开始使用GLM API生成Newsletter（模型：{self.config.glm_model}）...")
+        # 匹配各种可能的落款格式
+        patterns_to_replace = [
+            r'🤖 由法律科技新闻Bot自动推送（使用备用翻译方案）',
+            r'🤖 由法律科技新闻Bot自动推送（使用免费翻译）',
+            r'🤖 由法律科技新闻Bot自动推送（使用本地翻译）',
+            r'🤖 由法律科技新闻Bot自动推送$',
+        ]
+        correct_signature = f'🤖 由法律科技新闻Bot自动推送（使用{api_provider} API翻译）'
 
-        # 检查是否启用备用方案
-        if not self.config.enable_fallback:
-            logger.info("📌 备用方案已禁用，仅使用GLM API")
+        # 尝试匹配并替换
+        for pattern in patterns_to_replace:
+            if re.search(pattern, newsletter_content, re.MULTILINE):
+                logger.warning(f"⚠️ 发现错误落款，正则匹配: {pattern}")
+                newsletter_content = re.sub(pattern, correct_signature, newsletter_content, flags=re.MULTILINE)
 
-        # 重试配置：最多重试2次，总共3次尝试
-        max_retries = 2
-        timeout = 60  # 增加到60秒超时
+        # 如果没有找到任何落款，在末尾添加正确的落款
+        if '由法律科技新闻Bot自动推送' not in newsletter_content:
+            logger.warning("⚠️ 未找到任何落款，将在末尾添加")
+            newsletter_content = newsletter_content.rstrip() + '\n\n' + correct_signature
 
-        for attempt in range(max_retries + 1):
-            try:
-                if attempt > 0:
-                    logger.info(f"🔄 第{attempt + 1}次尝试调用GLM API...")
-
-                # 构建发送给GLM的新闻摘要
-                news_summary = self._prepare_news_summary(articles)
-
-                # 构建GLM API请求
-                headers = {
-                    'Authorization': f'Bearer {self.config.glm_api_key}',
-                    'Content-Type': 'application/json'
-                }
-
-                # GLM API请求体
-                payload = {
-                    'model': self.config.glm_model,
-                    'max_tokens': self.config.glm_max_tokens,
-                    'messages': [{
-                        'role': 'user',
-                        'content': self._build_prompt(news_summary, 'GLM')
-                    }]
-                }
-
-                # 发送请求到GLM API（增加超时时间）
-                response = self.session.post(
-                    self.config.glm_api_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=timeout
-                )
+        return newsletter_content
 
-                # 检查响应状态
-                response.raise_for_status()
+    def _request_claude(self, prompt: str, cancel_event: Optional[threading.Event] = None,
+                        system: Optional[str] = None) -> str:
+        """
+        调用Claude API，返回模型生成的原始文本（出错时抛出异常，由调用方处理）
+        :param prompt: 用户消息（没有system时为完整提示词）
+        :param cancel_event: 对冲请求的取消信号（仅流式模式下能中途中止）
+        :param system: 每天都相同的固定指令；开启提示词缓存时作为带cache_control的system前缀发送，
+                       否则直接拼接在用户消息前面（与完整提示词完全一致）
+        :return: 生成的文本
+        """
+        # 构建Claude API请求
+        headers = {
+            'x-api-key': self.config.claude_api_key,
+            'anthropic-version': '2023-06-01',
+            'content-type': 'application/json'
+        }
 
-                # 解析响应
-                result = response.json()
-                newsletter_content = result['choices'][0]['message']['content']
-
-                # 🔍 调试日志：输出GLM API返回的原始内容（最后500字符）
-                logger.info(f"🔍 GLM API返回内容（末尾500字符）:\n{newsletter_content[-500:]}")
-
-                # 强制修正落款：使用正则表达式匹配并替换最后的落款行
-                import re
-                # 匹配各种可能的落款格式
-                patterns_to_replace = [
-                    r'🤖 由法律科技新闻Bot自动推送（使用备用翻译方案）',
-                    r'🤖 由法律科技新闻Bot自动推送（使用免费翻译）',
-                    r'🤖 由法律科技新闻Bot自动推送（使用本地翻译）',
-                    r'🤖 由法律科技新闻Bot自动推送$',
-                ]
-                correct_signature = '🤖 由法律科技新闻Bot自动推送（使用GLM API翻译）'
-
-                # 🔍 调试日志：检查原始内容中是否包含错误落款
-                for pattern in patterns_to_replace:
-                    if re.search(pattern, newsletter_content, re.MULTILINE):
-                        logger.warning(f"⚠️ 发现错误落款，正则匹配: {pattern}")
-
-                # 尝试匹配并替换
-                for pattern in patterns_to_replace:
-                    newsletter_content = re.sub(pattern, correct_signature, newsletter_content, flags=re.MULTILINE)
-
-                # 如果没有找到任何落款，在末尾添加正确的落款
-                if '由法律科技新闻Bot自动推送' not in newsletter_content:
-                    logger.warning("⚠️ 未找到任何落款，将在末尾添加")
-                    newsletter_content = newsletter_content.rstrip() + '\n\n' + correct_signature
-
-                # 🔍 调试日志：输出修正后的内容（最后500字符）
-                logger.info(f"🔍 修正后的内容（末尾500字符）:\n{newsletter_content[-500:]}")
-
-                logger.info("✅ Newsletter生成成功（使用GLM API）")
-                return newsletter_content
-
-            except requests.exceptions.Timeout as e:
-                logger.warning(f"⏰ GLM API请求超时（第{attempt + 1}次尝试，超时限制{timeout}秒）")
-                if attempt < max_retries:
-                    # 继续重试
-                    continue
-                else:
-                    # 所有重试都失败
-                    logger.error(f"❌ GLM API请求超时（已重试{max_retries}次）")
-                    if self.config.enable_fallback:
-                        logger.info("🔄 自动切换到备用方案...")
-                        return self._fallback_newsletter(articles)
-                    else:
-                        return "抱歉，API请求超时，且备用方案已禁用"
-
-            except requests.exceptions.HTTPError as e:
-                logger.error(f"❌ GLM API请求失败: {e}")
-                if e.response.status_code == 401:
-                    logger.error("💡 提示：请检查GLM_API_KEY是否正确")
-                elif e.response.status_code == 429:
-                    logger.error("💡 提示：请求过于频繁，请稍后再试")
-                elif e.response.status_code == 400:
-                    logger.error("💡 提示：请求参数错误或API余额不足")
-                    try:
-                        error_detail = e.response.json()
-                        logger.error(f"📋 错误详情：{error_detail}")
-                    except:
-                        pass
+        # Claude API请求体
+        payload = {
+            'model': self.config.claude_model,  # 默认使用Haiku模型，成本低
+            'max_tokens': self.config.claude_max_tokens,  # 最大返回token数
+            'messages': [{
+                'role': 'user',
+                'content': prompt
+            }]
+        }
+        if system and self._use_prompt_cache(system):
+            payload['system'] = [{
+                'type': 'text',
+                'text': system,
+                'cache_control': {'type': 'ephemeral'}
+            }]
+        elif system:
+            payload['messages'][0]['content'] = system + prompt
+
+        if self.config.llm_streaming:
+            return self._stream_claude(headers, payload, cancel_event)
+
+        start = time.monotonic()
+        response = self.session.post(
+            self.config.claude_api_url,
+            headers=headers,
+            json=payload,
+            timeout=30  # 30秒超时
+        )
 
-                # HTTP错误不重试，直接使用备用方案
-                if self.config.enable_fallback:
-                    logger.info("🔄 自动切换到备用方案...")
-                    return self._fallback_newsletter(articles)
-                else:
-                    logger.error("❌ 备用方案已禁用，无法生成Newsletter")
-                    return "抱歉，Newsletter生成失败，且备用方案已禁用"
+        # 检查响应状态
+        response.raise_for_status()
 
-            except Exception as e:
-                logger.error(f"❌ Newsletter生成失败: {e}")
-                # 其他错误不重试，直接使用备用方案
-                if self.config.enable_fallback:
-                    logger.info("🔄 自动切换到备用方案...")
-                    return self._fallback_newsletter(articles)
-                else:
-                    return "抱歉，Newsletter生成失败，且备用方案已禁用"
+        # 解析响应
+        result = response.json()
+        usage = result.get('usage') or {}
+        input_usage = self._claude_input_usage(usage)
+        self._check_prompt_cache_usage(payload, input_usage)
+        self._record_llm_metrics('claude', self.config.claude_model, start, None, usage.get('output_tokens'),
+                                 prompt=(system or '') + prompt, **input_usage)
+        return result['content'][0]['text']
+
+    def _use_prompt_cache(self, system: str) -> bool:
+        """
+        判断固定指令能否作为提示词缓存的前缀发送：低于模型的最小缓存长度时接口会忽略cache_control，
+        这时不发送该标记（只提示一次）
+        :param system: 固定指令
+        :return: 是否标记cache_control
+        """
+        if not self.config.claude_prompt_caching:
+            return False
+        min_tokens = self.config.claude_cache_min_tokens or claude_cache_min_tokens(self.config.claude_model)
+        tokens = estimate_tokens(system)
+        if tokens < min_tokens:
+            self._warn_prompt_cache_once(
+                'too_short', f"ℹ️ Claude提示词缓存未启用：固定指令约 {tokens} tokens，"
+                             f"低于 {self.config.claude_model} 的最小缓存长度 {min_tokens} tokens",
+                level=logging.INFO
+            )
+            return False
+        return True
+
+    def _check_prompt_cache_usage(self, payload: Dict, input_usage: Dict) -> None:
+        """
+        发送了cache_control但响应中既没有缓存写入也没有缓存读取时提示一次（通常是前缀实际token数低于模型的最小缓存长度）
+        :param payload: 请求体
+        :param input_usage: _claude_input_usage 整理后的输入用量
+        """
+        if not input_usage or not any('cache_control' in block for block in payload.get('system') or []):
+            return
+        if not input_usage.get('cache_read_tokens') and not input_usage.get('cache_write_tokens'):
+            self._warn_prompt_cache_once(
+                'no_usage', f"⚠️ Claude提示词缓存未生效：响应中缓存读取和写入均为0"
+                            f"（固定指令的实际token数可能低于模型的最小缓存长度，可用 CLAUDE_CACHE_MIN_TOKENS 调整判断阈值）"
+            )
+
+    def _warn_prompt_cache_once(self, key: str, message: str, level: int = logging.WARNING) -> None:
+        """同一原因的提示词缓存提示每个进程只输出一次"""
+        if key not in self._prompt_cache_warnings:
+            self._prompt_cache_warnings.add(key)
+            logger.log(level, message)
+
+    def _request_glm(self, prompt: str, timeout: float,
+                     cancel_event: Optional[threading.Event] = None) -> str:
+        """
+        调用GLM API，返回模型生成的原始文本（出错时抛出异常，由调用方处理）
+        :param prompt: 完整提示词
+        :param timeout: 超时时间（秒），流式模式下为两段数据之间的最长间隔
+        :param cancel_event: 对冲请求的取消信号（仅流式模式下能中途中止）
+        :return: 生成的文本
+        """
+        # 构建GLM API请求
+        headers = {
+            'Authorization': f'Bearer {self.config.glm_api_key}',
+            'Content-Type': 'application/json'
+        }
+
+        # GLM API请求体
+        payload = {
+            'model': self.config.glm_model,
+            'max_tokens': self.config.glm_max_tokens,
+            'messages': [{
+                'role': 'user',
+                'content': prompt
+            }]
+        }
+
+        if self.config.llm_streaming:
+            return self._stream_glm(headers, payload, cancel_event)
+
+        start = time.monotonic()
+        response = self.session.post(
+            self.config.glm_api_url,
+            headers=headers,
+            json=payload,
+            timeout=timeout
+        )
+
+        # 检查响应状态
+        response.raise_for_status()
+
+        # 解析响应
+        result = response.json()
+        usage = result.get('usage') or {}
+        self._record_llm_metrics('glm', self.config.glm_model, start, None, usage.get('completion_tokens'),
+                                 input_tokens=usage.get('prompt_tokens'), prompt=prompt)
+        return result['choices'][0]['message']['content']
+
+    def _post_stream(self, url: str, headers: Dict, payload: Dict) -> requests.Response:
+        """
+        发送流式请求：不设总超时，只限制连接时间和两段数据之间的最长间隔
+        （模型生成慢但一直在输出时不会被误判为超时，连接真正卡住时能很快发现）
+        """
+        response = self.session.post(
+            url,
+            headers=headers,
+            json=dict(payload, stream=True),
+            timeout=(self.config.http_connect_timeout, self.config.llm_stream_idle_timeout),
+            stream=True
+        )
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    def _stream_claude(self, headers: Dict, payload: Dict,
+                       cancel_event: Optional[threading.Event] = None) -> str:
+        """
+        以SSE流式方式调用Claude API，逐段拼接生成的文本
+        :return: 生成的完整文本
+        """
+        start = time.monotonic()
+        first_token_at = None
+        output_tokens = None
+        input_usage = {}
+        parts = []
+        response = self._post_stream(self.config.claude_api_url, headers, payload)
+        with response:
+            for event, data in iter_sse_events(response):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LLMRequestCancelled("Claude请求已取消")
+                message = json.loads(data) if data and data.startswith('{') else {}
+                event = event or message.get('type')
+                if event == 'content_block_delta':
+                    text = (message.get('delta') or {}).get('text', '')
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        parts.append(text)
+                elif event == 'message_start':
+                    input_usage = self._claude_input_usage((message.get('message') or {}).get('usage') or {})
+                elif event == 'message_delta':
+                    output_tokens = (message.get('usage') or {}).get('output_tokens', output_tokens)
+                elif event == 'error':
+                    raise RuntimeError(f"Claude流式响应错误: {message.get('error', data)}")
+                elif event == 'message_stop':
+                    break
+
+        if not parts:
+            raise RuntimeError("Claude流式响应没有返回任何内容")
+        self._check_prompt_cache_usage(payload, input_usage)
+        system_text = ''.join(block['text'] for block in payload.get('system', []))
+        # 接口没有返回usage时输出token数记为未知（SSE分段数不等于token数）
+        self._record_llm_metrics('claude', self.config.claude_model, start, first_token_at,
+                                 output_tokens, streamed=True,
+                                 prompt=system_text + payload['messages'][-1]['content'], **input_usage)
+        return ''.join(parts)
+
+    def _stream_glm(self, headers: Dict, payload: Dict,
+                    cancel_event: Optional[threading.Event] = None) -> str:
+        """
+        以SSE流式方式调用GLM API（OpenAI兼容格式），逐段拼接生成的文本
+        :return: 生成的完整文本
+        """
+        start = time.monotonic()
+        first_token_at = None
+        output_tokens = None
+        input_tokens = None
+        parts = []
+        response = self._post_stream(self.config.glm_api_url, headers, payload)
+        with response:
+            for _, data in iter_sse_events(response):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LLMRequestCancelled("GLM请求已取消")
+                if data.strip() == '[DONE]':
+                    break
+                message = json.loads(data)
+                if message.get('error'):
+                    raise RuntimeError(f"GLM流式响应错误: {message['error']}")
+                for choice in message.get('choices') or []:
+                    text = (choice.get('delta') or {}).get('content') or ''
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        parts.append(text)
+                if message.get('usage'):
+                    output_tokens = message['usage'].get('completion_tokens', output_tokens)
+                    input_tokens = message['usage'].get('prompt_tokens', input_tokens)
+
+        if not parts:
+            raise RuntimeError("GLM流式响应没有返回任何内容")
+        self._record_llm_metrics('glm', self.config.glm_model, start, first_token_at,
+                                 output_tokens, streamed=True, input_tokens=input_tokens,
+                                 prompt=payload['messages'][-1]['content'])
+        return ''.join(parts)
+
+    @staticmethod
+    def _claude_input_usage(usage: Dict) -> Dict:
+        """
+        整理Claude返回的输入token用量：input_tokens不含缓存部分，这里合计为总输入，并单独记录缓存读写
+        :param usage: 响应中的usage
+        :return: _record_llm_metrics 的输入token参数
+        """
+        if not usage:
+            return {}
+        cache_read = usage.get('cache_read_input_tokens') or 0
+        cache_write = usage.get('cache_creation_input_tokens') or 0
+        return {
+            'input_tokens': (usage.get('input_tokens') or 0) + cache_read + cache_write,
+            'cache_read_tokens': cache_read,
+            'cache_write_tokens': cache_write,
+        }
+
+    def _record_llm_metrics(self, provider: str, model: str, start: float,
+                            first_token_at: Optional[float], output_tokens: Optional[int],
+                            streamed: bool = False, input_tokens: Optional[int] = None,
+                            prompt: Optional[str] = None, cache_read_tokens: Optional[int] = None,
+                            cache_write_tokens: Optional[int] = None) -> Dict:
+        """
+        记录一次大模型调用的耗时指标：总耗时、首字延迟（仅流式）、输出token数和生成速度
+        :param provider: 提供商
+        :param model: 模型名称
+        :param start: 请求开始时间（time.monotonic()）
+        :param first_token_at: 收到第一段内容的时间，非流式为None
+        :param output_tokens: 接口返回的输出token数（未返回时为None，不计算生成速度）
+        :param streamed: 是否为流式调用
+        :param input_tokens: 接口返回的实际输入token数
+        :param prompt: 提示词（用于和估算的输入token数对比）
+        :param cache_read_tokens: 从提示词缓存读取的输入token数（仅Claude）
+        :param cache_write_tokens: 写入提示词缓存的输入token数（仅Claude）
+        :return: 指标字典
+        """
+        duration = time.monotonic() - start
+        metrics = {
+            'provider': provider,
+            'model': model,
+            'streamed': streamed,
+            'duration': round(duration, 3),
+            'time_to_first_token': round(first_token_at - start, 3) if first_token_at else None,
+            'output_tokens': output_tokens,
+            'tokens_per_second': None,
+            'input_tokens': input_tokens,
+            'estimated_input_tokens': estimate_tokens(prompt) if prompt is not None else None,
+            'cache_read_tokens': cache_read_tokens,
+            'cache_write_tokens': cache_write_tokens,
+        }
+        # 生成速度按首字之后的时间计算（非流式无法区分排队和生成，按总耗时计算）
+        generation_time = duration - (metrics['time_to_first_token'] or 0)
+        if output_tokens and generation_time > 0:
+            metrics['tokens_per_second'] = round(output_tokens / generation_time, 1)
+        self.llm_metrics.append(metrics)
+
+        ttft_text = f"首字延迟 {metrics['time_to_first_token']:.2f}秒，" if first_token_at else ''
+        speed_text = f"（{metrics['tokens_per_second']} tokens/秒）" if metrics['tokens_per_second'] else ''
+        logger.info(f"⏱️ {provider.upper()} {ttft_text}总耗时 {duration:.2f}秒，"
+                    f"输出 {output_tokens or '未知'} tokens{speed_text}")
+        if metrics['estimated_input_tokens'] is not None:
+            actual_text = f"实际 {input_tokens}" if input_tokens else '实际 未知'
+            deviation = ''
+            if input_tokens:
+                deviation = f"（偏差 {(metrics['estimated_input_tokens'] - input_tokens) / input_tokens:+.0%}）"
+            logger.info(f"📏 {provider.upper()} 输入tokens：估计 {metrics['estimated_input_tokens']}，{actual_text}{deviation}")
+        if cache_read_tokens or cache_write_tokens:
+            logger.info(f"🗄️ {provider.upper()} 提示词缓存：读取 {cache_read_tokens or 0} tokens，"
+                        f"写入 {cache_write_tokens or 0} tokens")
+        return metrics
+
+    # 超出预算时描述依次缩短到的长度（字符）
+    SUMMARY_DESCRIPTION_LIMITS = (600, 300, 150, 80, 0)
 
     def _prepare_news_summary(self, articles: List[Dict]) -> str:
         """
         将新闻列表格式化为文本摘要，按分类组织
+        整个提示词超过 PROMPT_TOKEN_BUDGET 时，依次：去除重复的套话 → 逐级缩短描述 → 去掉分数最低的新闻，直到不超预算
         :param articles: 新闻列表
         :return: 格式化的文本摘要
         """
@@ -1124,41 +4000,86 @@ class NewsletterGenerator:
             else:
                 other_articles.append(article)
 
+        # 每个分类最多10条
+        sections = [legal_tech_articles[:10], ai_major_articles[:10]]
+        descriptions = {id(article): article.get('description', '无描述') for section in sections for article in section}
+        summary = self._format_news_summary(sections, descriptions)
+
+        # 提示词模板本身也占token，预算扣除模板部分后留给新闻摘要
+        budget = self.config.prompt_token_budget - estimate_tokens(self._build_prompt(''))
+        estimated = estimate_tokens(summary)
+        if budget <= 0 or estimated <= budget:
+            return summary
+
+        original_estimate = estimated
+        steps = []
+
+        # 第一步：去掉RSS尾巴和多条新闻共有的套话
+        keys = list(descriptions)
+        for key, text in zip(keys, strip_boilerplate([descriptions[key] or '' for key in keys])):
+            descriptions[key] = text or '无描述'
+        summary = self._format_news_summary(sections, descriptions)
+        estimated = estimate_tokens(summary)
+        steps.append('去除套话')
+
+        # 第二步：逐级缩短描述
+        full_descriptions = dict(descriptions)
+        for limit in self.SUMMARY_DESCRIPTION_LIMITS:
+            if estimated <= budget:
+                break
+            descriptions = {key: shorten_text(text, limit) for key, text in full_descriptions.items()} if limit else {}
+            summary = self._format_news_summary(sections, descriptions)
+            estimated = estimate_tokens(summary)
+            steps.append(f"描述缩短至{limit}字符" if limit else '去掉描述')
+
+        # 第三步：去掉分数最低的新闻（每个分类至少保留1条）
+        dropped = 0
+        while estimated > budget:
+            candidates = [(article.get('_score', 0), index, position)
+                          for index, section in enumerate(sections) if len(section) > 1
+                          for position, article in enumerate(section)]
+            if not candidates:
+                break
+            _, index, position = min(candidates)
+            sections[index] = sections[index][:position] + sections[index][position + 1:]
+            dropped += 1
+            summary = self._format_news_summary(sections, descriptions)
+            estimated = estimate_tokens(summary)
+        if dropped:
+            steps.append(f"去掉{dropped}条低分新闻")
+
+        log = logger.info if estimated <= budget else logger.warning
+        log(f"✂️ 新闻摘要超出token预算（估计 {original_estimate} > {budget}），"
+            f"已{'、'.join(steps)}，现约 {estimated} tokens")
+        return summary
+
+    def _format_news_summary(self, sections: List[List[Dict]], descriptions: Dict[int, str]) -> str:
+        """
+        按分类输出新闻摘要文本
+        :param sections: [法律科技新闻列表, AI重大新闻列表]
+        :param descriptions: 新闻（按id）对应的描述，不在其中的新闻不输出描述行
+        :return: 格式化的文本摘要
+        """
+        legal_tech_articles, ai_major_articles = sections
         summary_lines = []
 
-        # 第一部分：法律科技新闻
-        if legal_tech_articles:
-            summary_lines.append("【法律科技新闻】")
-            for i, article in enumerate(legal_tech_articles[:10], 1):
-                title = article.get('title', '无标题')
-                description = article.get('description', '无描述')
-                url = article.get('url', '')
-                source = article.get('source', {}).get('name', '未知来源')
-                published_at = article.get('publishedAt', '')
-
-                summary_lines.append(
-                    f"{i}. 标题: {title}\n"
-                    f"   来源: {source}\n"
-                    f"   描述: {description}\n"
-                    f"   链接: {url}\n"
-                )
-
-        # 第二部分：AI重大新闻
-        if ai_major_articles:
-            if legal_tech_articles:
+        for header, section_articles in (("【法律科技新闻】", legal_tech_articles),
+                                         ("【AI重大新闻】", ai_major_articles)):
+            if not section_articles:
+                continue
+            if summary_lines:
                 summary_lines.append("")  # 空行分隔
-            summary_lines.append("【AI重大新闻】")
-            for i, article in enumerate(ai_major_articles[:10], 1):
+            summary_lines.append(header)
+            for i, article in enumerate(section_articles, 1):
                 title = article.get('title', '无标题')
-                description = article.get('description', '无描述')
                 url = article.get('url', '')
                 source = article.get('source', {}).get('name', '未知来源')
-                published_at = article.get('publishedAt', '')
+                description_line = f"   描述: {descriptions[id(article)]}\n" if id(article) in descriptions else ''
 
                 summary_lines.append(
                     f"{i}. 标题: {title}\n"
                     f"   来源: {source}\n"
-                    f"   描述: {description}\n"
+                    f"{description_line}"
                     f"   链接: {url}\n"
                 )
 
@@ -1171,12 +4092,22 @@ class NewsletterGenerator:
         :param api_provider: API提供商（'GLM' 或 'Claude'）
         :return: 完整的提示词
         """
-        prompt = f"""你是一个专业的法律科技新闻编辑。请将以下新闻整理成一份简明扼要的中文Newsletter。
+        return ''.join(self._build_prompt_parts(news_summary, api_provider))
+
+    def _build_prompt_parts(self, news_summary: str, api_provider: str = 'API') -> Tuple[str, str]:
+        """
+        构建提示词的两部分：每天都相同的固定指令（格式要求、规则、落款），以及当天的日期和新闻
+        固定指令在前，Claude可以把它作为提示词缓存的前缀
+        :param news_summary: 新闻摘要
+        :param api_provider: API提供商（'GLM' 或 'Claude'）
+        :return: (固定指令, 当天内容)，两者直接拼接即为完整提示词
+        """
+        instructions = f"""你是一个专业的法律科技新闻编辑。请将以下新闻整理成一份简明扼要的中文Newsletter。
 
 **严格按照以下格式输出：**
 
 ```
-法律科技与AI日报 - {datetime.now().strftime('%Y年%m月%d日')}
+法律科技与AI日报 - [今天的日期]
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 📌【法律科技新闻】
@@ -1214,7 +4145,7 @@ class NewsletterGenerator:
 ```
 
 **重要格式要求：**
-1. 标题必须是：法律科技与AI日报 - 日期（不要用"科技AI快讯"或其他标题）
+1. 标题必须是：法律科技与AI日报 - 日期（日期使用下方给出的今天的日期，格式如2025年01月01日；不要用"科技AI快讯"或其他标题）
 2. 必须分为📌【法律科技新闻】和🎂【AI重大新闻】两个区块
 3. 每条新闻标题前必须用 ➤ 符号（不要用编号1. 2. 3.）
 4. 两个区块之间用点线分隔（……………………………………………………………………………………………………）
@@ -1224,13 +4155,16 @@ class NewsletterGenerator:
 8. 如果某个区块没有新闻，就省略该区块
 9. **最后落款必须是：🤖 由法律科技新闻Bot自动推送（使用{api_provider} API翻译）**
 
+"""
+        content = f"""今天的日期：{datetime.now().strftime('%Y年%m月%d日')}
+
 以下是今天的新闻（已按分类整理）：
 
 {news_summary}
 
 请严格按照上述格式输出Newsletter内容，不要修改格式结构。"""
 
-        return prompt
+        return instructions, content
 
     def _clean_html(self, html_text: str) -> str:
         """
@@ -1238,34 +4172,19 @@ class NewsletterGenerator:
         :param html_text: 包含HTML标签的文本
         :return: 清理后的纯文本
         """
-        if not html_text:
-            return html_text
-
-        # 移除HTML标签
-        # 移除<script>标签及其内容
-        clean_text = re.sub(r'<script.*?>.*?</script>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
-        # 移除<style>标签及其内容
-        clean_text = re.sub(r'<style.*?>.*?</style>', '', clean_text, flags=re.DOTALL | re.IGNORECASE)
-        # 移除所有HTML标签
-        clean_text = re.sub(r'<[^>]+>', '', clean_text)
-        # 移除HTML实体（如&nbsp;, &lt;, &gt;等）
-        clean_text = re.sub(r'&nbsp;', ' ', clean_text)
-        clean_text = re.sub(r'&lt;', '<', clean_text)
-        clean_text = re.sub(r'&gt;', '>', clean_text)
-        clean_text = re.sub(r'&amp;', '&', clean_text)
-        clean_text = re.sub(r'&quot;', '"', clean_text)
-        clean_text = re.sub(r'&#39;', "'", clean_text)
-        clean_text = re.sub(r'&apos;', "'", clean_text)
-        # 移除多余的空白字符
-        clean_text = re.sub(r'\s+', ' ', clean_text)
-        # 去除首尾空格
-        clean_text = clean_text.strip()
-
-        return clean_text
+        return html_to_text(html_text)
+
+    def _get_translator(self) -> GoogleTranslator:
+        """获取当前线程复用的翻译器"""
+        translator = getattr(self._translator_local, 'translator', None)
+        if translator is None:
+            translator = GoogleTranslator(source='auto', target='zh-CN')
+            self._translator_local.translator = translator
+        return translator
 
     def _translate_text(self, text: str, max_length: int = 5000) -> str:
         """
-        使用免费的Google翻译翻译文本
+        使用免费的Google翻译翻译文本（优先使用翻译缓存）
         :param text: 要翻译的文本
         :param max_length: 最大文本长度（Google翻译限制）
         :return: 翻译后的文本
@@ -1273,18 +4192,157 @@ class NewsletterGenerator:
         if not text or not text.strip():
             return text
 
+        if self.translation_cache:
+            cached = self.translation_cache.get(text)
+            if cached is not None:
+                return cached
+
+        return self._translate_uncached(text, max_length)
+
+    def _translate_uncached(self, text: str, max_length: int = 5000) -> str:
+        """
+        直接调用Google翻译（不查缓存），成功后写入缓存
+        :param text: 要翻译的文本
+        :param max_length: 最大文本长度（Google翻译限制）
+        :return: 翻译后的文本，失败时返回原文
+        """
         try:
             # 如果文本太长，截断翻译
-            if len(text) > max_length:
-                text = text[:max_length] + "..."
-
-            translator = GoogleTranslator(source='auto', target='zh-CN')
-            translated = translator.translate(text)
+            source_text = text
+            if len(source_text) > max_length:
+                source_text = source_text[:max_length] + "..."
+
+            translated = self._get_translator().translate(source_text)
+            # 只缓存翻译成功的结果
+            if translated and self.translation_cache:
+                self.translation_cache.put(text, translated)
             return translated
         except Exception as e:
             logger.warning(f"⚠️ 翻译失败: {e}，保留原文")
             return text
 
+    # 批量翻译时每段文本前的编号标记，如 [[3]]（兼容翻译后变成全角括号的情况）
+    _BATCH_MARKER_RE = re.compile(r'[\[【［]{2}\s*(\d+)\s*[\]】］]{2}')
+
+    def _translate_batch(self, texts: List[str], max_length: int = 5000,
+                         deadline: Optional[float] = None) -> Dict[str, str]:
+        """
+        批量翻译：把多段文本加上编号标记拼接成尽量少的请求，翻译后再按标记拆分
+        多个批次在线程池中并发请求
+        :param texts: 原文列表
+        :param max_length: 单次请求的最大长度（Google翻译限制）
+        :param deadline: 截止时间（time.monotonic()），到时仍未翻译完的批次保留原文
+        :return: {原文: 译文}，翻译失败的保留原文
+        """
+        results = {}
+        pending = []
+        for text in dict.fromkeys(texts):  # 去重并保持顺序
+            if not text or not text.strip():
+                results[text] = text
+                continue
+            cached = self.translation_cache.get(text) if self.translation_cache else None
+            if cached is not None:
+                results[text] = cached
+            else:
+                pending.append(text)
+
+        # 按长度上限把待翻译文本打包成若干批
+        batches = []
+        current, current_length = [], 0
+        for text in pending:
+            segment_length = len(text) + 12  # 编号标记和换行的长度
+            if segment_length > max_length:
+                # 超长文本单独翻译（会被截断）
+                results[text] = self._translate_uncached(text, max_length)
+                continue
+            if current and current_length + segment_length > max_length:
+                batches.append(current)
+                current, current_length = [], 0
+            current.append(text)
+            current_length += segment_length
+        if current:
+            batches.append(current)
+
+        if pending:
+            logger.info(f"📦 批量翻译：{len(pending)} 段文本合并为 {len(batches)} 次请求"
+                        f"（另有 {len(results)} 段命中缓存或无需翻译）")
+
+        batch_results = self._map_with_deadline(
+            self._translate_packed, batches, deadline,
+            fallback=lambda batch: {text: text for text in batch}
+        )
+        for batch_result in batch_results:
+            results.update(batch_result)
+        return results
+
+    def _map_with_deadline(self, func, items: List, deadline: Optional[float], fallback) -> List:
+        """
+        在有上限的线程池中并发执行 func(item)，并按原顺序返回结果
+        超过截止时间仍未完成（或执行出错）的项用 fallback(item) 代替，保证整体按时返回
+        :param func: 处理函数
+        :param items: 待处理列表
+        :param deadline: 截止时间（time.monotonic()），None表示不限时
+        :param fallback: 超时或出错时的替代函数
+        :return: 结果列表（与items顺序一致）
+        """
+        if not items:
+            return []
+
+        max_workers = max(1, min(self.config.fallback_render_workers, len(items)))
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='render')
+        futures = [executor.submit(func, item) for item in items]
+        results = []
+        timed_out = 0
+        try:
+            for item, future in zip(items, futures):
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    results.append(future.result(timeout=timeout))
+                except FuturesTimeoutError:
+                    future.cancel()
+                    timed_out += 1
+                    results.append(fallback(item))
+                except Exception as e:
+                    logger.warning(f"⚠️ 并发处理失败: {e}，使用原文")
+                    results.append(fallback(item))
+        finally:
+            # 不等待超时的任务，尚未开始的任务直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if timed_out:
+            logger.warning(f"⏰ {timed_out} 项未能在截止时间前完成，已使用原文")
+        return results
+
+    def _translate_packed(self, batch: List[str]) -> Dict[str, str]:
+        """
+        把一批文本拼成一次翻译请求；编号标记在翻译后对不上时，退回逐条翻译
+        :param batch: 原文列表（拼接后的总长度不超过单次请求上限）
+        :return: {原文: 译文}
+        """
+        if len(batch) == 1:
+            return {batch[0]: self._translate_uncached(batch[0])}
+
+        packed = '\n'.join(f"[[{i}]] {text.replace(chr(10), ' ')}" for i, text in enumerate(batch))
+        try:
+            translated = self._get_translator().translate(packed) or ''
+            # split结果形如 ['', '0', ' 译文0\n', '1', ' 译文1', ...]
+            parts = self._BATCH_MARKER_RE.split(translated)
+            pieces = {}
+            for i in range(1, len(parts) - 1, 2):
+                pieces[int(parts[i])] = parts[i + 1].strip()
+            if sorted(pieces) != list(range(len(batch))) or not all(pieces.values()):
+                raise ValueError("编号标记在翻译后丢失或错位")
+        except Exception as e:
+            logger.warning(f"⚠️ 批量翻译失败: {e}，改为逐条翻译")
+            return {text: self._translate_uncached(text) for text in batch}
+
+        results = {}
+        for i, text in enumerate(batch):
+            results[text] = pieces[i]
+            if self.translation_cache:
+                self.translation_cache.put(text, pieces[i])
+        return results
+
     def _fallback_newsletter(self, articles: List[Dict]) -> str:
         """
         备用方案：当Claude API调用失败时，使用简单的格式化
@@ -1294,6 +4352,9 @@ class NewsletterGenerator:
         """
         logger.info("🔄 使用备用方案生成Newsletter（包含免费翻译和分类展示）")
 
+        # 整个备用方案的截止时间：个别翻译卡住时，用原文代替，保证按时推送
+        deadline = time.monotonic() + self.config.fallback_render_deadline
+
         date_str = datetime.now().strftime('%Y年%m月%d日')
         lines = [
             f"📰 法律科技与AI日报 - {date_str}",
@@ -1307,7 +4368,8 @@ class NewsletterGenerator:
         ai_major_articles = []
         other_articles = []
 
-        for article in articles[:self.config.max_articles]:
+        # 传入的新闻已按配置档的 max_articles 截取
+        for article in articles:
             category = article.get('_category', 'other')
             if category == 'legal_tech':
                 legal_tech_articles.append(article)
@@ -1319,108 +4381,137 @@ class NewsletterGenerator:
             else:
                 other_articles.append(article)
 
+        # 确定要展示的区块：(区块标题, 新闻列表)
+        sections = []
+        # ========== 第一部分：法律科技新闻 ==========
+        if legal_tech_articles:
+            sections.append(("🔖 【法律科技新闻】", legal_tech_articles[:8]))  # 最多8条
+        # ========== 第二部分：AI重大新闻 ==========
+        if ai_major_articles:
+            sections.append(("🤖 【AI重大新闻】", ai_major_articles[:8]))  # 最多8条
+        # ========== 第三部分：其他相关新闻 ==========
+        if other_articles and len(legal_tech_articles) + len(ai_major_articles) < 10:
+            sections.append(("📰 【其他相关新闻】", other_articles[:5]))  # 最多5条
+
+        def prepare_texts(article):
+            """清理HTML标签，并判断摘要是否需要展示（与标题几乎相同的摘要不展示、不翻译）"""
+            title_clean = self._clean_html(article.get('title', '无标题'))
+            description = article.get('description', '')
+            description_clean = self._clean_html(description) if description else ""
+
+            # 计算标题和摘要的相似度
+            should_show_description = False
+            if description_clean:
+                title_normalized = title_clean.lower()
+                desc_normalized = description_clean.lower()
+                translator = str.maketrans('', '', string.punctuation + ' ')
+                title_normalized = title_normalized.translate(translator)
+                desc_normalized = desc_normalized.translate(translator)
+                similarity = SequenceMatcher(None, title_normalized, desc_normalized).ratio()
+                if similarity < 0.95:
+                    should_show_description = True
+
+            return title_clean, description_clean if should_show_description else ""
+
+        # 先收集所有需要翻译的文本，再批量翻译（几十次请求合并成几次）
+        prepared = {}
+        for _, section_articles in sections:
+            for article in section_articles:
+                try:
+                    prepared[id(article)] = prepare_texts(article)
+                except Exception as e:
+                    logger.warning(f"⚠️ 清理新闻文本失败: {e}，使用原文")
+
+        texts_to_translate = [text for pair in prepared.values() for text in pair if text]
+        translations = self._translate_batch(texts_to_translate, deadline=deadline) if texts_to_translate else {}
+
+        def translate(text):
+            """优先使用批量翻译结果；批量翻译没拿到的，在截止时间前单独翻译"""
+            if text in translations:
+                return translations[text]
+            if time.monotonic() < deadline:
+                return self._translate_text(text)
+            return text
+
         # 添加一个辅助函数来格式化单条新闻
-        def format_article(article, index):
+        def format_article(article, index, use_translation=True):
             title = article.get('title', '无标题')
             description = article.get('description', '')
             url = article.get('url', '')
             source = article.get('source', {}).get('name', '未知来源')
-            published_at = article.get('publishedAt', '')
+            publish_time = self._format_publish_time(article)
 
-            # 格式化发布时间
-            publish_time = ''
-            if published_at:
+            # 使用批量翻译的结果（超过截止时间时直接使用原文）
+            if use_translation:
                 try:
-                    dt = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-                    publish_time = dt.strftime('%Y-%m-%d %H:%M')
-                except:
-                    publish_time = published_at
-
-            # 翻译标题和描述（先清理HTML标签）
-            try:
-                title_clean = self._clean_html(title)
-                description_clean = self._clean_html(description) if description else ""
-
-                # 计算标题和摘要的相似度
-                should_show_description = False
-                if description_clean:
-                    title_normalized = title_clean.lower()
-                    desc_normalized = description_clean.lower()
-                    translator = str.maketrans('', '', string.punctuation + ' ')
-                    title_normalized = title_normalized.translate(translator)
-                    desc_normalized = desc_normalized.translate(translator)
-                    similarity = SequenceMatcher(None, title_normalized, desc_normalized).ratio()
-                    if similarity < 0.95:
-                        should_show_description = True
-
-                title_translated = self._translate_text(title_clean)
-                description_translated = self._translate_text(description_clean) if should_show_description else ""
-
-                result = [
-                    f"📌 {index}. {title_translated}",
-                ]
-                if description_translated:
-                    result.append(f"摘要: {description_translated}")
-                result.append(f"来源: {source}")
-                if publish_time:
-                    result.append(f"发布时间: {publish_time}")
-                result.append(f"链接: {url}")
-                return result
-            except Exception as e:
-                logger.warning(f"⚠️ 翻译新闻失败: {e}，使用原文")
-                result = [f"📌 {index}. {title}"]
-                if description and str(description).lower() != str(title).lower():
-                    result.append(f"摘要: {description}")
-                result.append(f"来源: {source}")
-                if publish_time:
-                    result.append(f"发布时间: {publish_time}")
-                result.append(f"链接: {url}")
-                return result
-
-        # ========== 第一部分：法律科技新闻 ==========
-        if legal_tech_articles:
-            lines.append("🔖 【法律科技新闻】")
-            lines.append("")
-            for i, article in enumerate(legal_tech_articles[:8], 1):  # 最多8条
-                lines.extend(format_article(article, i))
-                lines.append("")
-
-        # ========== 第二部分：AI重大新闻 ==========
-        if ai_major_articles:
-            # 添加模块间分隔线（如果第一部分存在）
-            if legal_tech_articles:
-                lines.append("················································")
-                lines.append("")
-
-            lines.append("🤖 【AI重大新闻】")
-            lines.append("")
-            for i, article in enumerate(ai_major_articles[:8], 1):  # 最多8条
-                lines.extend(format_article(article, i))
-                lines.append("")
-
-        # ========== 第三部分：其他相关新闻 ==========
-        if other_articles and len(legal_tech_articles) + len(ai_major_articles) < 10:
-            # 添加模块间分隔线（如果前两部分存在）
-            if legal_tech_articles or ai_major_articles:
+                    title_clean, description_clean = prepared[id(article)]
+                    title_translated = translate(title_clean)
+                    description_translated = translate(description_clean) if description_clean else ""
+
+                    result = [
+                        f"📌 {index}. {title_translated}",
+                    ]
+                    if description_translated:
+                        result.append(f"摘要: {description_translated}")
+                    result.append(f"来源: {source}")
+                    if publish_time:
+                        result.append(f"发布时间: {publish_time}")
+                    result.append(f"链接: {url}")
+                    return result
+                except Exception as e:
+                    logger.warning(f"⚠️ 翻译新闻失败: {e}，使用原文")
+
+            result = [f"📌 {index}. {title}"]
+            if description and str(description).lower() != str(title).lower():
+                result.append(f"摘要: {description}")
+            result.append(f"来源: {source}")
+            if publish_time:
+                result.append(f"发布时间: {publish_time}")
+            result.append(f"链接: {url}")
+            return result
+
+        # 在线程池中并发格式化每条新闻，结果按原顺序拼装
+        render_items = [
+            (article, i)
+            for _, section_articles in sections
+            for i, article in enumerate(section_articles, 1)
+        ]
+        # 翻译结果就绪后排版只是字符串拼接，留1秒余量避免刚好到点时把已翻译好的新闻退回原文
+        # （translate内部仍按原截止时间判断是否还能发起翻译请求）
+        rendered = iter(self._map_with_deadline(
+            lambda item: format_article(*item), render_items, max(deadline, time.monotonic() + 1.0),
+            fallback=lambda item: format_article(*item, use_translation=False)
+        ))
+
+        for section_index, (section_title, section_articles) in enumerate(sections):
+            # 添加模块间分隔线（如果前面已有区块）
+            if section_index > 0:
                 lines.append("················································")
                 lines.append("")
 
-            lines.append("📰 【其他相关新闻】")
+            lines.append(section_title)
             lines.append("")
-            for i, article in enumerate(other_articles[:5], 1):  # 最多5条
-                lines.extend(format_article(article, i))
+            for _ in section_articles:
+                lines.extend(next(rendered))
                 lines.append("")
 
         lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
         lines.append("")
         lines.append("🤖 由法律科技新闻Bot自动推送（使用备用翻译方案）")
 
+        if self.translation_cache:
+            logger.info(f"📊 翻译缓存：{self.translation_cache.stats()}")
+            self.translation_cache.save()
+
         return '\n'.join(lines)
 
 
 # ====================== 飞书推送模块 ======================
 class FeishuNotifier:
-    """飞书通知类：通过Webhook发送消息到飞书群"""
+    """飞书通知类：同一份Newsletter并发推送到一个或多个群（Webhook）"""
+
+    # 飞书返回的"请求过于频繁"错误码，等待后可以重试
+    RATE_LIMIT_CODES = frozenset([9499, 11232])
 
     def __init__(self, config: Config):
         """
@@ -1428,51 +4519,145 @@ class FeishuNotifier:
         :param config: 配置对象
         """
         self.config = config
-        self.session = requests.Session()
+        # 共享连接池：并发推送到多个群时复用连接
+        self.session = create_http_session(config, pool_maxsize=max(1, config.feishu_max_workers))
+        # 飞书按机器人限流，每个Webhook各有一对令牌桶（每秒、每分钟），多个配置档推送同一个群时共用
+        self._rate_limiters: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._rate_limiters_lock = threading.Lock()
+        # 所有Webhook合计的限流（可选，FEISHU_GLOBAL_RATE_LIMIT<=0 时不限制）
+        self.global_rate_limiter = TokenBucket(config.feishu_global_rate_limit, config.feishu_rate_burst)
+        # 本次运行每个Webhook的推送结果（供运行指标使用，由 LegalTechNewsBot 在每次运行前清空）
+        self.last_results: List[Dict] = []
+
+    @staticmethod
+    def mask_webhook(url: str) -> str:
+        """
+        隐藏Webhook中的密钥部分，用于日志和指标
+        :param url: Webhook地址
+        :return: 如 open.feishu.cn/.../hook/1a2b3c…
+        """
+        parts = urlsplit(url)
+        token = parts.path.rstrip('/').rsplit('/', 1)[-1]
+        return f"{parts.netloc}/.../{token[:6]}…" if token else parts.netloc
 
-    def send_newsletter(self, newsletter_content: str):
+    def send_newsletter(self, newsletter_content: str, webhooks: Optional[List[str]] = None,
+                        profile: Optional[str] = None) -> List[Dict]:
         """
-        发送Newsletter到飞书群
+        发送Newsletter到所有配置的飞书群（并发、限流，单个群失败不影响其他群）
+        多个配置档可以在不同线程中同时调用，共用连接池和令牌桶
         :param newsletter_content: Newsletter内容
+        :param webhooks: 推送的Webhook列表（默认 FEISHU_WEBHOOK_URL 中的全部）
+        :param profile: 配置档名称（写入每个推送结果，用于区分运行指标）
+        :return: 每个Webhook的推送结果
         """
-        logger.info("📤 开始发送飞书通知...")
-
-        try:
-            # 构建飞书消息格式
-            message = {
-                "msg_type": "text",
-                "content": {
-                    "text": newsletter_content
-                }
+        if webhooks is None:
+            webhooks = self.config.feishu_webhooks
+        prefix = f"[{profile}] " if profile else ''
+        logger.info(f"{prefix}📤 开始发送飞书通知（{len(webhooks)} 个群）...")
+
+        # 构建飞书消息格式
+        message = {
+            "msg_type": "text",
+            "content": {
+                "text": newsletter_content
             }
+        }
 
-            # 发送POST请求到飞书Webhook
-            response = self.session.post(
-                self.config.feishu_webhook,
-                json=message,
-                timeout=10
-            )
-
-            # 检查响应状态
-            response.raise_for_status()
-
-            result = response.json()
+        if len(webhooks) <= 1:
+            results = [self._deliver(url, message) for url in webhooks]
+        else:
+            max_workers = max(1, min(self.config.feishu_max_workers, len(webhooks)))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feishu-push') as executor:
+                results = list(executor.map(lambda url: self._deliver(url, message), webhooks))
+        if profile:
+            for result in results:
+                result['profile'] = profile
+        self.last_results.extend(results)
+
+        delivered = [result for result in results if result['ok']]
+        if len(webhooks) > 1:
+            waited = sum(result['rate_limit_wait'] for result in results)
+            logger.info(f"{prefix}📊 飞书推送结果：成功 {len(delivered)}/{len(results)} 个群"
+                        f"（限流等待合计 {waited:.1f}秒）")
+        if not delivered:
+            raise RuntimeError(f"飞书通知发送失败: {results[0]['error'] if results else '未配置Webhook'}")
+        return results
+
+    def _acquire(self, webhook: str) -> float:
+        """
+        发送前取令牌：先取全局令牌（如已配置），再取该Webhook的每秒和每分钟令牌
+        :param webhook: Webhook地址
+        :return: 等待的总秒数
+        """
+        with self._rate_limiters_lock:
+            limiters = self._rate_limiters.get(webhook)
+            if limiters is None:
+                per_minute = self.config.feishu_rate_limit_per_minute
+                limiters = self._rate_limiters[webhook] = (
+                    TokenBucket(self.config.feishu_rate_limit, self.config.feishu_rate_burst),
+                    TokenBucket(per_minute / 60, per_minute),
+                )
+        waited = self.global_rate_limiter.acquire()
+        for limiter in limiters:
+            waited += limiter.acquire()
+        return waited
 
-            # 检查飞书API返回码
-            if result.get('code') == 0:
-                logger.info("✅ 飞书通知发送成功")
-            else:
-                error_message = f"❌ 飞书API返回错误: {result}"
-                logger.error(error_message)
-                raise RuntimeError(error_message)
+    def _deliver(self, webhook: str, message: Dict) -> Dict:
+        """
+        推送到单个Webhook：每次请求前先取令牌；限流、超时和服务端错误按退避时间重试
+        :param webhook: Webhook地址
+        :param message: 消息内容
+        :return: 推送结果 {webhook, ok, attempts, latency, rate_limit_wait, error}
+        """
+        label = self.mask_webhook(webhook)
+        result = {'webhook': label, 'ok': False, 'attempts': 0, 'latency': None,
+                  'rate_limit_wait': 0.0, 'error': None}
+        start = time.monotonic()
+
+        while True:
+            result['rate_limit_wait'] = round(result['rate_limit_wait'] + self._acquire(webhook), 3)
+            result['attempts'] += 1
+            retry_after = None
+            try:
+                # 发送POST请求到飞书Webhook
+                response = self.session.post(webhook, json=message, timeout=10)
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                response.raise_for_status()
+                data = response.json()
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"❌ 飞书通知发送失败: {e}")
-            raise
+                # 检查飞书API返回码
+                if data.get('code') == 0:
+                    result['ok'] = True
+                    result['error'] = None
+                    logger.info(f"✅ 飞书通知发送成功: {label}")
+                    break
+                result['error'] = f"飞书API返回错误: {data}"
+                retryable = data.get('code') in self.RATE_LIMIT_CODES
+            except requests.exceptions.RequestException as e:
+                # 异常信息中带有完整的Webhook地址（含密钥），写入日志和指标前替换为脱敏后的地址
+                result['error'] = str(e).replace(webhook, label)
+                retryable = ResilientCaller.is_retryable(e)
+            except ValueError as e:
+                result['error'] = f"飞书返回内容无法解析: {e}"
+                retryable = False
+
+            # 与 ResilientCaller.backoff_delay 一致：服务端要求的等待时间超过 RETRY_MAX_DELAY 时不再重试
+            if retry_after is not None and retry_after > self.config.retry_max_delay:
+                result['error'] = (f"{result['error']}（Retry-After {retry_after:.0f}秒，"
+                                   f"超过上限 {self.config.retry_max_delay:.0f}秒）")
+                retryable = False
+            if not retryable or result['attempts'] > self.config.feishu_max_retries:
+                logger.error(f"❌ 飞书通知发送失败 {label}: {result['error']}")
+                break
+            delay = retry_after if retry_after is not None else random.uniform(
+                0, min(self.config.retry_max_delay, self.config.retry_base_delay * (2 ** (result['attempts'] - 1)))
+            )
+            logger.warning(f"🔄 飞书通知发送失败 {label}（{result['error']}），{delay:.1f}秒后重试")
+            time.sleep(delay)
 
-        except Exception as e:
-            logger.error(f"❌ 未知错误: {e}")
-            raise
+        result['latency'] = round(time.monotonic() - start, 3)
+        return result
 
 
 # ====================== Bot主控制器 ======================
@@ -1488,8 +4673,23 @@ class LegalTechNewsBot:
         # 初始化配置
         self.config = Config()
 
+        # Newsletter配置档：共用一次抓取和去重，各自评分、生成和推送
+        self.profiles = load_profiles(self.config)
+
+        # 已推送新闻记录（跨运行去重，避免同一条新闻连续几天重复推送），每个配置档各自记录
+        self.seen_stores: Dict[str, Optional[SeenArticleStore]] = {}
+        for profile in self.profiles:
+            self.seen_stores[profile.name] = None
+            if self.config.seen_store_enabled:
+                try:
+                    self.seen_stores[profile.name] = SeenArticleStore(
+                        profile.seen_store_path, self.config.seen_store_retention_days)
+                except Exception as e:
+                    logger.warning(f"⚠️ {profile.log_prefix}已推送新闻记录初始化失败: {e}，本次不做跨运行去重")
+        self.seen_store = self.seen_stores[self.profiles[0].name]
+
         # 初始化各个模块
-        self.news_fetcher = NewsFetcher(self.config)
+        self.news_fetcher = NewsFetcher(self.config, self.seen_store)
         self.newsletter_generator = NewsletterGenerator(self.config)
         self.feishu_notifier = FeishuNotifier(self.config)
 
@@ -1501,28 +4701,146 @@ class LegalTechNewsBot:
         logger.info(f"⏰ 开始执行每日任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info("=" * 60 + "\n")
 
-        try:
-            # 步骤1: 获取新闻
-            articles = self.news_fetcher.fetch_legal_tech_news()
-
-            if not articles:
-                logger.warning("⚠️ 未获取到新闻，任务结束")
-                return
-
-            # 步骤2: 生成Newsletter
-            newsletter = self.newsletter_generator.generate_newsletter(articles)
+        # 本次运行的指标：各阶段耗时、各新闻源和大模型的耗时，运行结束后写入文件
+        metrics = RunMetrics() if self.config.metrics_enabled else None
+        self.news_fetcher.metrics = metrics
+        self.feishu_notifier.last_results = []
+        llm_metrics_start = len(self.newsletter_generator.llm_metrics)
+        hedge_start = self.newsletter_generator.hedge_snapshot()
+        # 大模型重试预算按整次运行计算：在所有配置档开始生成之前重置一次，各配置档共用
+        self.newsletter_generator.resilience.reset_budget()
+        success, error = False, None
 
-            # 步骤3: 发送到飞书
-            self.feishu_notifier.send_newsletter(newsletter)
+        try:
+            # 步骤1: 抓取并去重（所有配置档共用，抓取、去重两个阶段在 fetch_shared_articles 中分别计时）
+            articles = self.news_fetcher.fetch_shared_articles()
+
+            # 步骤2~5: 每个配置档各自评分、生成Newsletter、推送、记录已推送的新闻（多个配置档并行）
+            if metrics:
+                for profile in self.profiles:
+                    metrics.record_profile(profile.name)  # 按配置顺序输出指标
+            if len(self.profiles) == 1:
+                delivered = [self._run_profile(self.profiles[0], articles, metrics)]
+            else:
+                max_workers = max(1, min(self.config.profile_max_workers, len(self.profiles)))
+                logger.info(f"🗂️ 开始并行生成 {len(self.profiles)} 份Newsletter（最多 {max_workers} 个并发）...")
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='profile') as executor:
+                    futures = [executor.submit(self._run_profile, profile, articles, metrics)
+                               for profile in self.profiles]
+                errors = [future.exception() for future in futures]
+                failed = [(profile, e) for profile, e in zip(self.profiles, errors) if e is not None]
+                for profile, e in failed:
+                    logger.error(f"❌ {profile.log_prefix}配置档执行出错: {e}")
+                if failed:
+                    raise RuntimeError(f"{len(failed)}/{len(self.profiles)} 个配置档执行失败: "
+                                       f"{', '.join(profile.name for profile, _ in failed)}") from failed[0][1]
+                delivered = [future.result() for future in futures]
+            # 部分群推送失败时，本次运行不算成功（运行指标中 run_success 为0）
+            success = all(delivered)
 
             logger.info("\n" + "=" * 60)
-            logger.info("✅ 今日任务完成")
+            if success:
+                logger.info("✅ 今日任务完成")
+            else:
+                logger.warning("⚠️ 今日任务部分完成：有群推送失败，相关新闻下次运行时会重新推送")
             logger.info("=" * 60 + "\n")
 
         except Exception as e:
+            error = e
             logger.error(f"\n❌ 任务执行出错: {e}")
             logger.error("=" * 60 + "\n")
 
+        finally:
+            if metrics:
+                metrics.llm_calls = self.newsletter_generator.llm_metrics[llm_metrics_start:]
+                metrics.set_hedge(hedge_start, self.newsletter_generator.hedge_snapshot())
+                metrics.deliveries = self.feishu_notifier.last_results
+                self._save_metrics(metrics, success, error)
+            self.news_fetcher.metrics = None
+
+    def _run_profile(self, profile: NewsProfile, articles: List[Dict], metrics: Optional[RunMetrics]) -> bool:
+        """
+        执行一个配置档：评分选取 -> 生成Newsletter -> 推送到该配置档的群 -> 记录已推送的新闻
+        只有所有群都推送成功时才记录已推送的新闻，否则推送失败的群下次运行时还能收到这些新闻
+        :param profile: 配置档
+        :param articles: 所有配置档共用的去重后新闻（不会被修改）
+        :param metrics: 本次运行的指标（可选）
+        :return: 是否推送到了所有群（所有群都失败时抛出异常）
+        """
+        seen_store = self.seen_stores.get(profile.name)
+        try:
+            selected = self.news_fetcher.select_articles(articles, profile, seen_store)
+            if metrics:
+                metrics.record_profile(profile.name, articles=sum(1 for a in selected if 'no_news_message' not in a))
+
+            with metrics.stage(profile.stage_name('generate')) if metrics else nullcontext():
+                newsletter = self.newsletter_generator.generate_newsletter(selected)
+
+            with metrics.stage(profile.stage_name('push')) if metrics else nullcontext():
+                results = self.feishu_notifier.send_newsletter(
+                    newsletter, profile.webhooks,
+                    profile=None if profile.name == NewsProfile.DEFAULT_NAME else profile.name
+                )
+        except Exception as e:
+            if metrics:
+                metrics.record_profile(profile.name, success=False, error=type(e).__name__)
+            raise
+
+        failed = [result['webhook'] for result in results if not result['ok']]
+        if failed:
+            # 已成功的群下次可能再次收到这些新闻，但不会有群漏掉
+            logger.warning(f"⚠️ {profile.log_prefix}{len(failed)}/{len(results)} 个群推送失败（{', '.join(failed)}），"
+                           f"本次新闻不记为已推送，下次运行会重新推送")
+            if metrics:
+                metrics.record_profile(profile.name, success=False, error='PartialDelivery')
+            return False
+
+        self._mark_pushed(selected, newsletter, seen_store)
+        if metrics:
+            metrics.record_profile(profile.name, success=True)
+        return True
+
+    def _save_metrics(self, metrics: RunMetrics, success: bool, error: Optional[Exception]):
+        """
+        结束本次运行的指标统计，输出摘要并写入 METRICS_DIR（last_run.json / last_run.prom）
+        :param metrics: 本次运行的指标
+        :param success: 是否成功推送
+        :param error: 导致失败的异常
+        """
+        metrics.finish(success, error)
+        metrics.log_summary()
+        try:
+            metrics.save(self.config.metrics_dir)
+            logger.info(f"📊 运行指标已写入 {self.config.metrics_dir}")
+        except Exception as e:
+            logger.warning(f"⚠️ 运行指标写入失败: {e}")
+
+    def _mark_pushed(self, articles: List[Dict], newsletter: str,
+                     seen_store: Optional[SeenArticleStore] = None):
+        """
+        记录已推送的新闻：只记录链接确实出现在Newsletter中的新闻
+        （生成失败的提示、今日无新闻的通知不记录任何新闻，这些新闻下次运行时还会推送）
+        :param articles: 本次交给Newsletter生成的新闻列表
+        :param newsletter: 实际推送的Newsletter内容
+        :param seen_store: 配置档的已推送新闻记录（默认第一个配置档的记录）
+        """
+        seen_store = seen_store or self.seen_store
+        if not seen_store:
+            return
+        candidates = [a for a in articles if a.get('url') and 'no_news_message' not in a]
+        # 生成失败时返回的提示均以"抱歉，"开头（如"抱歉，Newsletter生成失败，且备用方案已禁用"）
+        if not candidates or newsletter.startswith('抱歉，'):
+            return
+        pushed = [a for a in candidates if a['url'] in newsletter]
+        if not pushed:
+            logger.warning("⚠️ Newsletter中没有找到任何新闻链接（可能被模型改写），本次不记录已推送新闻")
+            return
+        try:
+            count = seen_store.mark_pushed(pushed)
+            logger.info(f"📝 已记录 {count} 条已推送新闻")
+        except Exception as e:
+            logger.warning(f"⚠️ 记录已推送新闻失败: {e}")
+
     def start(self):
         """
         启动Bot：设置定时任务，每天中午12点执行